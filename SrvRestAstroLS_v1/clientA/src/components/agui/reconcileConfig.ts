@@ -1,9 +1,18 @@
-import { writable } from "svelte/store";
+import { get, writable } from "svelte/store";
 
 export const DEFAULT_DAYS_WINDOW = 5;
 
 export const daysWindowStore = writable<number>(DEFAULT_DAYS_WINDOW);
 
+// Corrida guardada por /api/reconcile/start (RESULTS_READY): los detalles la cortan sin recalcular
+export type ReconcileRun = { runId: string; daysWindow: number };
+export const runStore = writable<ReconcileRun | null>(null);
+
+// Resultados parciales del job de /start (RESULTS_PARTIAL) por etapa: "pairs" = {pares, head},
+// "approved" / "suggested" con el formato de /api/reconcile/details/n1/*. Se vacía en cada corrida.
+export type ReconcilePartials = { pairs?: any; approved?: any; suggested?: any };
+export const partialStore = writable<ReconcilePartials>({});
+
 export function normalizeDaysWindow(value: number | string | null | undefined): number {
   if (typeof value === "number" && Number.isFinite(value)) {
     return Math.max(1, Math.round(value));
@@ -16,3 +25,31 @@ export function normalizeDaysWindow(value: number | string | null | undefined):
   }
   return DEFAULT_DAYS_WINDOW;
 }
+
+/**
+ * POST a un endpoint de detalle/resumen. Si hay corrida guardada para esa ventana manda run_id
+ * (el server corta lo ya calculado); si venció (404) reintenta con las URIs.
+ */
+export async function postReconcile(
+  url: string,
+  uriExtracto: string,
+  uriContable: string,
+  daysWindow: number
+): Promise<Response> {
+  const run = get(runStore);
+  const useRun = !!run && run.daysWindow === normalizeDaysWindow(daysWindow);
+  const send = (withRun: boolean) => {
+    const fd = new FormData();
+    fd.set("uri_extracto", uriExtracto || "");
+    fd.set("uri_contable", uriContable || "");
+    fd.set("days_window", String(daysWindow || DEFAULT_DAYS_WINDOW));
+    if (withRun && run) fd.set("run_id", run.runId);
+    return fetch(url, { method: "POST", body: fd });
+  };
+  const res = await send(useRun);
+  if (useRun && res.status === 404) {
+    runStore.set(null);
+    return send(false);
+  }
+  return res;
+}
@@ -39,6 +39,20 @@ STORAGE_INCOMING: str = "incoming"
 STORAGE_CANONICAL: str = "canonical"
 STORAGE_ARCHIVES: str = "archives"
 
+# Caché de sniff por hash de contenido (re-uploads del mismo archivo)
+SNIFF_CACHE_DIR: str = (Path(STORAGE_LOCAL_ROOT) / "cache" / "sniff").as_posix()
+SNIFF_CACHE_MAX_ENTRIES: int = int(os.environ.get("CONCIAI_SNIFF_CACHE_MAX_ENTRIES", "512"))
+SNIFF_CACHE_MAX_BYTES: int = int(os.environ.get("CONCIAI_SNIFF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Frames de los loaders en Arrow IPC, mapeados en memoria por todos los workers ("" = deshabilitado).
+# Apuntarlo a /dev/shm evita incluso el disco; por defecto vive junto al resto de la caché.
+SHARED_FRAMES_DIR: str = os.environ.get("CONCIAI_SHARED_FRAMES_DIR", (Path(STORAGE_LOCAL_ROOT) / "cache" / "frames").as_posix())
+SHARED_FRAMES_MAX_BYTES: int = int(os.environ.get("CONCIAI_SHARED_FRAMES_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Caché en memoria (por proceso) de DataFrames de los loaders: presupuesto en bytes y TTL (0 = sin TTL)
+DF_CACHE_MAX_BYTES: int = int(os.environ.get("CONCIAI_DF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DF_CACHE_TTL_SECONDS: int = int(os.environ.get("CONCIAI_DF_CACHE_TTL_SECONDS", "1800"))
+
 # Data para salidas operativas (reportes)
 DATA_ROOT: str = (CONCILIA_ROOT / "data").as_posix()
 DATA_REPORTS: str = "reports"
@@ -47,6 +61,49 @@ DATA_REPORTS: str = "reports"
 PARTITION_ACCOUNT: str = "account"
 PARTITION_PERIOD: str = "period"  # YYYY-MM
 
+# =========================
+# Pool de procesos (trabajo CPU-bound fuera del event loop)
+# =========================
+# Por worker de gunicorn: 4 workers x 2 procesos = 8 procesos de cálculo. 0 = sin pool (thread).
+PROCESS_POOL_WORKERS: int = int(os.environ.get("CONCIAI_POOL_WORKERS", str(max(1, min(2, os.cpu_count() or 1)))))
+# Máximo de tareas en vuelo por worker (0 = 2 x PROCESS_POOL_WORKERS)
+PROCESS_POOL_MAX_PENDING: int = int(os.environ.get("CONCIAI_POOL_MAX_PENDING", "0"))
+# Workers del server (gunicorn -w / WEB_CONCURRENCY): cada uno levanta su propio pool
+SERVER_WORKERS: int = int(os.environ.get("CONCIAI_SERVER_WORKERS", os.environ.get("WEB_CONCURRENCY", "4")))
+# Búsqueda N→1 por clusters en paralelo (procesos hijos del que corre el pipeline). 0/1 = secuencial.
+# Por defecto, lo que sobra de CPUs después de los procesos de cálculo de todos los workers
+# (8 CPUs, 4 workers x 2 procesos: secuencial); si no, cada proceso de cálculo anida su pool.
+N1_PARALLEL_WORKERS: int = int(os.environ.get(
+    "CONCIAI_N1_WORKERS",
+    str(max(1, (os.cpu_count() or 1) // (max(1, PROCESS_POOL_WORKERS) * max(1, SERVER_WORKERS)))),
+))
+# Debajo de esta cantidad de filas banco sin conciliar no conviene pagar el arranque de procesos
+N1_PARALLEL_MIN_ROWS: int = int(os.environ.get("CONCIAI_N1_PARALLEL_MIN_ROWS", "400"))
+# Presupuesto por corrida de las fases N→1 (0 = sin límite). Al agotarse se devuelven los grupos
+# encontrados hasta ahí y el estado queda en N1_CHECKPOINT_DIR para retomar con resume=1.
+N1_TIME_BUDGET_S: float = float(os.environ.get("CONCIAI_N1_TIME_BUDGET_S", "25"))
+N1_STEP_BUDGET: int = int(os.environ.get("CONCIAI_N1_STEP_BUDGET", "0"))  # filas objetivo exploradas
+# Fase 1→N banco→PILAGA: fracción del presupuesto de tiempo que puede usar (0 = fase deshabilitada)
+N1_B2P_TIME_FRACTION: float = float(os.environ.get("CONCIAI_N1_B2P_TIME_FRACTION", "0.25"))
+N1_CHECKPOINT_DIR: str = os.environ.get("CONCIAI_N1_CHECKPOINT_DIR", (Path(STORAGE_LOCAL_ROOT) / "cache" / "n1").as_posix())
+N1_CHECKPOINT_MAX_ENTRIES: int = int(os.environ.get("CONCIAI_N1_CHECKPOINT_MAX_ENTRIES", "64"))
+# Corridas persistidas por run_id (/api/reconcile/start): los detalles y resúmenes las cortan sin recalcular
+RUN_STORE_DIR: str = os.environ.get("CONCIAI_RUN_STORE_DIR", (Path(STORAGE_LOCAL_ROOT) / "cache" / "runs").as_posix())
+RUN_STORE_MAX_ENTRIES: int = int(os.environ.get("CONCIAI_RUN_STORE_MAX_ENTRIES", "32"))
+RUN_STORE_TTL_SECONDS: int = int(os.environ.get("CONCIAI_RUN_STORE_TTL_SECONDS", "3600"))  # 0 = sin vencimiento
+# Salidas memoizadas de las etapas del pipeline (1→1, N→1) por huella de sus entradas
+STAGE_STORE_DIR: str = os.environ.get("CONCIAI_STAGE_STORE_DIR", (Path(STORAGE_LOCAL_ROOT) / "cache" / "stages").as_posix())
+STAGE_STORE_MAX_ENTRIES: int = int(os.environ.get("CONCIAI_STAGE_STORE_MAX_ENTRIES", "64"))
+STAGE_STORE_TTL_SECONDS: int = int(os.environ.get("CONCIAI_STAGE_STORE_TTL_SECONDS", "3600"))  # 0 = sin vencimiento
+# Jobs de /api/reconcile/start guardados por worker del server (los terminados más viejos se descartan)
+JOBS_MAX_ENTRIES: int = int(os.environ.get("CONCIAI_JOBS_MAX_ENTRIES", "64"))
+# Pre-matching 1→1 por número de referencia (documento) + monto antes del matcher por monto/fecha.
+# Esos pares respetan el days_window del request; REF_MATCH_MAX_DAYS > 0 lo acota más (0 = solo days_window).
+REF_MATCH_ENABLED: int = int(os.environ.get("CONCIAI_REF_MATCH", "1"))  # 0 = deshabilitado
+REF_MATCH_MAX_DAYS: int = int(os.environ.get("CONCIAI_REF_MATCH_MAX_DAYS", "0"))
+# Conciliación rápida: filas por lista en la respuesta JSON (0 = sin tope; stream=1 devuelve todo)
+QUICK_MATCH_MAX_ROWS: int = int(os.environ.get("CONCIAI_QUICK_MAX_ROWS", "200"))
+
 # =========================
 # Base de datos
 # =========================
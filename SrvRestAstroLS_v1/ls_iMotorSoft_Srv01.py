@@ -9,6 +9,7 @@ from litestar import Litestar, get
 from litestar.config.cors import CORSConfig
 import uvicorn
 import globalVar as Var
+from services import process_pool
 
 # sys.path a la raíz del proyecto
 project_root = Path(__file__).parent.parent
@@ -23,7 +24,13 @@ from routes.v1.ingest_confirm import ingest_confirm
 from routes.v1.uploads_concilia import upload_bank_movements
 # v2 (NUEVA) — la que usa ReconciliarApp.svelte
 from routes.v1.uploads_v2_concilia import upload_ingest_v2
-from routes.v1.reconcile_start import reconcile_start          # <-- NUEVO
+from routes.v1.reconcile_start import (
+    reconcile_start,
+    reconcile_job_status,
+    reconcile_job_cancel,
+    on_startup as reconcile_jobs_startup,
+    on_shutdown as reconcile_jobs_shutdown,
+)
 from routes.v1.reconcile_details import (
     reconcile_details,
     reconcile_details_no_banco,
@@ -46,7 +53,9 @@ route_handlers = [
     ingest_confirm,
     upload_bank_movements,  # dejamos la v1 por compat
     upload_ingest_v2,       # montamos v2
-    reconcile_start,        # montamos reconcile_start
+    reconcile_start,        # montamos reconcile_start (encola un job)
+    reconcile_job_status,   # estado / resultado del job de start
+    reconcile_job_cancel,   # cancelar el job de start
     reconcile_details,      # montamos reconcile_details
     reconcile_details_no_banco,  # endpoint específico por card
     reconcile_details_pares,  # endpoint para concilios 1→1
@@ -79,7 +88,12 @@ else:
         max_age=86400,
     )
 
-app = Litestar(route_handlers=route_handlers, cors_config=cors_config)
+app = Litestar(
+    route_handlers=route_handlers,
+    cors_config=cors_config,
+    on_startup=[process_pool.on_startup, reconcile_jobs_startup],   # pool de procesos para pandas/openpyxl + jobs de start
+    on_shutdown=[reconcile_jobs_shutdown, process_pool.on_shutdown],
+)
 
 if __name__ == "__main__":
     try:
@@ -7,7 +7,9 @@ from datetime import date
 from litestar import post
 from litestar.response import Response
 
+from services.process_pool import run_in_pool
 from .agui_notify import emit
+from .reconcile_start import _materialize_canonical
 
 # Estado en memoria por threadId
 # _CONFIRMS[threadId] = {"extracto": {...} | None, "contable": {...} | None}
@@ -33,9 +35,11 @@ async def ingest_confirm(request: Any) -> Response:
     Confirma un preview. Espera multipart/form-data:
       - threadId (obligatorio)
       - role: extracto | contable (obligatorio)
-      - source_file_id, original_uri, bank, period_from, period_to (opcionales)
+      - source_file_id, original_uri, bank, account_id, period_from, period_to (opcionales)
     Side-effects:
       - Guarda estado por threadId/role.
+      - Normaliza el archivo al store canónico (Parquet por cuenta/período) para que
+        la conciliación no vuelva a parsear el XLSX.
       - Emite READY_TO_RECONCILE por SSE cuando los 2 están confirmados.
     """
     form = await request.form()
@@ -50,6 +54,7 @@ async def ingest_confirm(request: Any) -> Response:
     source_file_id = (form.get("source_file_id") or "").strip()
     original_uri   = (form.get("original_uri") or "").strip()
     bank           = (form.get("bank") or "").strip() or None
+    account_id     = (form.get("account_id") or "").strip() or None
     period_from    = (form.get("period_from") or "").strip() or None
     period_to      = (form.get("period_to") or "").strip() or None
 
@@ -61,8 +66,22 @@ async def ingest_confirm(request: Any) -> Response:
         "period_from": period_from,
         "period_to": period_to,
         "confirmed": True,
+        "canonical_uri": None,
     }
 
+    if original_uri:
+        # Si falla, la conciliación sigue leyendo el XLSX: no bloquea la confirmación
+        try:
+            state[role]["canonical_uri"] = await run_in_pool(
+                _materialize_canonical,
+                role,
+                original_uri,
+                account_id or bank,
+                (period_from or "")[:7] or None,
+            )
+        except Exception as e:
+            print("[ingest_confirm] canonical ERROR:", type(e).__name__, str(e), flush=True)
+
     # Feedback inmediato
     await emit(threadId, {
         "type": "TOAST", "level": "success",
@@ -92,7 +111,7 @@ async def ingest_confirm(request: Any) -> Response:
             }
         })
 
-    return Response({"ok": True, "message": "Confirmado"}, status_code=200)
+    return Response({"ok": True, "message": "Confirmado", "canonical_uri": state[role]["canonical_uri"]}, status_code=200)
 
 # Exponer estado para otros endpoints (reconcile_start)
 def get_confirms(thread_id: str) -> Dict[str, Optional[dict]]:
@@ -3,20 +3,34 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Tuple
+from typing import Any, Callable, Optional, Tuple
 from urllib.parse import urlparse
 
+import functools
+import hashlib
+import numpy as np
 import pandas as pd
 import time
 from litestar import post
 from litestar.response import Response
 
+import globalVar as Var
+from services.process_pool import map_cpu, run_in_pool
+from services.single_flight import SingleFlight
+from services.reconcile.n1_checkpoint import N1CheckpointStore
+from services.reconcile.run_store import RunNotFoundError, RunStore
+from services.reconcile.stage_graph import MEMO, Stage, StageGraph
+from services.reconcile.subset_sum import find_subset
+
 # Importamos helpers desde reconcile_start (para no duplicar lógica)
 from .reconcile_start import (
+    _df_cache_key,
     _from_file_uri,
     _load_pilaga,
     _load_extracto,
     _match_one_to_one_by_amount_and_date_window,
+    _pairs_1a1,
+    _run_reconcile,
 )
 from .reconcile_start import _match_one_to_one_by_amount_and_date_window as _match_1a1  # alias legible
 
@@ -36,6 +50,75 @@ def _parse_common_form(form: Any) -> Tuple[str, str, int]:
     return uri_extracto, uri_contable, days_window
 
 
+def _parse_resume(form: Any) -> bool:
+    """resume=1: retomar la búsqueda N→1 desde el último corte por presupuesto."""
+    return str(form.get("resume") or "").strip().lower() in ("1", "true", "si", "sí", "yes")
+
+
+def _parse_run_id(form: Any) -> Optional[str]:
+    """run_id: cortar la corrida guardada por /api/reconcile/start en lugar de recalcular."""
+    return str(form.get("run_id") or "").strip() or None
+
+
+def _run_not_found(run_id: Optional[str]) -> Response:
+    return Response({"ok": False, "message": f"run_id desconocido, vencido o de otros archivos: {run_id}"}, status_code=404)
+
+
+def _stored_run(run_id: Optional[str], uri_extracto: str = "", uri_contable: str = "", days_window: int = 5) -> dict:
+    """
+    Corrida guardada por run_id. Si el request trae URIs, la corrida tiene que ser de esos archivos y
+    de la misma ventana; si no, RunNotFoundError (404) y el cliente reintenta con las URIs.
+    """
+    run = _RUNS.get(run_id)
+    if uri_extracto or uri_contable:
+        stored = (run.get("uri_extracto"), run.get("uri_contable"), run.get("days_window"))
+        if stored != (uri_extracto, uri_contable, int(days_window)):
+            raise RunNotFoundError(run_id)
+    return run
+
+
+def _file_fingerprint(kind: str, uri: str) -> tuple:
+    try:
+        return _df_cache_key(kind, _from_file_uri(uri))
+    except OSError:
+        return (kind, uri)  # el error de lectura lo reporta el cálculo
+
+
+async def _coalesced_run_id(uri_extracto: str, uri_contable: str, days_window: int, resume: bool = False) -> str:
+    """
+    run_id de una corrida completa (reconcile_start._run_reconcile) para estos archivos y parámetros.
+    Si otro request ya la está calculando, espera esa en lugar de lanzar otra (single-flight).
+    El run_id sale de la huella de los archivos y parámetros (_content_run_id): pedidos sucesivos con
+    las mismas URIs reusan la corrida guardada si terminó completa, en lugar de guardar una nueva
+    cada vez (y desalojar las de /start). resume=1 recalcula (sigue el checkpoint) y la reemplaza.
+    """
+    key = _flight_key("run", uri_extracto, uri_contable, days_window, bool(resume))
+    run_id = _content_run_id(uri_extracto, uri_contable, days_window)
+    run = await _FLIGHTS.do(
+        key,
+        lambda: run_in_pool(_run_reconcile, uri_extracto, uri_contable, days_window, resume=resume,
+                            run_id=run_id, reuse=not resume),
+    )
+    return run["run_id"]
+
+
+def _content_run_id(uri_extracto: str, uri_contable: str, days_window: int) -> str:
+    """run_id determinístico (32 hex) de la corrida por URIs: huella de archivos + ventana + config."""
+    key = (_flight_key("run", uri_extracto, uri_contable, days_window), _pairs_config(), _n1_config())
+    return hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+
+
+def _flight_key(what: str, uri_extracto: str, uri_contable: str, days_window: int, *extra: Any) -> tuple:
+    """Clave single-flight: qué se calcula + huella de ambos archivos + parámetros."""
+    return (
+        what,
+        _file_fingerprint("extracto", uri_extracto),
+        _file_fingerprint("pilaga", uri_contable),
+        int(days_window),
+        *extra,
+    )
+
+
 def _load_frames(uri_extracto: str, uri_contable: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
     path_extracto = _from_file_uri(uri_extracto)
     path_contable = _from_file_uri(uri_contable)
@@ -49,6 +132,14 @@ N1_MAX_COMBO_DEFAULT = 6
 N1_TOL_APPROVED = 1.0   # dif aceptada para considerarlo "agrupado" (≤ $1)
 N1_TOL_SUGGESTED = 5.0  # dif amplia para sugeridos; todo lo que supere la tol aprobada queda aquí
 N1_CAND_LIMIT_DEFAULT = 20
+N1_COMBO_MODE_DEFAULT = "first"  # "first" | "min_diff" | "min_card" (ver services.reconcile.subset_sum)
+
+# Estados parciales de la búsqueda N→1 (presupuesto agotado) para retomar con resume
+_N1_CHECKPOINTS = N1CheckpointStore(Var.N1_CHECKPOINT_DIR, Var.N1_CHECKPOINT_MAX_ENTRIES)
+# Corridas guardadas por /api/reconcile/start (run_id)
+_RUNS = RunStore(Var.RUN_STORE_DIR, Var.RUN_STORE_MAX_ENTRIES, Var.RUN_STORE_TTL_SECONDS)
+# Corridas en vuelo de este worker: requests concurrentes con los mismos archivos/parámetros esperan la misma
+_FLIGHTS = SingleFlight()
 
 
 def _to_row_id(df: pd.DataFrame, prefix: str) -> pd.DataFrame:
@@ -81,7 +172,8 @@ def _serialize_pair(row: pd.Series) -> dict:
         "monto": monto_val,
         "documento_banco": str(row.get("documento_b") or ""),
         "documento_pilaga": str(row.get("documento_p") or ""),
-        "date_diff_days": int(row.get("date_diff_days") or 0),
+        "date_diff_days": int(row.get("date_diff_days") or 0) if pd.notna(row.get("date_diff_days")) else None,
+        "referencia": str(row.get("match_ref") or ""),  # token si el par salió por referencia + monto
     }
 
 
@@ -91,36 +183,16 @@ def _find_combo(
     max_combo: int,
     tol_amount: float,
     min_combo: int = 2,
+    mode: str = N1_COMBO_MODE_DEFAULT,
 ) -> list[dict]:
     """
-    Busca una combinación (2..max_combo) cuya suma se acerque al target dentro de la tolerancia.
-    Estrategia DFS controlada, candidatos ya limitados/sorteados por magnitud.
-    """
-    n = len(candidates)
-    best: list[dict] = []
-    target_abs = abs(target)
-
-    def dfs(start: int, current: list[dict], current_sum: float):
-        nonlocal best
-        # Si ya encontramos combinación dentro de tolerancia y cumple el tamaño mínimo, devolver
-        if len(current) >= min_combo and abs(current_sum - target) <= tol_amount:
-            best = list(current)
-            return True  # encontrada combinación exacta dentro de tol
-        if len(current) >= max_combo:
-            return False
-        for i in range(start, n):
-            c = candidates[i]
-            next_sum = current_sum + c["monto"]
-            # poda simple: si nos pasamos mucho, seguir igual porque hay montos negativos/positivos del mismo signo (ya filtrado por signo)
-            current.append(c)
-            found = dfs(i + 1, current, next_sum)
-            current.pop()
-            if found:
-                return True
-        return False
-
-    dfs(0, [], 0.0)
-    return best
+    Busca una combinación (min_combo..max_combo) cuya suma se acerque al target dentro de la tolerancia.
+    mode="first" devuelve la primera en orden DFS (candidatos ya limitados/sorteados por magnitud);
+    "min_diff" / "min_card" priorizan la menor diferencia / la menor cantidad de movimientos.
+    Motor: services.reconcile.subset_sum (centavos enteros, branch-and-bound + meet-in-the-middle).
+    """
+    idx = find_subset([c["monto"] for c in candidates], target, max_combo, tol_amount, min_combo=min_combo, mode=mode)
+    return [candidates[i] for i in idx]
 
 
 def _compute_pairs(df_p: pd.DataFrame, df_b: pd.DataFrame, days_window: int):
@@ -132,82 +204,112 @@ def _compute_pairs(df_p: pd.DataFrame, df_b: pd.DataFrame, days_window: int):
     p["monto_r"] = p["monto"].round(2)
     b["monto_r"] = b["monto"].round(2)
 
-    merged = p.merge(b, on="monto_r", suffixes=("_p", "_b"))
-    merged["date_diff_days"] = (merged["fecha_p"] - merged["fecha_b"]).abs().dt.days
-    merged = merged[merged["date_diff_days"] <= abs(int(days_window))]
-    merged = merged.sort_values(["monto_r", "date_diff_days", "_row_id_p", "_row_id_b"])
-
-    used_p: set[int] = set()
-    used_b: set[int] = set()
-    selected_rows = []
-    for record in merged.to_dict("records"):
-        row_id_p = record["_row_id_p"]
-        row_id_b = record["_row_id_b"]
-        if row_id_p in used_p or row_id_b in used_b:
-            continue
-        used_p.add(row_id_p)
-        used_b.add(row_id_b)
-        selected_rows.append(record)
-
-    pairs_df = pd.DataFrame(selected_rows, columns=merged.columns) if selected_rows else merged.iloc[0:0].copy()
+    pairs_df = _pairs_1a1(p, b, days_window)
+    used_p: set[int] = set(pairs_df["_row_id_p"].tolist())
+    used_b: set[int] = set(pairs_df["_row_id_b"].tolist())
     return pairs_df, used_p, used_b
 
 
-def _build_groups_pipeline(
-    df_p: pd.DataFrame,
-    df_b: pd.DataFrame,
-    used_p: set[int],
-    used_b: set[int],
-    days_window: int,
-    tol_amount: float,
-    estado: str,
-    min_combo: int = 2,
-):
-    """Genera grupos N→1 usando sobrantes actuales. Marca usados banco/PILAGA."""
-    groups: list[dict] = []
-    total_amount = 0.0
+class _CandidateIndex:
+    """
+    Índice de candidatos N→1 armado una vez por corrida del pipeline (lo comparten aprobados y sugeridos).
 
-    # Filtrar sobrantes según usados
-    sobrantes_p = df_p[~df_p["_row_id_p"].isin(used_p)].copy()
-    sobrantes_b = df_b[~df_b["_row_id_b"].isin(used_b)].copy()
+    Filas partidas por signo (monto >= 0 / resto), cada partición ordenada por fecha y por |monto|;
+    un bitmap marca las filas ya usadas. La ventana de fechas y la cota de monto salen con bisect
+    (searchsorted) en lugar de filtrar el DF entero por cada fila objetivo.
+    """
 
-    sobrantes_p["fecha"] = pd.to_datetime(sobrantes_p["fecha"], errors="coerce")
-    sobrantes_b["fecha"] = pd.to_datetime(sobrantes_b["fecha"], errors="coerce")
-    sobrantes_p["monto"] = pd.to_numeric(sobrantes_p["monto"], errors="coerce")
-    sobrantes_b["monto"] = pd.to_numeric(sobrantes_b["monto"], errors="coerce")
+    def __init__(self, df: pd.DataFrame, id_col: str, used: set[int]):
+        fechas = pd.to_datetime(df["fecha"], errors="coerce").reset_index(drop=True)
+        montos = pd.to_numeric(df["monto"], errors="coerce").to_numpy(dtype=float)
+        self.id_col = id_col
+        self.ids = df[id_col].to_numpy()
+        self.pos_by_id = {int(rid): i for i, rid in enumerate(self.ids.tolist())}
+        self.fechas = fechas
+        self.montos = montos
+        self.docs = df["documento"].reset_index(drop=True) if "documento" in df.columns else None
+        self.used = np.zeros(len(df), dtype=bool)
+        self.mark_used(used)
+
+        self.abs = np.abs(montos)
+        t = fechas.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        has_date = ~fechas.isna().to_numpy()
+        valid = ~np.isnan(montos)  # monto NaN nunca pasa la cota |monto| <= |target| + tol
+        self._parts = {}
+        for positive, side in ((True, montos >= 0), (False, ~(montos >= 0))):
+            members = np.flatnonzero(side & valid)
+            dated = members[has_date[members]]
+            by_date = dated[np.argsort(t[dated], kind="stable")]
+            by_abs = members[np.argsort(self.abs[members], kind="stable")]
+            self._parts[positive] = (by_date, t[by_date], by_abs, self.abs[by_abs])
+
+    def mark_used(self, row_ids) -> None:
+        for rid in row_ids:
+            pos = self.pos_by_id.get(int(rid))
+            if pos is not None:
+                self.used[pos] = True
+
+    def candidates(self, target: float, fecha: Any, days_window: int, tol_amount: float, limit: int) -> list[dict]:
+        """
+        Mismos candidatos y orden que el filtro histórico sobre el DF: mismo signo, libres, dentro de
+        la ventana (si hay fecha), |monto| <= |target| + tol, ordenados por |monto| desc, primeros `limit`.
+        """
+        bound = abs(target) + tol_amount
+        if np.isnan(bound):
+            return []
+        by_date, dates, by_abs, abs_sorted = self._parts[target >= 0]
+        if fecha is not None and pd.notna(fecha):
+            window = pd.to_timedelta(days_window, unit="D").value
+            center = pd.Timestamp(fecha).as_unit("ns").value
+            lo = np.searchsorted(dates, center - window, "left")
+            hi = np.searchsorted(dates, center + window, "right")
+            pos = by_date[lo:hi]
+            pos = pos[self.abs[pos] <= bound]
+        else:
+            pos = by_abs[: np.searchsorted(abs_sorted, bound, "right")]
+        pos = np.sort(pos[~self.used[pos]])
+        if len(pos) == 0:
+            return []
+        # Mismo sort (quicksort, no estable) que sort_values(key=abs, ascending=False) sobre el DF filtrado
+        order = pd.Series(self.abs[pos]).sort_values(ascending=False).index.to_numpy()
+        out = []
+        for i in pos[order][:limit].tolist():
+            out.append({
+                self.id_col: int(self.ids[i]),
+                "fecha": self.fechas.iloc[i],
+                "monto": float(self.montos[i]),
+                "documento": self.docs.iloc[i] if self.docs is not None else "",
+            })
+        return out
 
-    sobrantes_b = sobrantes_b.sort_values(by="monto", key=lambda s: s.abs(), ascending=False)
 
-    for _, bank_row in sobrantes_b.iterrows():
+def _n1_groups_for_rows(
+    bank_rows: pd.DataFrame,
+    seqs: list[int],
+    index: _CandidateIndex,
+    days_window: int,
+    tol_amount: float,
+    estado: str,
+    min_combo: int,
+    deadline: Optional[float] = None,
+    max_seq: Optional[int] = None,
+) -> tuple[list[tuple[int, dict]], list[int]]:
+    """
+    Recorre filas banco (ya en orden de prioridad) buscando su combinación PILAGA y marca
+    usados en el índice. Devuelve ([(seq, grupo)], seqs sin explorar); seq = posición de la fila
+    en el orden global. Corta al llegar a deadline (time.time()) o a la fila max_seq; el deadline
+    se mira recién después de la primera fila, así cada corrida avanza aunque ya esté vencido.
+    """
+    out: list[tuple[int, dict]] = []
+    for k, (seq, (_, bank_row)) in enumerate(zip(seqs, bank_rows.iterrows())):
+        if (max_seq is not None and seq >= max_seq) or (k and deadline is not None and time.time() >= deadline):
+            return out, list(seqs[k:])
         target = float(bank_row["monto"])
-        sign = 1 if target >= 0 else -1
         fecha_b = bank_row["fecha"]
         row_id_b = int(bank_row["_row_id_b"])
 
         # Candidatos PILAGA
-        cands_df = sobrantes_p[
-            (sobrantes_p["monto"].apply(lambda x: (x >= 0) == (sign >= 0))) &
-            (~sobrantes_p["_row_id_p"].isin(used_p))
-        ].copy()
-
-        if fecha_b is not None and pd.notna(fecha_b):
-            cands_df = cands_df[
-                cands_df["fecha"].notna() &
-                ((cands_df["fecha"] - fecha_b).abs() <= pd.to_timedelta(days_window, unit="D"))
-            ]
-
-        cands_df = cands_df[abs(cands_df["monto"]) <= abs(target) + tol_amount]
-        cands_df = cands_df.sort_values(by="monto", key=lambda s: s.abs(), ascending=False).head(N1_CAND_LIMIT_DEFAULT)
-
-        candidates = []
-        for _, row in cands_df.iterrows():
-            candidates.append({
-                "_row_id_p": int(row["_row_id_p"]),
-                "fecha": row["fecha"],
-                "monto": float(row["monto"]),
-                "documento": row.get("documento", ""),
-            })
-
+        candidates = index.candidates(target, fecha_b, days_window, tol_amount, N1_CAND_LIMIT_DEFAULT)
         if not candidates:
             continue
 
@@ -215,14 +317,11 @@ def _build_groups_pipeline(
         if not combo:
             continue
 
-        # registrar uso
-        used_b.add(row_id_b)
-        for c in combo:
-            used_p.add(c["_row_id_p"])
+        index.mark_used(c["_row_id_p"] for c in combo)
 
         pilaga_rows = [_prepare_row(pd.Series(c)) for c in combo]
         grupo_sum = sum(c["monto"] for c in combo)
-        groups.append({
+        out.append((seq, {
             "bank_row": _prepare_row(bank_row),
             "pilaga_rows": pilaga_rows,
             "monto_total": round(grupo_sum, 2),
@@ -231,11 +330,153 @@ def _build_groups_pipeline(
             "direction": "p_to_bank",  # target = banco, componentes = PILAGA
             "_row_id_b": row_id_b,
             "_row_ids_p": [c["_row_id_p"] for c in combo],
-        })
-        total_amount += grupo_sum
+        }))
+    return out, []
 
-    return groups, round(total_amount, 2), used_p, used_b
 
+def _n1_chunk(chunk: tuple[pd.DataFrame, list[int]], **kwargs) -> tuple[list[tuple[int, dict]], list[int]]:
+    """Entrada de map_cpu: cada worker trabaja sobre su copia del índice."""
+    bank_rows, seqs = chunk
+    return _n1_groups_for_rows(bank_rows, seqs, **kwargs)
+
+
+def _n1_clusters(sobrantes_b: pd.DataFrame, days_window: int) -> list[list[int]]:
+    """
+    Clusters independientes de filas banco (posiciones en sobrantes_b). Dos filas solo compiten
+    por un mismo candidato PILAGA si tienen el mismo signo y sus ventanas se solapan (fechas a
+    <= 2 x ventana); los clusters son las componentes conexas de ese solapamiento. Una fila sin
+    fecha toma candidatos de cualquier fecha, así que arrastra toda su partición de signo.
+    """
+    montos = sobrantes_b["monto"].to_numpy(dtype=float)
+    fechas = sobrantes_b["fecha"]
+    t = fechas.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    has_date = ~fechas.isna().to_numpy()
+    reach = 2 * pd.to_timedelta(days_window, unit="D").value
+
+    # monto NaN nunca tiene candidatos: cada una queda sola
+    clusters: list[list[int]] = [[int(i)] for i in np.flatnonzero(np.isnan(montos))]
+    for side in (montos >= 0, montos < 0):
+        members = np.flatnonzero(side)
+        if len(members) == 0:
+            continue
+        if not has_date[members].all():
+            clusters.append(members.tolist())
+            continue
+        members = members[np.argsort(t[members], kind="stable")]
+        cuts = np.flatnonzero(np.diff(t[members]) > reach) + 1
+        clusters.extend(part.tolist() for part in np.split(members, cuts))
+    return clusters
+
+
+def _balance_chunks(clusters: list[list[int]], n_chunks: int) -> list[list[int]]:
+    """Reparte clusters en n_chunks por cantidad de filas (el más grande al más liviano)."""
+    bins: list[list[int]] = [[] for _ in range(n_chunks)]
+    loads = [0] * n_chunks
+    for cluster in sorted(clusters, key=len, reverse=True):
+        k = loads.index(min(loads))
+        bins[k].extend(cluster)
+        loads[k] += len(cluster)
+    return [sorted(b) for b in bins if b]
+
+
+class _N1Budget:
+    """
+    Presupuesto de las fases N→1 de una corrida: tiempo (deadline en time.time(), comparable entre
+    procesos) y pasos (filas objetivo exploradas, en orden de prioridad). 0/None = sin límite.
+    order / pending: filas objetivo que recorrió la última fase (en orden) y las que dejó sin explorar.
+    """
+
+    def __init__(self, time_s: Optional[float] = None, steps: Optional[int] = None):
+        self.time_s = float(time_s or 0)
+        self.steps_limit = int(steps or 0)
+        self.deadline = time.time() + self.time_s if self.time_s > 0 else None
+        self.steps = 0
+        self.order: list[int] = []
+        self.pending: list[int] = []
+
+    def max_seq(self) -> Optional[int]:
+        return self.steps_limit - self.steps if self.steps_limit > 0 else None
+
+    def share(self, fraction: float) -> "_N1Budget":
+        """Presupuesto de una fase: hasta fraction del tiempo de la corrida, sin pasar su deadline ni sus pasos."""
+        sub = _N1Budget(self.time_s, self.steps_limit)
+        sub.steps = self.steps
+        if self.deadline is not None:
+            sub.deadline = min(self.deadline, time.time() + fraction * self.time_s)
+        return sub
+
+
+def _build_groups_pipeline(
+    df_p: pd.DataFrame,
+    df_b: pd.DataFrame,
+    used_p: set[int],
+    used_b: set[int],
+    days_window: int,
+    tol_amount: float,
+    estado: str,
+    min_combo: int = 2,
+    index: Optional[_CandidateIndex] = None,
+    workers: Optional[int] = None,
+    budget: Optional[_N1Budget] = None,
+    bank_order: Optional[list[int]] = None,
+):
+    """
+    Genera grupos N→1 usando sobrantes actuales. Marca usados banco/PILAGA.
+    index: índice de candidatos PILAGA compartido entre fases (si no, se arma con used_p).
+    workers: procesos para resolver clusters independientes (default Var.N1_PARALLEL_WORKERS);
+    el merge respeta el orden global de filas banco, así el resultado es el mismo que en secuencial.
+    budget: corta la fase al agotarse; las filas sin explorar quedan en budget.pending.
+    bank_order: ids banco a explorar en ese orden (retomar una fase cortada); si no, todos los
+    sobrantes por |monto| desc.
+    """
+    if index is None:
+        index = _CandidateIndex(df_p, "_row_id_p", used_p)
+    workers = Var.N1_PARALLEL_WORKERS if workers is None else int(workers)
+
+    if bank_order is None:
+        sobrantes_b = df_b[~df_b["_row_id_b"].isin(used_b)].copy()
+    else:
+        sobrantes_b = df_b.iloc[pd.Index(df_b["_row_id_b"]).get_indexer(bank_order)].copy()
+    sobrantes_b["fecha"] = pd.to_datetime(sobrantes_b["fecha"], errors="coerce")
+    sobrantes_b["monto"] = pd.to_numeric(sobrantes_b["monto"], errors="coerce")
+
+    if bank_order is None:
+        sobrantes_b = sobrantes_b.sort_values(by="monto", key=lambda s: s.abs(), ascending=False)
+    params = dict(index=index, days_window=days_window, tol_amount=tol_amount, estado=estado, min_combo=min_combo)
+    if budget is not None:
+        params.update(deadline=budget.deadline, max_seq=budget.max_seq())
+
+    chunks: list[list[int]] = []
+    if workers > 1 and len(sobrantes_b) >= Var.N1_PARALLEL_MIN_ROWS:
+        chunks = _balance_chunks(_n1_clusters(sobrantes_b, days_window), workers)
+    if len(chunks) > 1:
+        parts = map_cpu(
+            functools.partial(_n1_chunk, **params),
+            [(sobrantes_b.iloc[c], c) for c in chunks],
+            workers,
+        )
+        found = sorted((item for part, _ in parts for item in part), key=lambda item: item[0])
+        unexplored = sorted(seq for _, rest in parts for seq in rest)
+        # Los workers marcaron sus copias del índice: replicar en el compartido
+        for _, g in found:
+            index.mark_used(g["_row_ids_p"])
+    else:
+        found, unexplored = _n1_groups_for_rows(sobrantes_b, list(range(len(sobrantes_b))), **params)
+
+    if budget is not None:
+        budget.steps += len(sobrantes_b) - len(unexplored)
+        budget.order = sobrantes_b["_row_id_b"].astype(int).tolist()
+        budget.pending = [budget.order[i] for i in unexplored]
+
+    groups: list[dict] = []
+    total_amount = 0.0
+    for _, g in found:
+        used_b.add(g["_row_id_b"])
+        used_p.update(g["_row_ids_p"])
+        groups.append(g)
+        total_amount += sum(r["monto"] for r in g["pilaga_rows"])
+
+    return groups, round(total_amount, 2), used_p, used_b
 
 def _build_groups_pipeline_bank_to_pilaga(
     df_p: pd.DataFrame,
@@ -246,53 +487,44 @@ def _build_groups_pipeline_bank_to_pilaga(
     tol_amount: float,
     estado: str,
     min_combo: int = 2,
+    index: Optional[_CandidateIndex] = None,
+    budget: Optional[_N1Budget] = None,
+    pilaga_order: Optional[list[int]] = None,
 ):
     """
     Variante simétrica 1→N: combina movimientos de BANCO (mismo signo) para acercarse
     a un movimiento de PILAGA dentro de tolerancia.
+    index: candidatos banco (_CandidateIndex sobre df_b); si no, se arma con used_b.
+    budget / pilaga_order: como budget / bank_order en _build_groups_pipeline, con filas PILAGA.
     """
     groups: list[dict] = []
     total_amount = 0.0
 
-    # Filtrar sobrantes según usados actuales
-    sobrantes_p = df_p[~df_p["_row_id_p"].isin(used_p)].copy()
-    sobrantes_b = df_b[~df_b["_row_id_b"].isin(used_b)].copy()
+    if index is None:
+        index = _CandidateIndex(df_b, "_row_id_b", used_b)
 
+    # Sobrantes PILAGA (objetivos) en su orden original, o los que quedaron pendientes
+    if pilaga_order is None:
+        sobrantes_p = df_p[~df_p["_row_id_p"].isin(used_p)].copy()
+    else:
+        sobrantes_p = df_p.iloc[pd.Index(df_p["_row_id_p"]).get_indexer(pilaga_order)].copy()
     sobrantes_p["fecha"] = pd.to_datetime(sobrantes_p["fecha"], errors="coerce")
-    sobrantes_b["fecha"] = pd.to_datetime(sobrantes_b["fecha"], errors="coerce")
     sobrantes_p["monto"] = pd.to_numeric(sobrantes_p["monto"], errors="coerce")
-    sobrantes_b["monto"] = pd.to_numeric(sobrantes_b["monto"], errors="coerce")
+
+    deadline = budget.deadline if budget is not None else None
+    max_seq = budget.max_seq() if budget is not None else None
+    explored = len(sobrantes_p)
 
     # Recorremos PILAGA como objetivo; candidatos: banco
-    for _, pilaga_row in sobrantes_p.iterrows():
+    for k, (_, pilaga_row) in enumerate(sobrantes_p.iterrows()):
+        if (max_seq is not None and k >= max_seq) or (k and deadline is not None and time.time() >= deadline):
+            explored = k
+            break
         target = float(pilaga_row["monto"])
-        sign = 1 if target >= 0 else -1
         fecha_p = pilaga_row["fecha"]
         row_id_p = int(pilaga_row["_row_id_p"])
 
-        cands_df = sobrantes_b[
-            (sobrantes_b["monto"].apply(lambda x: (x >= 0) == (sign >= 0))) &
-            (~sobrantes_b["_row_id_b"].isin(used_b))
-        ].copy()
-
-        if fecha_p is not None and pd.notna(fecha_p):
-            cands_df = cands_df[
-                cands_df["fecha"].notna() &
-                ((cands_df["fecha"] - fecha_p).abs() <= pd.to_timedelta(days_window, unit="D"))
-            ]
-
-        cands_df = cands_df[abs(cands_df["monto"]) <= abs(target) + tol_amount]
-        cands_df = cands_df.sort_values(by="monto", key=lambda s: s.abs(), ascending=False).head(N1_CAND_LIMIT_DEFAULT)
-
-        candidates = []
-        for _, row in cands_df.iterrows():
-            candidates.append({
-                "_row_id_b": int(row["_row_id_b"]),
-                "fecha": row["fecha"],
-                "monto": float(row["monto"]),
-                "documento": row.get("documento", ""),
-            })
-
+        candidates = index.candidates(target, fecha_p, days_window, tol_amount, N1_CAND_LIMIT_DEFAULT)
         if not candidates:
             continue
 
@@ -304,6 +536,7 @@ def _build_groups_pipeline_bank_to_pilaga(
         used_p.add(row_id_p)
         for c in combo:
             used_b.add(c["_row_id_b"])
+        index.mark_used(c["_row_id_b"] for c in combo)
 
         bank_rows = [_prepare_row(pd.Series(c)) for c in combo]
         grupo_sum = sum(c["monto"] for c in combo)
@@ -319,61 +552,238 @@ def _build_groups_pipeline_bank_to_pilaga(
         })
         total_amount += grupo_sum
 
+    if budget is not None:
+        budget.steps += explored
+        budget.order = sobrantes_p["_row_id_p"].astype(int).tolist()
+        budget.pending = budget.order[explored:]
+
     return groups, round(total_amount, 2), used_p, used_b
 
 
-def _compute_pipeline(df_pilaga: pd.DataFrame, df_banco: pd.DataFrame, days_window: int):
-    """Particiona en pares 1→1, agrupados (≤$1), sugeridos (>$1 hasta tol sugerida) y sobrantes."""
-    t_start_total = time.perf_counter()
-    timings: dict[str, float] = {}
+def _merge_in_order(prev: list[dict], found: list[dict], order: list[int], key: str = "_row_id_b") -> list[dict]:
+    """Grupos de una fase retomada en el orden de prioridad original de sus filas objetivo."""
+    if not prev:
+        return found
+    rank = {rid: i for i, rid in enumerate(order)}
+    return sorted(prev + found, key=lambda g: rank[g[key]])
+
+
+def _filter_suggested(groups: list[dict]) -> list[dict]:
+    """Sugeridos N→1 sin los que ya entran en la tolerancia estricta."""
+    return [g for g in groups if abs(float(g.get("diff", 0.0))) > N1_TOL_APPROVED]
+
+
+def _used_by_results(pairs_df: pd.DataFrame, groups: list[dict]) -> Tuple[set[int], set[int]]:
+    """Ids PILAGA / banco ocupados por los pares 1→1 y los grupos (en cualquier dirección)."""
+    used_p: set[int] = set(pairs_df.get("_row_id_p", [])) if "_row_id_p" in pairs_df.columns else set()
+    used_b: set[int] = set(pairs_df.get("_row_id_b", [])) if "_row_id_b" in pairs_df.columns else set()
+    for g in groups:
+        if "bank_row" in g and g.get("_row_id_b") is not None:
+            used_b.add(int(g.get("_row_id_b")))
+        if "pilaga_row" in g and g.get("_row_id_p") is not None:
+            used_p.add(int(g.get("_row_id_p")))
+        for pid in g.get("_row_ids_p", []):
+            used_p.add(int(pid))
+        for bid in g.get("_row_ids_b", []):
+            used_b.add(int(bid))
+    return used_p, used_b
 
-    # preparar copias con ids
+
+def _n1_checkpoint_key(p: pd.DataFrame, b: pd.DataFrame, days_window: int) -> str:
+    """Clave del checkpoint N→1: contenido de ambos lados + parámetros de la búsqueda."""
+    h = hashlib.sha256()
+    for df in (p, b):
+        cols = [c for c in ("fecha", "monto", "documento") if c in df.columns]
+        h.update(pd.util.hash_pandas_object(df[cols], index=False).to_numpy().tobytes())
+        h.update(b"|")
+    params = (days_window, N1_MAX_COMBO_DEFAULT, N1_TOL_APPROVED, N1_TOL_SUGGESTED, N1_CAND_LIMIT_DEFAULT, N1_COMBO_MODE_DEFAULT,
+              Var.REF_MATCH_ENABLED, Var.REF_MATCH_MAX_DAYS)  # los pares por referencia cambian los sobrantes
+    h.update(repr(params).encode())
+    return h.hexdigest()
+
+
+def _frame_fingerprint(df: pd.DataFrame) -> str:
+    """Huella del contenido del frame (columnas + valores) para las claves de las etapas."""
+    h = hashlib.sha256(repr(list(df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _stage_pairs(df_pilaga: pd.DataFrame, df_banco: pd.DataFrame, days_window: int) -> dict:
+    """Etapa 1→1: frames con ids + pares (referencia, después monto/fecha)."""
+    t0 = time.perf_counter()
     p = df_pilaga.reset_index(drop=True).copy()
     b = df_banco.reset_index(drop=True).copy()
     p["_row_id_p"] = range(len(p))
     b["_row_id_b"] = range(len(b))
-
-    # 1→1
     pairs_df, used_p, used_b = _compute_pairs(p, b, days_window)
-    timings["pairs"] = time.perf_counter() - t_start_total
-    t_after_pairs = time.perf_counter()
+    return {"p": p, "b": b, "pairs_df": pairs_df, "used_p": used_p, "used_b": used_b,
+            "seconds": time.perf_counter() - t0}
 
-    # Aprobados (tol estricta). min_combo=2 mantiene comportamiento previo (N→1 real).
-    approved, _, used_p, used_b = _build_groups_pipeline(
-        p, b, used_p, used_b, days_window, N1_TOL_APPROVED, "approved", min_combo=2
+
+def _stage_n1(
+    pairs: dict,
+    days_window: int,
+    resume: bool = False,
+    time_budget_s: Optional[float] = None,
+    step_budget: Optional[int] = None,
+    progress: Optional[Callable[..., None]] = None,
+) -> dict:
+    """
+    Etapa N→1: aprobados (≤$1), sugeridos (>$1 hasta tol sugerida) y 1→N banco→PILAGA sobre lo
+    que dejó libre el 1→1. Las tres fases comparten presupuesto y checkpoint, por eso son una etapa.
+
+    Corren con presupuesto (default Var.N1_TIME_BUDGET_S / Var.N1_STEP_BUDGET). Si se agota,
+    devuelve lo encontrado hasta ahí, guarda el estado y n1_search["complete"] queda en False;
+    con resume=True la búsqueda sigue desde ese estado (mismo resultado final que sin cortes).
+    Fases: approved -> suggested -> bank_to_pilaga (1→N, hasta Var.N1_B2P_TIME_FRACTION del tiempo) -> done.
+    progress(fase, groups=..., **datos): aviso al terminar aprobados y sugeridos, con los grupos de
+    la fase (jobs de /start; puede cortar la corrida con JobCancelled).
+    """
+    t_start = time.perf_counter()
+    timings: dict[str, float] = {}
+    p, b, pairs_df = pairs["p"], pairs["b"], pairs["pairs_df"]
+    # Copias: los sets de la etapa 1→1 pueden venir del memo
+    used_p, used_b = set(pairs["used_p"]), set(pairs["used_b"])
+
+    budget = _N1Budget(
+        Var.N1_TIME_BUDGET_S if time_budget_s is None else time_budget_s,
+        Var.N1_STEP_BUDGET if step_budget is None else step_budget,
     )
-    timings["n1_approved"] = time.perf_counter() - t_after_pairs
+    checkpoint_key = _n1_checkpoint_key(p, b, days_window)
+    state = _N1_CHECKPOINTS.get(checkpoint_key) if resume else None
+
+    # Estado N→1: fase en curso, su orden de filas objetivo y las que le faltan (None = todos los sobrantes)
+    approved: list[dict] = []
+    suggested: list[dict] = []
+    bank_to_pilaga: list[dict] = []
+    phase, order, pending = "approved", None, None
+    if state is not None:
+        approved, suggested, bank_to_pilaga = state["approved"], state["suggested"], state["bank_to_pilaga"]
+        used_p, used_b = set(state["used_p"]), set(state["used_b"])
+        phase, order, pending = state["phase"], state["order_b"], state["pending_b"]
+
+    # Índice de candidatos PILAGA: se arma una vez y lo comparten aprobados y sugeridos
+    index_p = _CandidateIndex(p, "_row_id_p", used_p)
+
+    # Aprobados (tol estricta). min_combo=2 mantiene comportamiento previo (N→1 real).
+    if phase == "approved":
+        found, _, used_p, used_b = _build_groups_pipeline(
+            p, b, used_p, used_b, days_window, N1_TOL_APPROVED, "approved", min_combo=2, index=index_p,
+            budget=budget, bank_order=pending,
+        )
+        order = order or budget.order
+        approved = _merge_in_order(approved, found, order)
+        if budget.pending:
+            pending = budget.pending
+        else:
+            phase, order, pending = "suggested", None, None
+    timings["n1_approved"] = time.perf_counter() - t_start
+    if progress is not None:
+        progress("approved", rows={"agrupados": len(approved)}, phase_complete=phase != "approved", groups=approved)
     t_after_approved = time.perf_counter()
 
     # Sugeridos (tol laxa), excluyendo diff <= tol estricta.
     # Permitimos min_combo=1 para incluir casos 1→1 aproximados (|diff|<=tol_suggested).
-    suggested, _, used_p, used_b = _build_groups_pipeline(
-        p, b, used_p, used_b, days_window, N1_TOL_SUGGESTED, "suggested", min_combo=1
-    )
-    suggested = [g for g in suggested if abs(float(g.get("diff", 0.0))) > N1_TOL_APPROVED]
+    if phase == "suggested":
+        found, _, used_p, used_b = _build_groups_pipeline(
+            p, b, used_p, used_b, days_window, N1_TOL_SUGGESTED, "suggested", min_combo=1, index=index_p,
+            budget=budget, bank_order=pending,
+        )
+        order = order or budget.order
+        suggested = _merge_in_order(suggested, found, order)
+        if budget.pending:
+            pending = budget.pending
+        else:
+            phase, order, pending = "bank_to_pilaga", None, None
     timings["n1_suggested"] = time.perf_counter() - t_after_approved
     t_after_suggested = time.perf_counter()
 
-    # Nota: fase 1→N banco->PILAGA desactivada por performance y porque el caso real es N PILAGA → 1 banco.
-    timings["n1_suggested_bank_to_pilaga"] = 0.0
+    # 1→N banco→PILAGA (un PILAGA saldado con varios débitos banco) sobre lo que quedó libre tras
+    # los sugeridos filtrados. Candidatos banco indexados y tiempo acotado a una fracción del presupuesto.
+    if phase == "bank_to_pilaga" and Var.N1_B2P_TIME_FRACTION <= 0:
+        phase, order, pending = "done", None, None
+    if phase == "bank_to_pilaga":
+        used_p_free, used_b_free = _used_by_results(pairs_df, approved + _filter_suggested(suggested) + bank_to_pilaga)
+        phase_budget = budget.share(Var.N1_B2P_TIME_FRACTION)
+        found, _, _, _ = _build_groups_pipeline_bank_to_pilaga(
+            p, b, used_p_free, used_b_free, days_window, N1_TOL_SUGGESTED, "suggested", min_combo=2,
+            budget=phase_budget, pilaga_order=pending,
+        )
+        budget.steps = phase_budget.steps
+        order = order or phase_budget.order
+        bank_to_pilaga = _merge_in_order(bank_to_pilaga, found, order, key="_row_id_p")
+        if phase_budget.pending:
+            pending = phase_budget.pending
+        else:
+            phase, order, pending = "done", None, None
+    timings["n1_suggested_bank_to_pilaga"] = time.perf_counter() - t_after_suggested
+
+    complete = phase == "done"
+    if progress is not None:
+        found = _filter_suggested(suggested) + bank_to_pilaga
+        progress("suggested", rows={"sugeridos": len(found)}, phase_complete=complete, groups=found)
+    if complete:
+        _N1_CHECKPOINTS.discard(checkpoint_key)
+    else:
+        _N1_CHECKPOINTS.put(checkpoint_key, {
+            "phase": phase,
+            "order_b": order,
+            "pending_b": pending,
+            "approved": approved,
+            "suggested": suggested,
+            "bank_to_pilaga": bank_to_pilaga,
+            "used_p": sorted(int(i) for i in used_p),
+            "used_b": sorted(int(i) for i in used_b),
+        })
+    pending_ids = pending or []
+    pending_pilaga = phase == "bank_to_pilaga"
+    n1_search = {
+        "complete": complete,
+        "resumed": state is not None,
+        "phase": None if complete else phase,
+        "explored_rows": budget.steps,
+        "pending_bank_rows": 0 if pending_pilaga else len(pending_ids),
+        "pending_pilaga_rows": len(pending_ids) if pending_pilaga else 0,
+        "pending_rows": _rows_for_ui((p if pending_pilaga else b).iloc[pending_ids], limit=500),
+        "budget": {"time_s": budget.time_s, "steps": budget.steps_limit, "b2p_fraction": Var.N1_B2P_TIME_FRACTION},
+    }
+
+    # Los 1→N banco→PILAGA se muestran con los sugeridos (direction = "bank_to_pilaga")
+    return {
+        "approved": approved,
+        "suggested": _filter_suggested(suggested) + bank_to_pilaga,
+        "n1_search": n1_search,
+        "timings": timings,
+        "seconds": time.perf_counter() - t_start,
+    }
+
+
+def _stage_pipeline(pairs: dict, n1: Optional[dict] = None) -> dict:
+    """
+    Partición final: pares, agrupados, sugeridos, sobrantes y timings.
+    n1=None: solo 1→1 (sobrantes antes de la búsqueda N→1, complete=False, n1_search=None).
+    """
+    t0 = time.perf_counter()
+    pairs_df, p, b = pairs["pairs_df"], pairs["p"], pairs["b"]
+    approved = n1["approved"] if n1 is not None else []
+    suggested = n1["suggested"] if n1 is not None else []
 
     # Recalcular conjuntos usados a partir de los resultados finales (para evitar marcar combinaciones filtradas)
-    used_p_final: set[int] = set(pairs_df.get("_row_id_p", [])) if "_row_id_p" in pairs_df.columns else set()
-    used_b_final: set[int] = set(pairs_df.get("_row_id_b", [])) if "_row_id_b" in pairs_df.columns else set()
-    for g in approved + suggested:
-        if "bank_row" in g and g.get("_row_id_b") is not None:
-            used_b_final.add(int(g.get("_row_id_b")))
-        if "pilaga_row" in g and g.get("_row_id_p") is not None:
-            used_p_final.add(int(g.get("_row_id_p")))
-        for pid in g.get("_row_ids_p", []):
-            used_p_final.add(int(pid))
-        for bid in g.get("_row_ids_b", []):
-            used_b_final.add(int(bid))
+    used_p_final, used_b_final = _used_by_results(pairs_df, approved + suggested)
 
     # Sobrantes finales
     sobrantes_p = p[~p["_row_id_p"].isin(used_p_final)].drop(columns=["_row_id_p"], errors="ignore").copy()
     sobrantes_b = b[~b["_row_id_b"].isin(used_b_final)].drop(columns=["_row_id_b"], errors="ignore").copy()
-    timings["total"] = time.perf_counter() - t_start_total
+
+    n1_timings = n1["timings"] if n1 is not None else {}
+    timings = {
+        "pairs": pairs["seconds"],
+        "n1_approved": n1_timings.get("n1_approved", 0.0),
+        "n1_suggested": n1_timings.get("n1_suggested", 0.0),
+        "n1_suggested_bank_to_pilaga": n1_timings.get("n1_suggested_bank_to_pilaga", 0.0),
+    }
+    timings["total"] = pairs["seconds"] + (n1["seconds"] if n1 is not None else 0.0) + time.perf_counter() - t0
 
     return {
         "pairs_df": pairs_df,
@@ -382,7 +792,103 @@ def _compute_pipeline(df_pilaga: pd.DataFrame, df_banco: pd.DataFrame, days_wind
         "sobrantes_p": sobrantes_p,
         "sobrantes_b": sobrantes_b,
         "timings": timings,
+        "n1_search": n1["n1_search"] if n1 is not None else None,
+        "complete": n1 is not None and n1["n1_search"]["complete"],
+    }
+
+
+def _pairs_config() -> tuple:
+    return (Var.REF_MATCH_ENABLED, Var.REF_MATCH_MAX_DAYS)  # los pares por referencia cambian la etapa
+
+
+def _n1_config() -> tuple:
+    return (N1_MAX_COMBO_DEFAULT, N1_TOL_APPROVED, N1_TOL_SUGGESTED, N1_CAND_LIMIT_DEFAULT, N1_COMBO_MODE_DEFAULT,
+            Var.N1_TIME_BUDGET_S, Var.N1_STEP_BUDGET, Var.N1_B2P_TIME_FRACTION)
+
+
+# Pipeline como DAG: pairs <- n1 <- pipeline. "pairs" alcanza para la card de pares y los totales del
+# head; solo "pipeline" espera la búsqueda N→1. Salidas de pairs/n1 memoizadas por huella de entradas.
+_STAGES = StageGraph(
+    [
+        Stage("pairs", _stage_pairs, ("df_pilaga", "df_banco", "days_window"), config=_pairs_config),
+        # Cortada por presupuesto depende del reloj (no de la clave): solo se memoiza completa
+        Stage("n1", _stage_n1, ("pairs", "days_window", "resume", "time_budget_s", "step_budget", "progress"),
+              volatile=("resume", "progress"), config=_n1_config,
+              cacheable=lambda out: bool(out["n1_search"]["complete"])),
+        Stage("pipeline", _stage_pipeline, ("pairs", "n1"), memo=False),  # armado barato: no se guarda
+    ],
+    store=RunStore(Var.STAGE_STORE_DIR, Var.STAGE_STORE_MAX_ENTRIES, Var.STAGE_STORE_TTL_SECONDS),
+)
+
+
+def _compute_pipeline(
+    df_pilaga: pd.DataFrame,
+    df_banco: pd.DataFrame,
+    days_window: int,
+    *,
+    resume: bool = False,
+    time_budget_s: Optional[float] = None,
+    step_budget: Optional[int] = None,
+    stage: str = "pipeline",
+    memo: bool = False,
+    progress: Optional[Callable[..., None]] = None,
+):
+    """
+    Particiona en pares 1→1, agrupados (≤$1), sugeridos (>$1 hasta tol sugerida) y sobrantes
+    evaluando el DAG _STAGES hasta `stage` ("pairs" devuelve la salida de la etapa 1→1 sola).
+
+    memo=True: reusa las etapas ya calculadas con el mismo contenido y parámetros (y guarda las
+    nuevas); resume=True recalcula igual la etapa N→1 (sigue desde su checkpoint, ver _stage_n1).
+    pipeline["stages"]: etapa -> "memo" | "computed".
+    progress(fase, **datos): aviso por fase resuelta ("pairs" con la salida de la etapa, "approved" / "suggested" con
+    groups; ver _stage_n1).
+    """
+    params = {
+        "df_pilaga": df_pilaga,
+        "df_banco": df_banco,
+        "days_window": int(days_window),
+        "resume": bool(resume),
+        "time_budget_s": time_budget_s,
+        "step_budget": step_budget,
+        "progress": progress,
     }
+    keys = {"df_pilaga": _frame_fingerprint(df_pilaga), "df_banco": _frame_fingerprint(df_banco)} if memo else None
+    trace: dict[str, str] = {}
+    out = _STAGES.evaluate(stage, params, keys=keys, refresh=("n1",) if resume else (), memo=memo, trace=trace,
+                           on_stage=_stage_progress(progress) if progress is not None else None)
+    return {**out, "stages": trace}
+
+
+def _stage_progress(progress: Callable[..., None]) -> Callable[[str, Any, str], None]:
+    """on_stage del DAG -> avisos por fase; la N→1 calculada avisa sola desde _stage_n1."""
+    def on_stage(name: str, out: Any, status: str) -> None:
+        if name == "pairs":
+            progress("pairs", rows={"pares": int(len(out["pairs_df"]))}, memo=status == MEMO, pairs=out)
+        elif name == "n1" and status == MEMO:
+            complete = out["n1_search"]["complete"]
+            progress("approved", rows={"agrupados": len(out["approved"])}, phase_complete=True, memo=True,
+                     groups=out["approved"])
+            progress("suggested", rows={"sugeridos": len(out["suggested"])}, phase_complete=complete, memo=True,
+                     groups=out["suggested"])
+    return on_stage
+
+
+def _pipeline_without_n1_wait(df_pilaga: pd.DataFrame, df_banco: pd.DataFrame, days_window: int) -> dict:
+    """
+    Pipeline sin esperar la búsqueda N→1: etapa 1→1 (memoizada) + la N→1 solo si ya estaba
+    memoizada para estos frames; si no, sobrantes del 1→1 con complete=False y stages["n1"] = "pending".
+    """
+    pairs = _compute_pipeline(df_pilaga, df_banco, days_window, stage="pairs", memo=True)
+    keys = {
+        "df_pilaga": _frame_fingerprint(df_pilaga),
+        "df_banco": _frame_fingerprint(df_banco),
+        "days_window": int(days_window),
+        "time_budget_s": None,
+        "step_budget": None,
+    }
+    n1 = _STAGES.peek("n1", keys)
+    out = _stage_pipeline(pairs, n1)
+    return {**out, "stages": {**pairs["stages"], "n1": MEMO if n1 is not None else "pending"}}
 
 
 def _build_n1_groups(
@@ -478,6 +984,127 @@ def _build_n1_groups(
     return groups, round(total_amount, 2)
 
 
+# =========================
+# Cálculo por endpoint (corre en el pool de procesos: funciones de módulo, resultado picklable)
+# =========================
+def _pipeline_for(
+    uri_extracto: str,
+    uri_contable: str,
+    days_window: int,
+    resume: bool = False,
+    run_id: Optional[str] = None,
+    stage: str = "pipeline",
+) -> Tuple[dict, int]:
+    """
+    (pipeline, days_window): el de la corrida guardada si hay run_id (RunNotFoundError si no está o es
+    de otros archivos, ver _stored_run), si no se evalúa el DAG hasta `stage` reusando las etapas memoizadas.
+    """
+    if run_id:
+        run = _stored_run(run_id, uri_extracto, uri_contable, days_window)
+        return run["pipeline"], run["days_window"]
+    df_pilaga, df_banco = _load_frames(uri_extracto, uri_contable)
+    return _compute_pipeline(df_pilaga, df_banco, days_window, resume=resume, stage=stage, memo=True), days_window
+
+
+def _details_sobrantes(uri_extracto: str, uri_contable: str, days_window: int, resume: bool = False, run_id: Optional[str] = None) -> dict:
+    pipeline, days_window = _pipeline_for(uri_extracto, uri_contable, days_window, resume, run_id)
+
+    sobrantes_p = pipeline["sobrantes_p"]
+    sobrantes_b = pipeline["sobrantes_b"]
+
+    return {
+        "ok": True,
+        "no_en_banco_rows": _rows_for_ui(sobrantes_p, limit=500),
+        "no_en_pilaga_rows": _rows_for_ui(sobrantes_b, limit=500),
+        "counts": {
+            "no_en_banco": int(len(sobrantes_p)),
+            "no_en_pilaga": int(len(sobrantes_b)),
+        },
+        "complete": pipeline["n1_search"]["complete"],
+        "n1_search": pipeline["n1_search"],
+        "run_id": run_id,
+    }
+
+
+def _sobrantes_out(sobrantes: pd.DataFrame, days_window: int, n1_search: dict, run_id: Optional[str] = None) -> dict:
+    rows = _rows_for_ui(sobrantes, limit=1000)
+    total_amount = float(pd.to_numeric(sobrantes["monto"], errors="coerce").fillna(0).sum()) if not sobrantes.empty else 0.0
+    total_amount = round(total_amount, 2)
+    return {
+        "ok": True,
+        "total": int(len(sobrantes)),
+        "total_amount": total_amount,
+        "rows": rows,
+        "meta": {
+            "days_window": days_window,
+            "complete": n1_search["complete"],  # False: la búsqueda N→1 se cortó, pueden quedar filas por conciliar
+            "n1_search": n1_search,
+            "run_id": run_id,
+        },
+    }
+
+
+def _details_no_banco(uri_extracto: str, uri_contable: str, days_window: int, resume: bool = False, run_id: Optional[str] = None) -> dict:
+    pipeline, days_window = _pipeline_for(uri_extracto, uri_contable, days_window, resume, run_id)
+    return _sobrantes_out(pipeline["sobrantes_p"], days_window, pipeline["n1_search"], run_id)
+
+
+def _details_no_contable(uri_extracto: str, uri_contable: str, days_window: int, resume: bool = False, run_id: Optional[str] = None) -> dict:
+    pipeline, days_window = _pipeline_for(uri_extracto, uri_contable, days_window, resume, run_id)
+    return _sobrantes_out(pipeline["sobrantes_b"], days_window, pipeline["n1_search"], run_id)
+
+
+def _pairs_out(pairs_df: pd.DataFrame, days_window: int, run_id: Optional[str] = None, stages: Optional[dict] = None) -> dict:
+    rows = [_serialize_pair(row) for _, row in pairs_df.iterrows()]
+    total_amount = sum(r.get("monto") or 0 for r in rows)
+
+    return {
+        "ok": True,
+        "total": len(rows),
+        "total_amount": round(total_amount, 2),
+        "rows": rows,
+        "meta": {
+            "days_window": days_window,
+            "run_id": run_id,
+            "stages": stages,
+        },
+    }
+
+
+def _details_pares(uri_extracto: str, uri_contable: str, days_window: int, run_id: Optional[str] = None) -> dict:
+    # Sin run_id alcanza la etapa 1→1: no espera la búsqueda N→1
+    pipeline, days_window = _pipeline_for(uri_extracto, uri_contable, days_window, run_id=run_id, stage="pairs")
+    return _pairs_out(pipeline["pairs_df"], days_window, run_id, pipeline.get("stages"))
+
+
+def _n1_out(rows: list[dict], estado: str, days_window: int, n1_search: Optional[dict] = None, run_id: Optional[str] = None) -> dict:
+    """Card N→1; n1_search=None: fase recién terminada dentro de una corrida en curso (complete=False)."""
+    total_amount = sum((r.get("monto_total") or 0) for r in rows)
+    return {
+        "ok": True,
+        "total": len(rows),
+        "total_amount": round(total_amount, 2),
+        "rows": rows,
+        "meta": {
+            "days_window": days_window,
+            "max_combo": N1_MAX_COMBO_DEFAULT,
+            "tol_amount": N1_TOL_APPROVED if estado == "approved" else N1_TOL_SUGGESTED,
+            "cand_limit": N1_CAND_LIMIT_DEFAULT,
+            "complete": bool(n1_search and n1_search["complete"]),  # False: presupuesto agotado, reintentar con resume=1
+            "n1_search": n1_search,
+            "run_id": run_id,
+        },
+    }
+
+
+def _details_n1(
+    uri_extracto: str, uri_contable: str, days_window: int, estado: str, resume: bool = False, run_id: Optional[str] = None
+) -> dict:
+    """estado: 'approved' (card agrupados) | 'suggested' (card sugeridos)."""
+    pipeline, days_window = _pipeline_for(uri_extracto, uri_contable, days_window, resume, run_id)
+    return _n1_out(pipeline[estado], estado, days_window, pipeline["n1_search"], run_id)
+
+
 @post("/api/reconcile/details")
 async def reconcile_details(request: Any) -> Response:
     """
@@ -485,6 +1112,8 @@ async def reconcile_details(request: Any) -> Response:
       - uri_extracto  (obligatorio)
       - uri_contable  (obligatorio)
       - days_window   (opcional, default 5)
+      - resume        (opcional, 1 = retomar la búsqueda N→1 cortada por presupuesto)
+      - run_id        (opcional: corrida de /api/reconcile/start; reemplaza a las URIs y no recalcula)
     Devuelve:
       {
         ok: True,
@@ -496,28 +1125,18 @@ async def reconcile_details(request: Any) -> Response:
     try:
         form = await request.form()
         uri_extracto, uri_contable, days_window = _parse_common_form(form)
+        run_id = _parse_run_id(form)
+
+        if not run_id and (not uri_extracto or not uri_contable):
+            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable (o run_id)."}, status_code=400)
 
-        if not uri_extracto or not uri_contable:
-            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable."}, status_code=400)
-
-        df_pilaga, df_banco = _load_frames(uri_extracto, uri_contable)
-        pipeline = _compute_pipeline(df_pilaga, df_banco, days_window)
-
-        pairs_df = pipeline["pairs_df"]
-        sobrantes_p = pipeline["sobrantes_p"]
-        sobrantes_b = pipeline["sobrantes_b"]
-
-        out = {
-            "ok": True,
-            "no_en_banco_rows": _rows_for_ui(sobrantes_p, limit=500),
-            "no_en_pilaga_rows": _rows_for_ui(sobrantes_b, limit=500),
-            "counts": {
-                "no_en_banco": int(len(sobrantes_p)),
-                "no_en_pilaga": int(len(sobrantes_b)),
-            }
-        }
+        if not run_id:
+            run_id = await _coalesced_run_id(uri_extracto, uri_contable, days_window, resume=_parse_resume(form))
+        out = await run_in_pool(_details_sobrantes, uri_extracto, uri_contable, days_window, run_id=run_id)
         return Response(out, status_code=200)
 
+    except RunNotFoundError:
+        return _run_not_found(run_id)
     except Exception as e:
         return Response({"ok": False, "message": f"Error en details: {type(e).__name__}: {e}"}, status_code=500)
 
@@ -529,6 +1148,8 @@ async def reconcile_details_no_banco(request: Any) -> Response:
       - uri_extracto  (obligatorio)
       - uri_contable  (obligatorio)
       - days_window   (opcional, default 5)
+      - resume        (opcional, 1 = retomar la búsqueda N→1 cortada por presupuesto)
+      - run_id        (opcional: corrida de /api/reconcile/start; reemplaza a las URIs y no recalcula)
     Devuelve:
       {
         ok: True,
@@ -539,29 +1160,18 @@ async def reconcile_details_no_banco(request: Any) -> Response:
     try:
         form = await request.form()
         uri_extracto, uri_contable, days_window = _parse_common_form(form)
+        run_id = _parse_run_id(form)
 
-        if not uri_extracto or not uri_contable:
-            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable."}, status_code=400)
-
-        df_pilaga, df_banco = _load_frames(uri_extracto, uri_contable)
-
-        pipeline = _compute_pipeline(df_pilaga, df_banco, days_window)
-        sobrantes_p = pipeline["sobrantes_p"]
-
-        rows = _rows_for_ui(sobrantes_p, limit=1000)
-        total_amount = float(pd.to_numeric(sobrantes_p["monto"], errors="coerce").fillna(0).sum()) if not sobrantes_p.empty else 0.0
-        total_amount = round(total_amount, 2)
-        out = {
-            "ok": True,
-            "total": int(len(sobrantes_p)),
-            "total_amount": total_amount,
-            "rows": rows,
-            "meta": {
-                "days_window": days_window,
-            },
-        }
+        if not run_id and (not uri_extracto or not uri_contable):
+            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable (o run_id)."}, status_code=400)
+
+        if not run_id:
+            run_id = await _coalesced_run_id(uri_extracto, uri_contable, days_window, resume=_parse_resume(form))
+        out = await run_in_pool(_details_no_banco, uri_extracto, uri_contable, days_window, run_id=run_id)
         return Response(out, status_code=200)
 
+    except RunNotFoundError:
+        return _run_not_found(run_id)
     except Exception as e:
         return Response({"ok": False, "message": f"Error en detalle no-banco: {type(e).__name__}: {e}"}, status_code=500)
 
@@ -575,6 +1185,7 @@ async def reconcile_details_pares(request: Any) -> Response:
       - uri_extracto  (obligatorio)
       - uri_contable  (obligatorio)
       - days_window   (opcional, default 5)
+      - run_id        (opcional: corrida de /api/reconcile/start; reemplaza a las URIs y no recalcula)
     Respuesta:
       {
         ok: True,
@@ -584,34 +1195,29 @@ async def reconcile_details_pares(request: Any) -> Response:
           {fecha_banco, fecha_pilaga, monto, documento_banco, documento_pilaga, date_diff_days},
           ...
         ],
-        meta: { days_window }
+        meta: { days_window, run_id, stages }
       }
     """
     try:
         form = await request.form()
         uri_extracto, uri_contable, days_window = _parse_common_form(form)
-
-        if not uri_extracto or not uri_contable:
-            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable."}, status_code=400)
-
-        df_pilaga, df_banco = _load_frames(uri_extracto, uri_contable)
-        pipeline = _compute_pipeline(df_pilaga, df_banco, days_window)
-        pairs_df = pipeline["pairs_df"]
-
-        rows = [_serialize_pair(row) for _, row in pairs_df.iterrows()]
-        total_amount = sum(r.get("monto") or 0 for r in rows)
-
-        out = {
-            "ok": True,
-            "total": len(rows),
-            "total_amount": round(total_amount, 2),
-            "rows": rows,
-            "meta": {
-                "days_window": days_window,
-            },
-        }
+        run_id = _parse_run_id(form)
+
+        if not run_id and (not uri_extracto or not uri_contable):
+            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable (o run_id)."}, status_code=400)
+
+        if run_id:
+            out = await run_in_pool(_details_pares, uri_extracto, uri_contable, days_window, run_id=run_id)
+        else:
+            # Solo la etapa 1→1 (memoizada): la card no espera la búsqueda N→1 de la corrida completa
+            out = await _FLIGHTS.do(
+                _flight_key("pairs", uri_extracto, uri_contable, days_window),
+                lambda: run_in_pool(_details_pares, uri_extracto, uri_contable, days_window),
+            )
         return Response(out, status_code=200)
 
+    except RunNotFoundError:
+        return _run_not_found(run_id)
     except Exception as e:
         return Response({"ok": False, "message": f"Error en detalle pares: {type(e).__name__}: {e}"}, status_code=500)
 
@@ -623,6 +1229,8 @@ async def reconcile_details_no_contable(request: Any) -> Response:
       - uri_extracto  (obligatorio)
       - uri_contable  (obligatorio)
       - days_window   (opcional, default 5)
+      - resume        (opcional, 1 = retomar la búsqueda N→1 cortada por presupuesto)
+      - run_id        (opcional: corrida de /api/reconcile/start; reemplaza a las URIs y no recalcula)
     Devuelve:
       {
         ok: True,
@@ -634,29 +1242,18 @@ async def reconcile_details_no_contable(request: Any) -> Response:
     try:
         form = await request.form()
         uri_extracto, uri_contable, days_window = _parse_common_form(form)
+        run_id = _parse_run_id(form)
 
-        if not uri_extracto or not uri_contable:
-            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable."}, status_code=400)
-
-        df_pilaga, df_banco = _load_frames(uri_extracto, uri_contable)
-
-        pipeline = _compute_pipeline(df_pilaga, df_banco, days_window)
-        sobrantes_b = pipeline["sobrantes_b"]
-
-        rows = _rows_for_ui(sobrantes_b, limit=1000)
-        total_amount = float(pd.to_numeric(sobrantes_b["monto"], errors="coerce").fillna(0).sum()) if not sobrantes_b.empty else 0.0
-        total_amount = round(total_amount, 2)
-        out = {
-            "ok": True,
-            "total": int(len(sobrantes_b)),
-            "total_amount": total_amount,
-            "rows": rows,
-            "meta": {
-                "days_window": days_window,
-            },
-        }
+        if not run_id and (not uri_extracto or not uri_contable):
+            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable (o run_id)."}, status_code=400)
+
+        if not run_id:
+            run_id = await _coalesced_run_id(uri_extracto, uri_contable, days_window, resume=_parse_resume(form))
+        out = await run_in_pool(_details_no_contable, uri_extracto, uri_contable, days_window, run_id=run_id)
         return Response(out, status_code=200)
 
+    except RunNotFoundError:
+        return _run_not_found(run_id)
     except Exception as e:
         return Response({"ok": False, "message": f"Error en detalle no-contable: {type(e).__name__}: {e}"}, status_code=500)
 
@@ -670,6 +1267,8 @@ async def reconcile_details_n1_grupos(request: Any) -> Response:
       - uri_extracto  (obligatorio)
       - uri_contable  (obligatorio)
       - days_window   (opcional, default 5)
+      - resume        (opcional, 1 = retomar la búsqueda N→1 cortada por presupuesto)
+      - run_id        (opcional: corrida de /api/reconcile/start; reemplaza a las URIs y no recalcula)
     Respuesta:
       {
         ok: True,
@@ -684,35 +1283,24 @@ async def reconcile_details_n1_grupos(request: Any) -> Response:
           },
           ...
         ],
-        meta: { days_window }
+        meta: { days_window, ..., complete, n1_search }
       }
     """
     try:
         form = await request.form()
         uri_extracto, uri_contable, days_window = _parse_common_form(form)
+        run_id = _parse_run_id(form)
+
+        if not run_id and (not uri_extracto or not uri_contable):
+            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable (o run_id)."}, status_code=400)
 
-        if not uri_extracto or not uri_contable:
-            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable."}, status_code=400)
-
-        df_pilaga, df_banco = _load_frames(uri_extracto, uri_contable)
-
-        pipeline = _compute_pipeline(df_pilaga, df_banco, days_window)
-        rows = pipeline["approved"]
-        total_amount = sum((r.get("monto_total") or 0) for r in rows)
-        out = {
-            "ok": True,
-            "total": len(rows),
-            "total_amount": round(total_amount, 2),
-            "rows": rows,
-            "meta": {
-                "days_window": days_window,
-                "max_combo": N1_MAX_COMBO_DEFAULT,
-                "tol_amount": N1_TOL_APPROVED,
-                "cand_limit": N1_CAND_LIMIT_DEFAULT,
-            },
-        }
+        if not run_id:
+            run_id = await _coalesced_run_id(uri_extracto, uri_contable, days_window, resume=_parse_resume(form))
+        out = await run_in_pool(_details_n1, uri_extracto, uri_contable, days_window, "approved", run_id=run_id)
         return Response(out, status_code=200)
 
+    except RunNotFoundError:
+        return _run_not_found(run_id)
     except Exception as e:
         return Response({"ok": False, "message": f"Error en detalle n1/grupos: {type(e).__name__}: {e}"}, status_code=500)
 
@@ -726,6 +1314,8 @@ async def reconcile_details_n1_sugeridos(request: Any) -> Response:
       - uri_extracto  (obligatorio)
       - uri_contable  (obligatorio)
       - days_window   (opcional, default 5)
+      - resume        (opcional, 1 = retomar la búsqueda N→1 cortada por presupuesto)
+      - run_id        (opcional: corrida de /api/reconcile/start; reemplaza a las URIs y no recalcula)
     Respuesta:
       {
         ok: True,
@@ -740,34 +1330,23 @@ async def reconcile_details_n1_sugeridos(request: Any) -> Response:
           },
           ...
         ],
-        meta: { days_window }
+        meta: { days_window, ..., complete, n1_search }
       }
     """
     try:
         form = await request.form()
         uri_extracto, uri_contable, days_window = _parse_common_form(form)
+        run_id = _parse_run_id(form)
+
+        if not run_id and (not uri_extracto or not uri_contable):
+            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable (o run_id)."}, status_code=400)
 
-        if not uri_extracto or not uri_contable:
-            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable."}, status_code=400)
-
-        df_pilaga, df_banco = _load_frames(uri_extracto, uri_contable)
-
-        pipeline = _compute_pipeline(df_pilaga, df_banco, days_window)
-        rows = pipeline["suggested"]
-        total_amount = sum((r.get("monto_total") or 0) for r in rows)
-        out = {
-            "ok": True,
-            "total": len(rows),
-            "total_amount": round(total_amount, 2),
-            "rows": rows,
-            "meta": {
-                "days_window": days_window,
-                "max_combo": N1_MAX_COMBO_DEFAULT,
-                "tol_amount": N1_TOL_SUGGESTED,
-                "cand_limit": N1_CAND_LIMIT_DEFAULT,
-            },
-        }
+        if not run_id:
+            run_id = await _coalesced_run_id(uri_extracto, uri_contable, days_window, resume=_parse_resume(form))
+        out = await run_in_pool(_details_n1, uri_extracto, uri_contable, days_window, "suggested", run_id=run_id)
         return Response(out, status_code=200)
 
+    except RunNotFoundError:
+        return _run_not_found(run_id)
     except Exception as e:
         return Response({"ok": False, "message": f"Error en detalle n1/sugeridos: {type(e).__name__}: {e}"}, status_code=500)
@@ -11,11 +11,11 @@ from uuid import uuid4
 from typing import Any, Optional, Dict
 
 from litestar import post
-from litestar.response import Response
+from litestar.response import Response, Stream
 
 import globalVar as Var
 from .agui_notify import emit
-from services.reconcile.quick_match import reconcile_from_paths
+from services.reconcile.quick_match import iter_ndjson, match_from_paths, reconcile_from_paths
 
 def _save_form_file(file, prefix: str = "upload") -> tuple[str, Path]:
     filename = getattr(file, "filename", None) or f"{prefix}_{uuid4()}.bin"
@@ -43,6 +43,8 @@ async def reconcile_quick(request: Any) -> Response:
       - gl_file:   Excel contable (PILAGA)
       - threadId (opcional) → emite RECONCILE_SNAPSHOT por SSE
       - days_tolerance (opcional, default 3)
+      - max_rows (opcional, default Var.QUICK_MATCH_MAX_ROWS; 0 = listas completas)
+      - stream=1 (opcional) → listas completas en NDJSON (application/x-ndjson), sin snapshot SSE
     """
     try:
         form = await request.form()
@@ -59,11 +61,26 @@ async def reconcile_quick(request: Any) -> Response:
             days_tolerance = int(str(days_tol))
         except Exception:
             days_tolerance = 3
+        try:
+            max_rows = int(str(form.get("max_rows") or Var.QUICK_MATCH_MAX_ROWS))
+        except Exception:
+            max_rows = Var.QUICK_MATCH_MAX_ROWS
+        stream = str(form.get("stream") or "").strip().lower() in ("1", "true", "si", "sí", "yes")
 
         bank_uri, bank_path = _save_form_file(bank_file, prefix="bank")
         gl_uri, gl_path     = _save_form_file(gl_file, prefix="gl")
 
-        result = reconcile_from_paths(bank_path, gl_path, days_tolerance=days_tolerance)
+        if stream:
+            # Carga y matching antes de armar el Stream: un archivo inválido responde el 500 JSON de
+            # abajo en lugar de un 200 con el NDJSON cortado; el stream solo serializa.
+            qm = match_from_paths(bank_path, gl_path, days_tolerance=days_tolerance)
+            return Stream(
+                iter_ndjson(qm),
+                media_type="application/x-ndjson",
+                headers={"X-Bank-Uri": bank_uri, "X-Gl-Uri": gl_uri},
+            )
+
+        result = reconcile_from_paths(bank_path, gl_path, days_tolerance=days_tolerance, max_rows=max_rows)
 
         # opcional: evento SSE
         if threadId:
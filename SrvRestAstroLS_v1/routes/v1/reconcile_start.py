@@ -12,30 +12,143 @@ from datetime import timedelta
 from pathlib import Path
 from typing import Any, Optional, Tuple
 
-from litestar import post
+from litestar import get, post
 from litestar.response import Response
 
+import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
+from pandas.api.types import infer_dtype
 
 from .agui_notify import emit
 from urllib.parse import urlparse
+from services.jobs import DONE, RESULT, Job, JobChannel, JobNotFoundError, JobRegistry
+from services.process_pool import run_in_pool
+from services.ingest import canonical_store
+from services import shared_frames
+from services.frame_cache import FrameCache
+from services.reconcile.pair_kernel import greedy_one_to_one
+from services.reconcile.ref_index import match_by_reference
+import globalVar as Var
+
+try:
+    from services.ingest.xlsx_frames import XlsxStreamFile
+except Exception:
+    XlsxStreamFile = None
 
 
 # =========================
 # Helpers (IO) + cache
 # =========================
 
-# Cache simple en memoria para evitar reparsear el mismo XLSX en la misma serie de request.
-_DF_CACHE: dict[tuple, pd.DataFrame] = {}
+# Cache LRU en memoria (acotada por bytes, con TTL) para no reparsear el mismo XLSX entre requests.
+# Los frames cacheados son read-only (y, si hay shared_frames, mapeados entre workers):
+# se entregan como copia superficial; quien modifique valores tiene que copiarlos antes.
+_DF_CACHE = FrameCache(Var.DF_CACHE_MAX_BYTES, Var.DF_CACHE_TTL_SECONDS)
+
+# Motores de lectura en orden de preferencia: calamine (Rust) solo si python-calamine está instalado;
+# xlsx-stream lee las celdas con expat (services/ingest/xlsx_frames.py), solo .xlsx/.xlsm.
+_EXCEL_ENGINES: Tuple[str, ...] = ("calamine", "xlsx-stream", "openpyxl")
+# Decisión validada por proceso: extensión -> motor
+_ENGINE_BY_SUFFIX: dict[str, str] = {}
+
+
+def _engine_available(engine: str) -> bool:
+    if engine == "xlsx-stream":
+        return XlsxStreamFile is not None
+    module = {"calamine": "python_calamine", "openpyxl": "openpyxl"}[engine]
+    try:
+        __import__(module)
+        return True
+    except Exception:
+        return False
+
+
+def _parse_with(engine: str, path: Path, parse) -> pd.DataFrame:
+    if engine == "xlsx-stream":
+        if path.suffix.lower() not in (".xlsx", ".xlsm"):
+            raise ValueError(f"xlsx-stream no lee {path.suffix}")
+        with XlsxStreamFile(path) as xls:
+            return parse(xls)
+    with pd.ExcelFile(str(path), engine=engine) as xls:
+        return parse(xls)
+
+
+# Filas de la primera hoja con que se compara un motor contra openpyxl (primera lectura de cada extensión)
+_ENGINE_PROBE_ROWS = 200
+
+
+def _probe_with(engine: str, path: Path) -> pd.DataFrame:
+    """Muestra acotada de celdas crudas para validar un motor: no parsea el workbook entero."""
+    return _parse_with(engine, path, lambda xls: xls.parse(sheet_name=0, header=None, nrows=_ENGINE_PROBE_ROWS, dtype=object))
+
+
+def _pick_engine(path: Path) -> Optional[str]:
+    """
+    Motor para la extensión de path: el primero disponible en orden de preferencia cuya muestra es
+    idéntica a la de openpyxl (referencia); sin referencia (p.ej. .xls) el primero que la lee.
+    None si ningún motor pudo leer la muestra (la lectura completa reporta el error).
+    """
+    reference: Optional[pd.DataFrame] = None
+    if _engine_available("openpyxl"):
+        try:
+            reference = _probe_with("openpyxl", path)
+        except Exception:
+            reference = None
+    for candidate in _EXCEL_ENGINES:
+        if not _engine_available(candidate):
+            continue
+        if candidate == "openpyxl":
+            if reference is not None:
+                return candidate
+            continue
+        try:
+            sample = _probe_with(candidate, path)
+        except Exception:
+            continue
+        if reference is None or sample.equals(reference):
+            return candidate
+    return None
+
 
-def _preferred_engine() -> str:
-    """Devuelve 'pyarrow' si está disponible (más rápido), si no openpyxl."""
+def _read_excel(path: Path, parse) -> Tuple[pd.DataFrame, str]:
+    """
+    Corre parse(xls) sobre el workbook abierto con el mejor motor (pd.ExcelFile o
+    XlsxStreamFile: parse solo usa xls.sheet_names y xls.parse). Devuelve (resultado, motor usado).
+
+    La primera lectura de cada extensión en el proceso elige el motor con _pick_engine, que
+    compara muestras de _ENGINE_PROBE_ROWS filas (nunca lecturas completas con cada motor).
+    Todas las lecturas usan el motor elegido y caen a openpyxl si ese archivo puntual no se
+    puede leer.
+    """
+    suffix = path.suffix.lower()
+    engine = _ENGINE_BY_SUFFIX.get(suffix)
+    if engine is None:
+        engine = _pick_engine(path)
+        if engine is None:
+            return _parse_with("openpyxl", path, parse), "openpyxl"
+        _ENGINE_BY_SUFFIX[suffix] = engine
     try:
-        import pyarrow  # noqa: F401
-        return "pyarrow"
+        return _parse_with(engine, path, parse), engine
     except Exception:
-        return "openpyxl"
+        if engine == "openpyxl":
+            raise
+        return _parse_with("openpyxl", path, parse), "openpyxl"
+
+
+# Filas que se leen para detectar la cabecera (fase 1 de los loaders)
+_HEADER_SCAN_ROWS = 50
+
+
+def _read_columns_below(xls: Any, sheet: Any, header_idx: int, usecols: list[int]) -> pd.DataFrame:
+    """
+    Fase 2 de los loaders: solo las columnas usadas, desde la fila siguiente a la cabecera.
+    dtype=object conserva los valores de celda tal cual (como en la lectura completa, donde
+    el texto de la cabecera deja la columna en object). El índice arranca en header_idx + 1
+    igual que raw.iloc[header_idx + 1:].
+    """
+    df = xls.parse(sheet_name=sheet, header=None, skiprows=header_idx + 1, usecols=usecols, dtype=object)
+    df.index = pd.RangeIndex(header_idx + 1, header_idx + 1 + len(df))
+    return df
 
 
 def _df_cache_key(kind: str, path: Path) -> tuple:
@@ -43,6 +156,32 @@ def _df_cache_key(kind: str, path: Path) -> tuple:
     return (kind, str(path.resolve()), st.st_mtime_ns, st.st_size)
 
 
+def _load_frame(kind: str, path: Path, read_xlsx) -> pd.DataFrame:
+    """
+    Frame compartido (Arrow mmap) -> store canónico (Parquet) -> XLSX.
+    Lo que no estaba compartido se publica para el resto de los workers.
+    Devuelve un frame de solo lectura: no modificar in-place sin copiar.
+    attrs["engine"] indica de dónde salió: motor de Excel usado, "parquet" o "arrow-mmap";
+    attrs["saldos"] viaja con el frame (metadata pandas en Arrow, metadata del parquet canónico).
+    """
+    shared = shared_frames.load_shared(kind, path)
+    if shared is not None:
+        shared.attrs["engine"] = "arrow-mmap"
+        return shared
+    canonical = canonical_store.read_canonical(kind, path)
+    if canonical is not None:
+        out, meta = canonical
+        out.attrs["engine"] = "parquet"
+        out.attrs["saldos"] = (meta.get("saldo_inicial"), meta.get("saldo_final"))
+    else:
+        out = read_xlsx(path)
+    published = shared_frames.store_shared(kind, path, out)
+    if published is None:
+        return out
+    published.attrs["engine"] = out.attrs.get("engine")
+    return published
+
+
 def _from_file_uri(uri: str) -> Path:
     """
     Convierte file://... en Path usable.
@@ -116,66 +255,176 @@ def _parse_money_value(raw: str) -> float:
     return val
 
 
+try:
+    import pyarrow  # noqa: F401
+    # Con pyarrow las operaciones .str corren en kernels de Arrow (sin loop Python por celda)
+    _MONEY_STR_DTYPE: Any = pd.StringDtype("pyarrow")
+except Exception:
+    _MONEY_STR_DTYPE = object
+
+
 def _clean_money(s: pd.Series) -> pd.Series:
-    """Normaliza importes mezclando formatos AR/intl."""
-    out = s.apply(_parse_money_value)
-    return out.fillna(0.0)
+    """
+    Normaliza importes mezclando formatos AR/intl.
+    Versión vectorizada de s.apply(_parse_money_value).fillna(0.0): mismas reglas, mismos
+    resultados (incluido el signo de -0.0), pero con operaciones de columna.
+    """
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        # Columna ya numérica (lo habitual en PILAGA): nada que parsear
+        return pd.Series(s.to_numpy(dtype=float, na_value=np.nan), index=s.index, name=s.name).fillna(0.0)
+
+    values = s.to_numpy(dtype=object)
+    if infer_dtype(values, skipna=False) == "string":
+        # Todo texto (caso típico del importe del extracto): sin máscaras por tipo
+        out = _parse_money_texts(s.reset_index(drop=True))
+    else:
+        out = np.zeros(len(values), dtype=float)
+        is_num = np.fromiter((isinstance(v, (int, float)) for v in values), dtype=bool, count=len(values))
+        is_txt = ~is_num & np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+        if is_num.any():
+            out[is_num] = values[is_num].astype(float)
+        if is_txt.any():
+            out[is_txt] = _parse_money_texts(pd.Series(values[is_txt]).astype(str))
+
+    return pd.Series(out, index=s.index, name=s.name).fillna(0.0)
+
+
+def _parse_money_texts(raw: pd.Series) -> np.ndarray:
+    """Reglas de _parse_money_value sobre una columna de textos (mismo orden de pasos)."""
+    txt = raw.astype(_MONEY_STR_DTYPE)
+    out = np.zeros(len(txt), dtype=float)
+
+    # Los regex de Arrow (RE2) tratan \d como ASCII y Python no: lo no-ASCII va por el parser escalar
+    if "".join(raw).isascii():
+        other = np.zeros(len(raw), dtype=bool)
+    else:
+        other = np.fromiter((not v.isascii() for v in raw), dtype=bool, count=len(raw))
+    if other.any():
+        out[other] = [_parse_money_value(v) for v in raw[other]]
+        txt = txt[~other]
+    ascii_rows = ~other
+
+    neg = (txt.str.contains("(", regex=False) & txt.str.contains(")", regex=False)).to_numpy(dtype=bool)
+    # La sustitución regex es el paso caro: solo sobre los textos que tienen símbolos sueltos
+    dirty = ~txt.str.fullmatch(r"[\d,.()-]*").to_numpy(dtype=bool)
+    if dirty.any():
+        txt = txt.copy()
+        txt[dirty] = txt[dirty].str.replace(r"[^\d,\.\-\(\)]+", "", regex=True)
+    txt = txt.str.replace("(", "", regex=False).str.replace(")", "", regex=False)
+    empty = (txt == "").to_numpy(dtype=bool)
+    neg |= txt.str.startswith("-").to_numpy(dtype=bool)
+    txt = txt.str.replace("-", "", regex=False)
+
+    # Decimal coma si hay una coma sin puntos después (última coma posterior al último punto)
+    comma_dec = txt.str.contains(r",[^.]*$", regex=True).to_numpy(dtype=bool)
+    parsed = np.zeros(len(txt), dtype=float)
+    if comma_dec.any():
+        parsed[comma_dec] = _money_digits_to_float(
+            txt[comma_dec].str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+        )
+    if not comma_dec.all():
+        parsed[~comma_dec] = _money_digits_to_float(txt[~comma_dec].str.replace(",", "", regex=False))
+    parsed = np.where(neg, -np.abs(parsed), parsed)
+    parsed[empty] = 0.0
+    out[ascii_rows] = parsed
+    return out
+
+
+def _money_digits_to_float(txt: pd.Series) -> np.ndarray:
+    """float() de cada texto; solo acepta dígitos con a lo sumo un punto, el resto vale 0.0 (como el ValueError)."""
+    valid = txt.str.fullmatch(r"(?:\d+\.?\d*|\.\d+)").to_numpy(dtype=bool)
+    out = np.zeros(len(txt), dtype=float)
+    if valid.any():
+        out[valid] = txt[valid].astype(float).to_numpy(dtype=float)
+    return out
 
 
 def _load_pilaga(path: Path) -> pd.DataFrame:
     """
     Lee PILAGA (hojas típicas: “Resumen cuenta bancaria” o “Resumen cuenta tesorería”, si no la primera).
     Busca la fila de cabecera por la palabra “Fecha” y columnas Ingresos/Egresos/Acumulado.
-    Devuelve DF estandarizado:
+    Devuelve DF estandarizado (read-only, compartido por la caché):
       ['fecha','monto','documento','ingreso_bruto','egreso_bruto','origen']
     """
     cache_key = _df_cache_key("pilaga", path)
-    if cache_key in _DF_CACHE:
-        return _DF_CACHE[cache_key].copy()
+    cached = _DF_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    return _DF_CACHE.put(cache_key, _load_frame("pilaga", path, _read_pilaga_xlsx))
 
-    engine = _preferred_engine()
-    try:
-        xls = pd.ExcelFile(str(path), engine=engine)
-    except Exception:
-        xls = pd.ExcelFile(str(path), engine="openpyxl")
 
-    # Elegir hoja contable conocida
-    sheet = next(
+_PILAGA_COL_KEYS = ("fecha", "doc", "detalle", "ingres", "egres", "acum")
+
+
+def _pick_pilaga_sheet(names: list) -> Any:
+    """Hoja contable conocida o, si no, la primera."""
+    return next(
         (
-            n for n in xls.sheet_names
+            n for n in names
             if "resumen cuenta bancaria" in str(n).strip().lower()
             or "resumen cuenta tesorer" in str(n).strip().lower()
         ),
-        xls.sheet_names[0],
+        names[0],
     )
 
-    # Leemos sin header para poder detectar la fila con "Fecha"
-    raw = pd.read_excel(xls, sheet_name=sheet, header=None)
 
-    header_idx = None
-    header_row = None
+def _find_pilaga_header(raw: pd.DataFrame) -> Tuple[int, list]:
+    """Fila con "Fecha" + Ingresos/Egresos/Acumulado en las primeras 40 filas (fallback: la primera)."""
     for idx in range(min(len(raw), 40)):  # primeras filas
         row_vals = raw.iloc[idx].tolist()
         norm = [str(c).strip().upper() for c in row_vals if not (pd.isna(c) or str(c).strip() == "")]
         if any("FECHA" in c for c in norm) and (any("INGRES" in c for c in norm) or any("EGRES" in c for c in norm) or any("ACUM" in c for c in norm)):
-            header_idx = idx
-            header_row = row_vals
-            break
+            return idx, row_vals
+    return 0, raw.iloc[0].tolist()
+
+
+def _clean_col_name(val, idx) -> str:
+    if pd.isna(val):
+        return f"col_{idx}"
+    s = str(val).strip()
+    return s if s else f"col_{idx}"
+
+
+def _read_pilaga_xlsx(path: Path) -> pd.DataFrame:
+    """Parseo del XLSX de PILAGA (sin caché): lo usan el loader y la materialización canónica."""
+    out, engine = _read_excel(path, _parse_pilaga)
+    out.attrs["engine"] = engine
+    return out
 
-    if header_idx is None:
-        # fallback: primera fila como header
-        header_idx = 0
-        header_row = raw.iloc[0].tolist()
 
-    def _clean_col_name(val, idx) -> str:
-        if pd.isna(val):
-            return f"col_{idx}"
-        s = str(val).strip()
-        return s if s else f"col_{idx}"
+def _parse_pilaga(xls: Any) -> pd.DataFrame:
+    """
+    Dos fases: (1) las primeras filas para detectar la cabecera y las columnas clave;
+    (2) solo esas columnas, debajo de la cabecera. Si hace falta el fallback posicional
+    del documento (no hay columna Doc/Detalle) se lee la hoja completa como antes.
+    Los saldos inicial/final salen de la misma lectura (attrs["saldos"]).
+    """
+    sheet = _pick_pilaga_sheet(xls.sheet_names)
 
+    # Leemos sin header para poder detectar la fila con "Fecha"
+    head = xls.parse(sheet_name=sheet, header=None, nrows=_HEADER_SCAN_ROWS)
+    header_idx, header_row = _find_pilaga_header(head)
     columns = [_clean_col_name(c, i) for i, c in enumerate(header_row)]
-    df = raw.iloc[header_idx + 1 :].copy()
-    df.columns = columns
+    usecols = [i for i, c in enumerate(columns) if any(k in c.lower() for k in _PILAGA_COL_KEYS)]
+
+    df = None
+    if any(("doc" in columns[i].lower() or "detalle" in columns[i].lower()) for i in usecols):
+        try:
+            # La columna A también se lee: ahí están las filas de saldo inicial/final
+            read_cols = sorted(set(usecols) | {0})
+            below = _read_columns_below(xls, sheet, header_idx, read_cols)
+            first_col = list(head.iloc[: header_idx + 1, 0]) + list(below.iloc[:, read_cols.index(0)])
+            df = below.iloc[:, [read_cols.index(i) for i in usecols]]
+            df.columns = [columns[i] for i in usecols]
+        except Exception:
+            df = None
+    if df is None:
+        raw = xls.parse(sheet_name=sheet, header=None)
+        header_idx, header_row = _find_pilaga_header(raw)
+        columns = [_clean_col_name(c, i) for i, c in enumerate(header_row)]
+        first_col = list(raw.iloc[:, 0])
+        df = raw.iloc[header_idx + 1 :].copy()
+        df.columns = columns
 
     # Quitar columnas completamente vacías
     df = df.dropna(axis=1, how="all")
@@ -215,66 +464,48 @@ def _load_pilaga(path: Path) -> pd.DataFrame:
     out = out.loc[:, ["fecha", "monto", "documento", "ingreso_bruto", "egreso_bruto"]].copy()
     out["origen"] = "PILAGA"
     out = out.reset_index(drop=True)
-    _DF_CACHE[cache_key] = out.copy()
+    out.attrs["saldos"] = _pilaga_saldos(first_col)
     return out
 
 
-def _get_extracto_saldos(path: Path) -> Tuple[Optional[float], Optional[float]]:
-    """Lee saldos inicial/final del extracto sin alterar el loader principal."""
-    try:
-        wb = load_workbook(str(path), data_only=True, read_only=True)
-    except Exception:
-        return (None, None)
-    try:
-        sheet = next(
-            (n for n in wb.sheetnames if str(n).strip().lower() == "principal"),
-            wb.sheetnames[0],
-        )
-        ws = wb[sheet]
-        saldo_inicial = None
-        saldo_final = None
-        for row in ws.iter_rows(values_only=True):
-            first = row[0]
-            if isinstance(first, str) and "SALDO INICIAL" in first.upper():
-                saldo_inicial = _parse_money_value(row[1])
-            marker = row[8] if len(row) > 8 else None
-            if isinstance(marker, str) and "SALDO FINAL" in marker.upper():
-                saldo_final = _parse_money_value(row[9] if len(row) > 9 else None)
-                break
-        return (saldo_inicial, saldo_final)
-    finally:
-        wb.close()
+def _frame_saldos(df: pd.DataFrame) -> Tuple[Optional[float], Optional[float]]:
+    """Saldos (inicial, final) que el loader dejó en attrs["saldos"] (sobreviven a la caché, Arrow y Parquet)."""
+    saldos = df.attrs.get("saldos") or (None, None)
+    return (saldos[0], saldos[1])
 
 
-def _get_pilaga_saldos(path: Path) -> Tuple[Optional[float], Optional[float]]:
-    """Lee saldos inicial/final de PILAGA desde la primera columna de resumen."""
-    try:
-        wb = load_workbook(str(path), data_only=True, read_only=True)
-    except Exception:
-        return (None, None)
-    try:
-        sheet = next(
-            (n for n in wb.sheetnames if str(n).strip().lower() == "resumen cuenta bancaria"),
-            wb.sheetnames[0],
-        )
-        ws = wb[sheet]
-        saldo_inicial = None
-        saldo_final = None
-        for row in ws.iter_rows(values_only=True):
-            first = row[0]
-            if not isinstance(first, str):
-                continue
-            txt = first.strip()
-            up = txt.upper()
-            if up.startswith("SALDO INICIAL"):
-                saldo_inicial = _parse_money_value(txt.split(":")[-1])
-            elif up.startswith("SALDO FINAL"):
-                saldo_final = _parse_money_value(txt.split(":")[-1])
-                if saldo_inicial is not None:
-                    break
-        return (saldo_inicial, saldo_final)
-    finally:
-        wb.close()
+def _extracto_saldos(rows) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Saldos del extracto a partir de filas (col 0, col 1, col 8, col 9) en orden de hoja:
+    "Saldo Inicial ..." en la columna A con el importe en B; "Saldo Final" en I con el importe en J.
+    """
+    saldo_inicial = None
+    saldo_final = None
+    for first, value, marker, final_value in rows:
+        if isinstance(first, str) and "SALDO INICIAL" in first.upper():
+            saldo_inicial = _parse_money_value(value)
+        if isinstance(marker, str) and "SALDO FINAL" in marker.upper():
+            saldo_final = _parse_money_value(final_value)
+            break
+    return (saldo_inicial, saldo_final)
+
+
+def _pilaga_saldos(first_col) -> Tuple[Optional[float], Optional[float]]:
+    """Saldos de PILAGA: filas "Saldo inicial: $X" / "Saldo final: $Y" de la primera columna."""
+    saldo_inicial = None
+    saldo_final = None
+    for first in first_col:
+        if not isinstance(first, str):
+            continue
+        txt = first.strip()
+        up = txt.upper()
+        if up.startswith("SALDO INICIAL"):
+            saldo_inicial = _parse_money_value(txt.split(":")[-1])
+        elif up.startswith("SALDO FINAL"):
+            saldo_final = _parse_money_value(txt.split(":")[-1])
+            if saldo_inicial is not None:
+                break
+    return (saldo_inicial, saldo_final)
 
 
 def _find_header_row_with_fecha(df: pd.DataFrame, scan_rows: int = 50) -> Optional[int]:
@@ -310,50 +541,117 @@ def _load_extracto(path: Path) -> pd.DataFrame:
     """
     Lee EXTRACTO bancario (hoja 'principal' o primera).
     Detecta encabezado (fila con 'Fecha'), normaliza monto.
-    Devuelve DF con columnas estandarizadas: ['fecha','monto','documento','origen']
+    Devuelve DF con columnas estandarizadas (read-only, compartido por la caché):
+      ['fecha','monto','documento','origen']
     """
     cache_key = _df_cache_key("extracto", path)
-    if cache_key in _DF_CACHE:
-        return _DF_CACHE[cache_key].copy()
+    cached = _DF_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    return _DF_CACHE.put(cache_key, _load_frame("extracto", path, _read_extracto_xlsx))
 
-    engine = _preferred_engine()
-    try:
-        xls = pd.ExcelFile(str(path), engine=engine)
-    except Exception:
-        xls = pd.ExcelFile(str(path), engine="openpyxl")
 
-    sheet = next((n for n in xls.sheet_names if str(n).strip().lower() == "principal"), xls.sheet_names[0])
-    raw = pd.read_excel(xls, sheet_name=sheet, header=None)
+_EXTRACTO_IMPORTE_NAMES = ("IMPORTE", "IMPORTE EN $", "MONTO")
+_EXTRACTO_DOC_NAMES = ("COMPROBANTE", "DESCRIPCIÓN", "DETALLE", "DESCRIPCION")
+# Columnas A, B, I, J: "Saldo Inicial" + importe / "Saldo Final" + importe
+_EXTRACTO_SALDO_COLS = (0, 1, 8, 9)
 
-    hdr = _find_header_row_with_fecha(raw)
-    if hdr is None:
-        hdr = 0
 
-    headers = [str(x or "").strip() for x in raw.iloc[hdr].tolist()]
-    df = raw.iloc[hdr + 1:].copy()
-    df.columns = headers
-    df = df.dropna(how="all")
+def _read_extracto_xlsx(path: Path) -> pd.DataFrame:
+    """Parseo del XLSX del extracto (sin caché): lo usan el loader y la materialización canónica."""
+    out, engine = _read_excel(path, _parse_extracto)
+    out.attrs["engine"] = engine
+    return out
+
 
-    # Candidatos típicos (según tu análisis)
-    fecha_col = next((c for c in df.columns if str(c).strip().upper() == "FECHA"), df.columns[0])
-    # Importe suele estar en 'Unnamed: 4' o 'IMPORTE' etc. Probamos:
-    cand_importe = [c for c in df.columns if str(c).strip().upper() in ("IMPORTE", "IMPORTE EN $", "MONTO")]
-    importe_col = cand_importe[0] if cand_importe else (df.columns[4] if len(df.columns) > 4 else df.columns[-1])
+def _extracto_columns(headers: list) -> Optional[Tuple[int, int, int]]:
+    """
+    Posiciones (fecha, importe, documento) según los nombres de cabecera; los fallbacks
+    posicionales resuelven por nombre como df[col] (primera columna con ese nombre).
+    None si el fallback depende del ancho total de la hoja (cabecera de ≤ 4 columnas).
+    """
+    upper = [str(c).strip().upper() for c in headers]
+    width = len(headers)
 
-    # Documento/descripcion (opcional; si no está, igual seguimos)
-    cand_doc = [c for c in df.columns if str(c).strip().upper() in ("COMPROBANTE", "DESCRIPCIÓN", "DETALLE", "DESCRIPCION")]
-    doc_col = cand_doc[0] if cand_doc else (df.columns[2] if len(df.columns) > 2 else df.columns[0])
+    fecha = next((i for i, c in enumerate(upper) if c == "FECHA"), 0)
+    importe = next((i for i, c in enumerate(upper) if c in _EXTRACTO_IMPORTE_NAMES), None)
+    if importe is None:
+        if width <= 4:
+            return None
+        importe = 4
+    doc = next((i for i, c in enumerate(upper) if c in _EXTRACTO_DOC_NAMES), None)
+    if doc is None:
+        doc = 2 if width > 2 else 0
 
-    def _col_as_series(col_name: Any) -> pd.Series:
-        col = df[col_name]
-        if isinstance(col, pd.DataFrame):
-            return col.iloc[:, 0]
-        return col
+    first_pos = lambda i: headers.index(headers[i])  # noqa: E731
+    return first_pos(fecha), first_pos(importe), first_pos(doc)
 
-    fecha_data = _col_as_series(fecha_col)
-    doc_data = _col_as_series(doc_col)
-    importe_data = _col_as_series(importe_col)
 
+def _extracto_saldo_rows(block: pd.DataFrame) -> list[tuple]:
+    """Filas (col 0, col 1, col 8, col 9) de un bloque leído con header=None; las columnas ausentes salen None."""
+    picked = [block[c].tolist() if c in block.columns else [None] * len(block) for c in _EXTRACTO_SALDO_COLS]
+    return list(zip(*picked))
+
+
+def _parse_extracto(xls: Any) -> pd.DataFrame:
+    """
+    Dos fases: (1) las primeras filas para detectar encabezado y columnas (fecha, importe,
+    documento); (2) solo esas columnas debajo del encabezado. Si los fallbacks posicionales
+    necesitan el ancho real de la hoja se lee completa como antes.
+    Los saldos inicial/final salen de la misma lectura (attrs["saldos"]).
+    """
+    sheet = next((n for n in xls.sheet_names if str(n).strip().lower() == "principal"), xls.sheet_names[0])
+    head = xls.parse(sheet_name=sheet, header=None, nrows=_HEADER_SCAN_ROWS)
+
+    hdr = _find_header_row_with_fecha(head, scan_rows=_HEADER_SCAN_ROWS)
+    if hdr is None:
+        hdr = 0
+
+    headers = [str(x or "").strip() for x in head.iloc[hdr].tolist()]
+    positions = _extracto_columns(headers)
+    cols = None
+    # Las columnas de saldos tienen que existir en la cabecera; si no, lectura completa
+    if positions is not None and head.shape[1] > max(_EXTRACTO_SALDO_COLS):
+        try:
+            usecols = sorted(set(positions) | set(_EXTRACTO_SALDO_COLS))
+            df = _read_columns_below(xls, sheet, hdr, usecols)
+            df.columns = usecols
+            cols = [df[pos] for pos in positions]
+            saldo_rows = _extracto_saldo_rows(head.iloc[: hdr + 1]) + _extracto_saldo_rows(df)
+        except Exception:
+            cols = None
+
+    if cols is None:
+        raw = xls.parse(sheet_name=sheet, header=None)
+        saldo_rows = _extracto_saldo_rows(raw)
+        hdr = _find_header_row_with_fecha(raw)
+        if hdr is None:
+            hdr = 0
+        headers = [str(x or "").strip() for x in raw.iloc[hdr].tolist()]
+        df = raw.iloc[hdr + 1:].copy()
+        df.columns = headers
+        df = df.dropna(how="all")
+
+        # Candidatos típicos (según tu análisis)
+        fecha_col = next((c for c in df.columns if str(c).strip().upper() == "FECHA"), df.columns[0])
+        # Importe suele estar en 'Unnamed: 4' o 'IMPORTE' etc. Probamos:
+        cand_importe = [c for c in df.columns if str(c).strip().upper() in _EXTRACTO_IMPORTE_NAMES]
+        importe_col = cand_importe[0] if cand_importe else (df.columns[4] if len(df.columns) > 4 else df.columns[-1])
+
+        # Documento/descripcion (opcional; si no está, igual seguimos)
+        cand_doc = [c for c in df.columns if str(c).strip().upper() in _EXTRACTO_DOC_NAMES]
+        doc_col = cand_doc[0] if cand_doc else (df.columns[2] if len(df.columns) > 2 else df.columns[0])
+
+        def _col_as_series(col_name: Any) -> pd.Series:
+            col = df[col_name]
+            if isinstance(col, pd.DataFrame):
+                return col.iloc[:, 0]
+            return col
+
+        cols = [_col_as_series(fecha_col), _col_as_series(importe_col), _col_as_series(doc_col)]
+
+    fecha_data, importe_data, doc_data = cols
+    # Las filas vacías en las columnas usadas quedan sin fecha: las descarta el dropna de abajo
     out = pd.DataFrame({
         "fecha": pd.to_datetime(fecha_data, dayfirst=True, errors="coerce"),
         "documento": doc_data.astype(str),
@@ -363,13 +661,79 @@ def _load_extracto(path: Path) -> pd.DataFrame:
     out = out[out["monto"] != 0]
     out["origen"] = "EXTRACTO"
     out = out.reset_index(drop=True)
-    _DF_CACHE[cache_key] = out.copy()
+    out.attrs["saldos"] = _extracto_saldos(saldo_rows)
     return out
 
 
+def _materialize_canonical(role: str, uri: str, account_id: Any = None, period: Optional[str] = None) -> Optional[str]:
+    """
+    Normaliza el archivo confirmado y lo guarda en el store canónico (Parquet particionado
+    por cuenta/período). Corre en el pool de procesos; devuelve la URI canónica o None.
+    """
+    if not canonical_store.is_enabled():
+        return None
+    path = _from_file_uri(uri)
+    if role == "extracto":
+        kind, df = "extracto", _read_extracto_xlsx(path)
+    else:
+        kind, df = "pilaga", _read_pilaga_xlsx(path)
+    return canonical_store.write_canonical(kind, path, df, account_id=account_id, period=period, saldos=_frame_saldos(df))
+
+
 # =========================
 # Matching (± ventana días)
 # =========================
+def _ref_pairs(p: pd.DataFrame, b: pd.DataFrame, days_window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pre-matching por referencia + monto (services.reconcile.ref_index); vacío si está deshabilitado.
+    Misma ventana que el greedy: days_window, acotada por Var.REF_MATCH_MAX_DAYS si es > 0.
+    """
+    if not Var.REF_MATCH_ENABLED or "documento" not in p.columns or "documento" not in b.columns:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros(0, dtype=float), np.zeros(0, dtype=object))
+    return match_by_reference(
+        p["monto"].to_numpy(), p["fecha"].to_numpy(), p["documento"],
+        b["monto"].to_numpy(), b["fecha"].to_numpy(), b["documento"],
+        max_days=min(days_window, Var.REF_MATCH_MAX_DAYS) if Var.REF_MATCH_MAX_DAYS > 0 else days_window,
+    )
+
+
+def _pairs_1a1(p: pd.DataFrame, b: pd.DataFrame, days_window: int) -> pd.DataFrame:
+    """
+    Pares 1→1 con el layout del viejo p.merge(b, on="monto_r") + date_diff_days + match_ref.
+    Primero los pares por referencia + monto (match_ref = token), después el greedy
+    (monto_r, date_diff_days, _row_id_p) sobre lo que queda libre (match_ref = "").
+    p/b ya traen _row_id_* y monto_r.
+    Las filas las elige services.reconcile.pair_kernel sin armar el producto cartesiano.
+    """
+    ref_p, ref_b, ref_diff, ref_tok = _ref_pairs(p, b, int(days_window))
+    free_p = np.ones(len(p), dtype=bool)
+    free_b = np.ones(len(b), dtype=bool)
+    free_p[ref_p] = False
+    free_b[ref_b] = False
+    sub_p = np.flatnonzero(free_p)
+    sub_b = np.flatnonzero(free_b)
+    rows_p, rows_b, diff_days, nat_edge = greedy_one_to_one(
+        p["monto"].to_numpy()[sub_p], p["fecha"].to_numpy()[sub_p],
+        b["monto"].to_numpy()[sub_b], b["fecha"].to_numpy()[sub_b], days_window,
+    )
+    rows_p = np.concatenate([ref_p, sub_p[rows_p]])
+    rows_b = np.concatenate([ref_b, sub_b[rows_b]])
+    left = p.iloc[rows_p].reset_index(drop=True)
+    right = b.iloc[rows_b].reset_index(drop=True).drop(columns=["monto_r"])
+    overlap = set(left.columns) & set(right.columns)
+    left = left.rename(columns={c: f"{c}_p" for c in overlap})
+    right = right.rename(columns={c: f"{c}_b" for c in overlap})
+    merged = pd.concat([left, right], axis=1)
+    # Con fechas NaT en un monto compartido el merge dejaba la columna en float
+    if nat_edge or np.isnan(ref_diff).any():
+        merged["date_diff_days"] = np.concatenate([ref_diff, diff_days.astype(float)])
+    else:
+        merged["date_diff_days"] = np.concatenate([ref_diff.astype(np.int64), diff_days])
+    merged["match_ref"] = np.concatenate([ref_tok, np.full(len(diff_days), "", dtype=object)])
+    return merged
+
+
 def _match_one_to_one_by_amount_and_date_window(
     df_p: pd.DataFrame,
     df_b: pd.DataFrame,
@@ -377,6 +741,8 @@ def _match_one_to_one_by_amount_and_date_window(
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Empareja uno-a-uno por monto idéntico (redondeado a 2) y |fecha_p - fecha_b| <= days_window.
+    Antes, los pares con la misma referencia en documento y el mismo monto (Var.REF_MATCH_*).
+    Greedy: primero el match más cercano en fecha dentro de cada monto (ver _pairs_1a1).
     Retorna: pairs, sobrantes_pilaga, sobrantes_banco
     """
     orig_cols_p = df_p.columns
@@ -388,31 +754,7 @@ def _match_one_to_one_by_amount_and_date_window(
     p["monto_r"] = p["monto"].round(2)
     b["monto_r"] = b["monto"].round(2)
 
-    # Join por monto
-    merged = p.merge(b, on="monto_r", suffixes=("_p", "_b"))
-    # Ventana de fechas
-    merged["date_diff_days"] = (merged["fecha_p"] - merged["fecha_b"]).abs().dt.days
-    merged = merged[merged["date_diff_days"] <= abs(int(days_window))]
-
-    # Greedy: quedarnos con el match más cercano por monto/fecha
-    merged = merged.sort_values(["monto_r", "date_diff_days", "_row_id_p", "_row_id_b"])
-
-    used_p: set[int] = set()
-    used_b: set[int] = set()
-    selected_rows = []
-    for record in merged.to_dict("records"):
-        row_id_p = record["_row_id_p"]
-        row_id_b = record["_row_id_b"]
-        if row_id_p in used_p or row_id_b in used_b:
-            continue
-        used_p.add(row_id_p)
-        used_b.add(row_id_b)
-        selected_rows.append(record)
-
-    if selected_rows:
-        merged = pd.DataFrame(selected_rows, columns=merged.columns)
-    else:
-        merged = merged.iloc[0:0].copy()
+    merged = _pairs_1a1(p, b, days_window)
 
     matched_p = set(merged["_row_id_p"])
     matched_b = set(merged["_row_id_b"])
@@ -424,6 +766,90 @@ def _match_one_to_one_by_amount_and_date_window(
     return pairs.reset_index(drop=True), sobrantes_p.reset_index(drop=True), sobrantes_b.reset_index(drop=True)
 
 
+def _run_reconcile(
+    uri_extracto: str,
+    uri_contable: str,
+    days_window: int,
+    resume: bool = False,
+    channel: Optional[JobChannel] = None,
+    run_id: Optional[str] = None,
+    reuse: bool = False,
+) -> dict:
+    """
+    Carga + pipeline completo (1→1, N→1, sobrantes) + resumen, guardados bajo un run_id (nuevo si
+    no se pasa). Corre en el pool de procesos (resultado picklable): contadores históricos del
+    start + run_id. channel: avance por fase / cancelación del job de /start.
+    reuse: si ya hay una corrida completa guardada bajo run_id, se devuelve esa sin recalcular.
+    """
+    # Import diferido: reconcile_details/reconcile_summary importan helpers de este módulo
+    from .reconcile_summary import _build_run
+
+    run = _build_run(uri_extracto, uri_contable, days_window, resume=resume, channel=channel, run_id=run_id, reuse=reuse)
+    return {k: v for k, v in run.items() if k != "summary"}
+
+
+# =========================
+# Jobs de /start (corren en segundo plano; avance por SSE)
+# =========================
+_JOBS = JobRegistry(Var.JOBS_MAX_ENTRIES)
+
+
+async def on_startup() -> None:
+    await asyncio.to_thread(_JOBS.start)
+
+
+async def on_shutdown() -> None:
+    _JOBS.shutdown()
+
+
+def _job_not_found(job_id: Optional[str]) -> Response:
+    return Response({"ok": False, "message": f"job_id desconocido: {job_id}"}, status_code=404)
+
+
+async def _reconcile_job(job: Job, uri_extracto: str, uri_contable: str, days_window: int, resume: bool) -> dict:
+    """Cuerpo del job: corrida completa en el pool (avanza por job.channel)."""
+    return await run_in_pool(_run_reconcile, uri_extracto, uri_contable, days_window, resume=resume, channel=job.channel)
+
+
+def _notify_done(thread_id: Optional[str]):
+    """on_done del job: RESULTS_READY (después del último RUN_PROGRESS) o TOAST de error."""
+    async def on_done(job: Job) -> None:
+        if job.status != DONE:
+            print("[reconcile_start] job", job.job_id, "ERROR:", job.error, flush=True)
+        if not thread_id:
+            return
+        if job.status == DONE:
+            await emit(thread_id, {
+                "type": "RESULTS_READY",
+                "payload": {"summary": job.result, "run_id": job.result["run_id"], "job_id": job.job_id},
+            })
+        else:
+            await emit(thread_id, {
+                "type": "TOAST", "level": "error",
+                "message": f"Reconcile error: {job.error}",
+                "payload": {"job_id": job.job_id},
+            })
+    return on_done
+
+
+def _progress_to_thread(thread_id: Optional[str]):
+    """
+    on_progress del job: cada fase terminada sale como RUN_PROGRESS y cada resultado parcial como
+    RESULTS_PARTIAL (stage = pairs | approved | suggested) por el SSE del thread.
+    """
+    async def on_progress(job: Job, event: dict) -> None:
+        if not thread_id:
+            return
+        if event.get("event") == RESULT:
+            await emit(thread_id, {
+                "type": "RESULTS_PARTIAL",
+                "payload": {"job_id": job.job_id, "stage": event["name"], **event["payload"]},
+            })
+        else:
+            await emit(thread_id, {"type": "RUN_PROGRESS", "payload": {"job_id": job.job_id, **event}})
+    return on_progress
+
+
 # =========================
 # API Route
 # =========================
@@ -435,10 +861,24 @@ async def reconcile_start(request: Any) -> Response:
       - uri_extracto: file://... (obligatorio)
       - uri_contable: file://... (obligatorio)
       - days_window: int (opcional, default 5)
+      - resume: 1 = retomar la búsqueda N→1 cortada por presupuesto (opcional)
+      - wait: 1 = esperar la corrida y responder con el resultado (comportamiento anterior)
+
+    Encola la corrida como job y responde enseguida (202) con job_id; el avance se sigue por SSE o
+    con GET /api/reconcile/jobs/{job_id}, y se cancela con POST /api/reconcile/jobs/{job_id}/cancel.
+    La corrida calcula el pipeline una vez y lo guarda bajo run_id: los endpoints
+    /api/reconcile/details/* y /api/reconcile/summary* aceptan run_id y devuelven cortes de esa
+    corrida sin recalcular.
 
     Emite por SSE:
-      - {type:"RUN_START", ...}
-      - {type:"RESULTS_READY", payload:{summary, counts}}
+      - {type:"RUN_START", payload:{days_window, job_id}}
+      - {type:"RUN_PROGRESS", payload:{job_id, phase, rows, elapsed_s, phase_s, ...}} por fase
+        (load, pairs, approved, suggested)
+      - {type:"RESULTS_PARTIAL", payload:{job_id, stage, ...}} apenas cada fase tiene algo para mostrar:
+        stage="pairs" {pares, head} (card de pares + totales), después "approved" y "suggested"
+        {total, total_amount, rows, meta} (mismo formato que /api/reconcile/details/pares y n1/*)
+      - {type:"RESULTS_READY", payload:{summary, run_id, job_id}}
+      - {type:"RUN_CANCELLED", payload:{job_id}} si se cancela
     """
     try:
         form = await request.form()
@@ -452,60 +892,59 @@ async def reconcile_start(request: Any) -> Response:
         if not uri_extracto or not uri_contable:
             return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable son obligatorios."}, status_code=400)
 
-        if thread_id:
-            asyncio.create_task(emit(thread_id, {"type": "RUN_START", "payload": {"days_window": days_window}}))
-
-        path_extracto = _from_file_uri(uri_extracto)
-        path_contable = _from_file_uri(uri_contable)
-
-        # 1) Cargar
-        df_pilaga = _load_pilaga(path_contable)
-        df_banco  = _load_extracto(path_extracto)
-
-        # 2) Conciliar
-        pairs, sobrantes_p, sobrantes_b = _match_one_to_one_by_amount_and_date_window(df_pilaga, df_banco, days_window)
-
-        # 3) Resumen
-        total_p = len(df_pilaga)
-        total_b = len(df_banco)
-        conc_pairs = len(pairs)
-        no_en_banco = len(sobrantes_p)
-        no_en_pilaga = len(sobrantes_b)
-
-        summary = {
-            "movimientos_pilaga": total_p,
-            "movimientos_banco": total_b,
-            "conciliados_pares": conc_pairs,
-            "no_en_banco": no_en_banco,    # están en PILAGA pero no en el banco
-            "no_en_pilaga": no_en_pilaga,  # están en banco pero no en PILAGA
-            "days_window": days_window,
-        }
+        resume = str(form.get("resume") or "").strip().lower() in ("1", "true", "si", "sí", "yes")
+        wait = str(form.get("wait") or "").strip().lower() in ("1", "true", "si", "sí", "yes")
 
+        job = _JOBS.submit(
+            "reconcile",
+            lambda job: _reconcile_job(job, uri_extracto, uri_contable, days_window, resume),
+            on_progress=_progress_to_thread(thread_id),
+            on_done=_notify_done(thread_id),
+            meta={"thread_id": thread_id},
+        )
         if thread_id:
-            asyncio.create_task(emit(thread_id, {
-                "type": "RESULTS_READY",
-                "payload": {
-                    "summary": summary,
-                    # si querés, podés agregar muestras (primeros N) para UI:
-                    # "sample_no_en_banco": sobrantes_p.head(10).to_dict(orient="records"),
-                    # "sample_no_en_pilaga": sobrantes_b.head(10).to_dict(orient="records"),
-                }
-            }))
+            await emit(thread_id, {"type": "RUN_START", "payload": {"days_window": days_window, "job_id": job.job_id}})
+
+        if not wait:
+            return Response({"ok": True, "job_id": job.job_id, "status": job.status}, status_code=202)
 
-        return Response({"ok": True, "summary": summary}, status_code=200)
+        await asyncio.shield(job.task)
+        if job.status != DONE:
+            raise RuntimeError(job.error or f"job {job.status}")
+        summary = job.result
+        return Response({"ok": True, "job_id": job.job_id, "run_id": summary["run_id"], "summary": summary}, status_code=200)
 
     except Exception as e:
         tb = traceback.format_exc(limit=12)
         print("[reconcile_start] ERROR:", type(e).__name__, str(e), flush=True)
         print(tb, flush=True)
-        try:
-            form = await request.form()
-            thread_id = form.get("threadId")
-            if thread_id:
-                asyncio.create_task(emit(thread_id, {
-                    "type": "TOAST", "level": "error",
-                    "message": f"Reconcile error: {type(e).__name__}: {e}"
-                }))
-        except Exception:
-            pass
         return Response({"ok": False, "message": "Error interno en conciliación", "error": f"{type(e).__name__}: {e}", "trace": tb}, status_code=500)
+
+
+@get("/api/reconcile/jobs/{job_id:str}")
+async def reconcile_job_status(job_id: str) -> Response:
+    """
+    Estado del job de /start:
+      { ok, job: { job_id, status (queued|running|done|error|cancelled), phase, progress: [...],
+                   error, created_at, started_at, finished_at, result: {run_id, ...} } }
+    """
+    try:
+        job = _JOBS.get(job_id)
+    except JobNotFoundError:
+        return _job_not_found(job_id)
+    return Response({"ok": True, "job": job.info(include_result=True)}, status_code=200)
+
+
+@post("/api/reconcile/jobs/{job_id:str}/cancel")
+async def reconcile_job_cancel(job_id: str) -> Response:
+    """Cancela el job (el cálculo corta en el próximo límite de fase). No-op si ya terminó."""
+    try:
+        job = _JOBS.get(job_id)
+    except JobNotFoundError:
+        return _job_not_found(job_id)
+    was_finished = job.finished
+    _JOBS.cancel(job_id)
+    thread_id = job.meta.get("thread_id")
+    if thread_id and not was_finished:
+        await emit(thread_id, {"type": "RUN_CANCELLED", "payload": {"job_id": job_id, "phase": job.phase}})
+    return Response({"ok": True, "job": job.info()}, status_code=200)
@@ -12,16 +12,36 @@ import pandas as pd
 from litestar import post
 from litestar.response import Response
 
+from services.process_pool import run_in_pool
+
 # Reusamos helpers y loaders del start (mantiene coherencia con lo ya probado)
 from .reconcile_start import (
     _from_file_uri,              # convierte file://... en Path
     _load_pilaga,                # DF con ingreso/egreso originales + monto neto
     _load_extracto,              # DF: ['fecha','monto','documento','origen']  (importe limpio)
-    _get_extracto_saldos,
-    _get_pilaga_saldos,
+    _frame_saldos,               # saldos (inicial, final) que dejó el loader en attrs
+    _DF_CACHE,                   # caché de frames del proceso (contadores)
 )
 # Pipeline completo (pares, agrupados, sugeridos, sobrantes)
-from .reconcile_details import _compute_pipeline
+from .reconcile_details import (
+    _FLIGHTS,                    # single-flight de corridas (contadores)
+    _RUNS,                       # corridas guardadas por run_id
+    _coalesced_run_id,
+    _compute_pipeline,
+    _flight_key,
+    _load_frames,
+    _n1_out,
+    _pairs_out,
+    _parse_resume,
+    _parse_run_id,
+    _pipeline_without_n1_wait,
+    _run_not_found,
+    _stage_pipeline,
+    _stored_run,
+)
+from services.jobs import JobChannel
+from services.reconcile.stage_graph import COMPUTED, MEMO
+from services.reconcile.run_store import RunNotFoundError
 
 EXCLUDE_MARKERS = ("SALDO INICIAL", "SALDO FINAL")
 
@@ -72,16 +92,54 @@ def _sum_pilaga_totals(df: pd.DataFrame) -> Tuple[float, float, float]:
     p_egr = float((-s[s < 0]).sum())
     return (round(p_ing, 2), round(p_egr, 2), round(p_ing - p_egr, 2))
 
-def _build_summary(uri_extracto: str, uri_contable: str, days_window: int, *, include_descomposicion: bool = True) -> dict[str, Any]:
-    """Genera el resumen completo; opcionalmente omite la descomposición."""
+def _same_rows(raw: pd.DataFrame, filtered: pd.DataFrame) -> bool:
+    """True si _filter_movements_df no cambió nada (mismo contenido que el frame crudo)."""
+    return len(raw) == len(filtered) and raw.reset_index(drop=True).equals(filtered)
+
+
+def _build_summary(
+    uri_extracto: str,
+    uri_contable: str,
+    days_window: int,
+    *,
+    include_descomposicion: bool = True,
+    resume: bool = False,
+    raw_pipeline: Optional[dict] = None,
+    wait_n1: bool = True,
+) -> dict[str, Any]:
+    """
+    Genera el resumen completo; opcionalmente omite la descomposición.
+    raw_pipeline: pipeline ya calculado sobre los frames sin filtrar (corrida de /start); se reusa
+    si el filtro de saldos no quitó ninguna fila, que es el caso habitual.
+    wait_n1=False: totales + etapa 1→1 sin esperar la búsqueda N→1 (si no estaba memoizada, los
+    sobrantes son los del 1→1 y complete=False).
+    """
     t_start = time.perf_counter()
     path_extracto = _from_file_uri(uri_extracto)
     path_contable = _from_file_uri(uri_contable)
 
     # 1) Cargar con los mismos loaders del flujo actual
-    t_load_start = time.perf_counter()
-    df_pilaga  = _filter_movements_df(_load_pilaga(path_contable))
-    df_banco   = _filter_movements_df(_load_extracto(path_extracto))
+    raw_pilaga = _load_pilaga(path_contable)
+    raw_banco  = _load_extracto(path_extracto)
+    return _summarize(raw_pilaga, raw_banco, days_window, t_start, include_descomposicion=include_descomposicion,
+                      resume=resume, raw_pipeline=raw_pipeline, wait_n1=wait_n1)
+
+
+def _summarize(
+    raw_pilaga: pd.DataFrame,
+    raw_banco: pd.DataFrame,
+    days_window: int,
+    t_start: float,
+    *,
+    include_descomposicion: bool = True,
+    resume: bool = False,
+    raw_pipeline: Optional[dict] = None,
+    wait_n1: bool = True,
+) -> dict[str, Any]:
+    """Resumen sobre frames ya cargados (sin filtrar); t_start: inicio de la carga. Ver _build_summary."""
+    engines = {"extracto": raw_banco.attrs.get("engine"), "pilaga": raw_pilaga.attrs.get("engine")}
+    df_pilaga  = _filter_movements_df(raw_pilaga)
+    df_banco   = _filter_movements_df(raw_banco)
     t_after_load = time.perf_counter()
 
     # 2) Totales:
@@ -89,11 +147,17 @@ def _build_summary(uri_extracto: str, uri_contable: str, days_window: int, *, in
     #    - BANCO: debe/haber a partir de signos, neto = haber - debe
     b_debe, b_haber, b_neto = _sum_pos_neg(df_banco["monto"])
 
-    b_saldo_inicial, b_saldo_final = _get_extracto_saldos(path_extracto)
-    p_saldo_inicial, p_saldo_final = _get_pilaga_saldos(path_contable)
+    # Saldos: los dejó el loader en attrs (misma lectura, cacheados con el frame)
+    b_saldo_inicial, b_saldo_final = _frame_saldos(raw_banco)
+    p_saldo_inicial, p_saldo_final = _frame_saldos(raw_pilaga)
 
     # 3) Pipeline completo (pares 1→1, agrupados, sugeridos, sobrantes)
-    pipeline = _compute_pipeline(df_pilaga, df_banco, days_window)
+    if raw_pipeline is not None and _same_rows(raw_pilaga, df_pilaga) and _same_rows(raw_banco, df_banco):
+        pipeline = raw_pipeline
+    elif wait_n1:
+        pipeline = _compute_pipeline(df_pilaga, df_banco, days_window, resume=resume, memo=True)
+    else:
+        pipeline = _pipeline_without_n1_wait(df_pilaga, df_banco, days_window)
     pairs_df = pipeline["pairs_df"]
     approved = pipeline["approved"]
     suggested = pipeline["suggested"]
@@ -105,6 +169,7 @@ def _build_summary(uri_extracto: str, uri_contable: str, days_window: int, *, in
     total_b = int(len(df_banco))
 
     conc_pairs = int(len(pairs_df))
+    conc_ref = int((pairs_df["match_ref"] != "").sum()) if "match_ref" in pairs_df.columns else 0
     no_en_banco = int(len(sobrantes_p))
     no_en_pilaga = int(len(sobrantes_b))
 
@@ -112,6 +177,7 @@ def _build_summary(uri_extracto: str, uri_contable: str, days_window: int, *, in
         "movimientos_pilaga": total_p,
         "movimientos_banco": total_b,
         "conciliados_pares": conc_pairs,
+        "conciliados_por_referencia": conc_ref,  # incluidos en conciliados_pares
         "no_en_banco": no_en_banco,
         "no_en_pilaga": no_en_pilaga,
         "days_window": int(days_window),
@@ -131,20 +197,29 @@ def _build_summary(uri_extracto: str, uri_contable: str, days_window: int, *, in
         },
         "diferencia_neto": round(b_neto - p_neto, 2),
         "timings": {
-            "load_total": round(t_after_load - t_load_start, 3),
+            "load_total": round(t_after_load - t_start, 3),
             "pipeline_total": round(timings_pipe.get("total", 0.0), 3),
             "pairs": round(timings_pipe.get("pairs", 0.0), 3),
             "n1_approved": round(timings_pipe.get("n1_approved", 0.0), 3),
             "n1_suggested": round(timings_pipe.get("n1_suggested", 0.0), 3),
             "n1_suggested_bank_to_pilaga": round(timings_pipe.get("n1_suggested_bank_to_pilaga", 0.0), 3),
             "total_endpoint": round(time.perf_counter() - t_start, 3),
+            "engine": engines,   # motor de lectura por archivo (calamine/openpyxl/parquet/arrow-mmap)
         },
+        "df_cache": _DF_CACHE.stats(),
+        # complete=False: la búsqueda N→1 agotó el presupuesto (la UI puede pedir resume=1)
+        "complete": pipeline["complete"],
+        "n1_search": pipeline["n1_search"],
+        "stages": pipeline.get("stages"),  # etapa -> "memo" | "computed" ("pending": N→1 sin calcular)
     }
 
     if include_descomposicion:
         conciliados_amount = float(pd.to_numeric(pairs_df["monto_r"], errors="coerce").fillna(0).sum()) if not pairs_df.empty else 0.0
         agrupados_amount = float(sum((g.get("monto_total") or 0.0) for g in approved))
         sugeridos_amount = float(sum((g.get("monto_total") or 0.0) for g in suggested))
+        # 1→N banco→PILAGA: van dentro de sugeridos; se informan también por separado
+        sugeridos_b2p = [g for g in suggested if g.get("direction") == "bank_to_pilaga"]
+        sugeridos_b2p_amount = float(sum((g.get("monto_total") or 0.0) for g in sugeridos_b2p))
         no_en_banco_amount = float(pd.to_numeric(sobrantes_p["monto"], errors="coerce").fillna(0).sum()) if not sobrantes_p.empty else 0.0
         no_en_pilaga_amount = float(pd.to_numeric(sobrantes_b["monto"], errors="coerce").fillna(0).sum()) if not sobrantes_b.empty else 0.0
 
@@ -152,6 +227,7 @@ def _build_summary(uri_extracto: str, uri_contable: str, days_window: int, *, in
             "conciliados": {"count": conc_pairs, "amount": round(conciliados_amount, 2)},
             "agrupados": {"count": len(approved), "amount": round(agrupados_amount, 2)},
             "sugeridos": {"count": len(suggested), "amount": round(sugeridos_amount, 2)},
+            "sugeridos_banco_a_pilaga": {"count": len(sugeridos_b2p), "amount": round(sugeridos_b2p_amount, 2)},
             "no_en_banco": {"count": no_en_banco, "amount": round(no_en_banco_amount, 2)},
             "no_en_pilaga": {"count": no_en_pilaga, "amount": round(no_en_pilaga_amount, 2)},
         }
@@ -159,6 +235,105 @@ def _build_summary(uri_extracto: str, uri_contable: str, days_window: int, *, in
     return summary
 
 
+def _publish_phases(channel: JobChannel, df_pilaga: pd.DataFrame, df_banco: pd.DataFrame, days_window: int, t_start: float):
+    """
+    progress del pipeline para un job: aviso de la fase (RUN_PROGRESS) y su resultado ya utilizable
+    (RESULTS_PARTIAL): "pairs" = card de pares + head (totales y sobrantes del 1→1, armados con los
+    frames y la etapa 1→1 en mano), después "approved" y "suggested" con las cards de grupos. Los
+    mismos cortes que los endpoints de detalle.
+    """
+    def progress(phase: str, pairs: Optional[dict] = None, groups: Optional[list] = None, **data: Any) -> None:
+        channel.report(phase, **data)
+        if phase == "pairs" and pairs is not None:
+            stages = {"pairs": MEMO if data.get("memo") else COMPUTED, "n1": "pending"}
+            raw_pipeline = {**_stage_pipeline(pairs), "stages": stages}
+            head = _summarize(df_pilaga, df_banco, days_window, t_start, include_descomposicion=False,
+                              raw_pipeline=raw_pipeline, wait_n1=False)
+            channel.publish("pairs", {"pares": _pairs_out(pairs["pairs_df"], days_window), "head": head})
+        elif groups is not None:
+            channel.publish(phase, _n1_out(groups, phase, days_window))
+    return progress
+
+
+def _build_run(
+    uri_extracto: str,
+    uri_contable: str,
+    days_window: int,
+    resume: bool = False,
+    channel: Optional[JobChannel] = None,
+    run_id: Optional[str] = None,
+    reuse: bool = False,
+) -> dict[str, Any]:
+    """
+    Corrida completa de /api/reconcile/start: pipeline + resumen calculados una vez y guardados
+    bajo run_id (uno nuevo si no se pasa). Devuelve el run_id, el resumen y los contadores
+    históricos del start.
+    channel: job de /start; avisa cada fase (load, pairs, approved, suggested) y corta si se canceló.
+    reuse: devolver la corrida ya guardada bajo run_id si terminó completa (una cortada por
+    presupuesto se recalcula).
+    """
+    if run_id and reuse:
+        try:
+            prev = _RUNS.get(run_id)
+        except RunNotFoundError:
+            prev = None
+        if prev is not None and prev["pipeline"]["complete"]:
+            return {"run_id": run_id, "summary": prev["summary"], **prev["counts"]}
+    if channel is not None:
+        channel.begin()
+    t_start = time.perf_counter()
+    df_pilaga, df_banco = _load_frames(uri_extracto, uri_contable)
+    if channel is not None:
+        channel.report("load", rows={"pilaga": int(len(df_pilaga)), "banco": int(len(df_banco))})
+    progress = _publish_phases(channel, df_pilaga, df_banco, days_window, t_start) if channel is not None else None
+    pipeline = _compute_pipeline(df_pilaga, df_banco, days_window, resume=resume, memo=True, progress=progress)
+    if channel is not None:
+        channel.check()  # cancelado durante la última fase: no guardar la corrida
+    summary = _summarize(df_pilaga, df_banco, days_window, t_start, include_descomposicion=True,
+                         resume=resume, raw_pipeline=pipeline)
+    run_id = run_id or _RUNS.new_run_id()
+    summary["run_id"] = run_id
+    conc_pairs = int(len(pipeline["pairs_df"]))
+    # Contadores históricos de /start (solo 1→1)
+    counts = {
+        "movimientos_pilaga": int(len(df_pilaga)),
+        "movimientos_banco": int(len(df_banco)),
+        "conciliados_pares": conc_pairs,
+        "no_en_banco": int(len(df_pilaga)) - conc_pairs,
+        "no_en_pilaga": int(len(df_banco)) - conc_pairs,
+        "days_window": int(days_window),
+    }
+    _RUNS.put(run_id, {
+        "uri_extracto": uri_extracto,
+        "uri_contable": uri_contable,
+        "days_window": int(days_window),
+        "created_at": time.time(),
+        "pipeline": pipeline,
+        "summary": summary,
+        "counts": counts,
+    })
+    return {"run_id": run_id, "summary": summary, **counts}
+
+
+def _run_summary(
+    run_id: str,
+    uri_extracto: str = "",
+    uri_contable: str = "",
+    days_window: int = 5,
+    include_descomposicion: bool = True,
+) -> dict[str, Any]:
+    """Resumen guardado de la corrida (RunNotFoundError si no está o es de otros archivos, ver _stored_run)."""
+    summary = dict(_stored_run(run_id, uri_extracto, uri_contable, days_window)["summary"])
+    if not include_descomposicion:
+        summary.pop("descomposicion", None)
+    return summary
+
+
+def _with_flight_stats(summary: dict[str, Any]) -> dict[str, Any]:
+    """Contadores del single-flight (viven en el proceso del server, no en el pool)."""
+    return {**summary, "single_flight": _FLIGHTS.stats()}
+
+
 def _parse_form(request: Any) -> tuple[str, str, int]:
     form = request
     uri_extracto = form.get("uri_extracto") or form.get("extracto_original_uri") or ""
@@ -174,6 +349,8 @@ async def reconcile_summary(request: Any) -> Response:
       - uri_extracto   : file://... (obligatorio)
       - uri_contable   : file://... (obligatorio)
       - days_window    : int (opcional, default 5)
+      - resume         : 1 = retomar la búsqueda N→1 cortada por presupuesto (opcional)
+      - run_id         : corrida de /api/reconcile/start (opcional; reemplaza a las URIs, sin recalcular)
 
     Respuesta completa (compatibilidad hacia atrás):
       {
@@ -184,14 +361,20 @@ async def reconcile_summary(request: Any) -> Response:
     try:
         form = await request.form()
         uri_extracto, uri_contable, days_window = _parse_form(form)
+        run_id = _parse_run_id(form)
 
-        if not uri_extracto or not uri_contable:
-            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable son obligatorios."}, status_code=400)
+        if not run_id and (not uri_extracto or not uri_contable):
+            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable son obligatorios (o run_id)."}, status_code=400)
 
-        summary = _build_summary(uri_extracto, uri_contable, days_window, include_descomposicion=True)
+        if not run_id:
+            run_id = await _coalesced_run_id(uri_extracto, uri_contable, days_window, resume=_parse_resume(form))
+        summary = await run_in_pool(_run_summary, run_id, uri_extracto, uri_contable, days_window,
+                                    include_descomposicion=True)
 
-        return Response({"ok": True, "summary": summary}, status_code=200)
+        return Response({"ok": True, "summary": _with_flight_stats(summary)}, status_code=200)
 
+    except RunNotFoundError:
+        return _run_not_found(run_id)
     except Exception as e:
         tb = traceback.format_exc(limit=12)
         print("[reconcile_summary] ERROR:", type(e).__name__, str(e), flush=True)
@@ -204,16 +387,35 @@ async def reconcile_summary(request: Any) -> Response:
 
 @post("/api/reconcile/summary/head")
 async def reconcile_summary_head(request: Any) -> Response:
-    """Devuelve solo el head (totales/cantidades) sin la descomposición."""
+    """
+    Devuelve solo el head (totales/cantidades) sin la descomposición.
+    Sin run_id ni resume no espera la búsqueda N→1: summary.stages["n1"] = "pending" y complete=False
+    indican que no_en_banco / no_en_pilaga son los sobrantes del 1→1.
+    """
     try:
         form = await request.form()
         uri_extracto, uri_contable, days_window = _parse_form(form)
-
-        if not uri_extracto or not uri_contable:
-            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable son obligatorios."}, status_code=400)
-
-        summary = _build_summary(uri_extracto, uri_contable, days_window, include_descomposicion=False)
-        return Response({"ok": True, "summary": summary}, status_code=200)
+        run_id = _parse_run_id(form)
+
+        if not run_id and (not uri_extracto or not uri_contable):
+            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable son obligatorios (o run_id)."}, status_code=400)
+
+        resume = _parse_resume(form)
+        if run_id or resume:
+            if not run_id:
+                run_id = await _coalesced_run_id(uri_extracto, uri_contable, days_window, resume=True)
+            summary = await run_in_pool(_run_summary, run_id, uri_extracto, uri_contable, days_window,
+                                        include_descomposicion=False)
+        else:
+            # Totales + etapa 1→1: el head no espera la búsqueda N→1 (la usa si ya está memoizada)
+            summary = await _FLIGHTS.do(
+                _flight_key("head", uri_extracto, uri_contable, days_window),
+                lambda: run_in_pool(_build_summary, uri_extracto, uri_contable, days_window,
+                                    include_descomposicion=False, wait_n1=False),
+            )
+        return Response({"ok": True, "summary": _with_flight_stats(summary)}, status_code=200)
+    except RunNotFoundError:
+        return _run_not_found(run_id)
     except Exception as e:
         tb = traceback.format_exc(limit=12)
         print("[reconcile_summary_head] ERROR:", type(e).__name__, str(e), flush=True)
@@ -230,13 +432,22 @@ async def reconcile_summary_descomposicion(request: Any) -> Response:
     try:
         form = await request.form()
         uri_extracto, uri_contable, days_window = _parse_form(form)
+        run_id = _parse_run_id(form)
 
-        if not uri_extracto or not uri_contable:
-            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable son obligatorios."}, status_code=400)
+        if not run_id and (not uri_extracto or not uri_contable):
+            return Response({"ok": False, "message": "Faltan URIs: uri_extracto y uri_contable son obligatorios (o run_id)."}, status_code=400)
 
-        summary = _build_summary(uri_extracto, uri_contable, days_window, include_descomposicion=True)
+        if not run_id:
+            run_id = await _coalesced_run_id(uri_extracto, uri_contable, days_window, resume=_parse_resume(form))
+        summary = await run_in_pool(_run_summary, run_id, uri_extracto, uri_contable, days_window,
+                                    include_descomposicion=True)
         descomposicion = summary.get("descomposicion", {})
-        return Response({"ok": True, "descomposicion": descomposicion, "days_window": summary.get("days_window")}, status_code=200)
+        return Response(
+            {"ok": True, "descomposicion": descomposicion, "days_window": summary.get("days_window"), "complete": summary.get("complete")},
+            status_code=200,
+        )
+    except RunNotFoundError:
+        return _run_not_found(run_id)
     except Exception as e:
         tb = traceback.format_exc(limit=12)
         print("[reconcile_summary_descomposicion] ERROR:", type(e).__name__, str(e), flush=True)
@@ -2,6 +2,7 @@
 # SrvRestAstroLS_v1/routes/v1/uploads_v2_concilia.py
 from __future__ import annotations
 import asyncio
+import hashlib
 import shutil
 import traceback
 from pathlib import Path
@@ -15,7 +16,16 @@ from litestar.enums import MediaType  # 👈 usamos MediaType.JSON
 
 import globalVar as Var
 from .agui_notify import emit
-from services.ingest.sniff_bank import sniff_file
+from services.ingest.sniff_bank import bank_from_filename, sniff_file
+from services.ingest.sniff_cache import SniffCache
+from services.process_pool import run_in_pool
+
+# Re-uploads del mismo contenido: devolvemos el preview cacheado y reusamos el archivo guardado.
+_SNIFF_CACHE = SniffCache(
+    Var.SNIFF_CACHE_DIR,
+    max_entries=Var.SNIFF_CACHE_MAX_ENTRIES,
+    max_bytes=Var.SNIFF_CACHE_MAX_BYTES,
+)
 
 def _merge_validation_for_role(intel: dict, role: str) -> dict | None:
     """Combina la validación base con un error de tipo si role != kind detectado."""
@@ -58,33 +68,51 @@ async def _handle_upload(request: Any, role_required: Optional[str] = None, path
                 status_code=400,
             )
 
-        # 1) Guardar a /tmp (stream)
+        # 1) Guardar a /tmp (stream) calculando el hash de contenido en el mismo pase
         filename = getattr(file, "filename", None) or f"upload_{uuid4()}.bin"
         tmp_path = Path(f"/tmp/{uuid4()}_{filename}")
         bytes_written = 0
+        hasher = hashlib.sha256()
         with open(tmp_path, "wb") as out:
             while True:
                 chunk = await file.read(1024 * 1024)
                 if not chunk:
                     break
                 out.write(chunk)
+                hasher.update(chunk)
                 bytes_written += len(chunk)
+        content_sha256 = hasher.hexdigest()
+        # El sniff también mira el nombre (banco de un extracto sin datos en el header): entra en la clave
+        cache_key = "-".join(filter(None, (content_sha256, bank_from_filename(filename))))
+
+        # 2) ¿Ya lo vimos? Reusar archivo guardado + sniff previo
+        cached = _SNIFF_CACHE.get(cache_key)
+        if cached is not None:
+            tmp_path.unlink(missing_ok=True)
+            original_uri = cached["original_uri"]
+            intel = cached["intel"]
+        else:
+            # 2b) Mover a storage/incoming
+            original_uri = Var.resolve_storage_uri("incoming", filename=filename)
+            if not original_uri.startswith("file://"):
+                return Response(
+                    content={"ok": False, "message": "Storage provider no soportado."},
+                    media_type=MediaType.JSON,
+                    status_code=500,
+                )
+
+            dst = Path(urlparse(original_uri).path)
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(tmp_path, dst)
+
+            # 3) Sniff de contenido (los errores de sniff no se cachean)
+            intel = await run_in_pool(sniff_file, dst, filename_hint=filename)
+            if not (intel.get("detected") or {}).get("error"):
+                try:
+                    _SNIFF_CACHE.put(cache_key, intel=intel, original_uri=original_uri, stored_path=dst, filename=filename)
+                except Exception as e:
+                    print("[sniff_cache] WARN:", type(e).__name__, str(e), flush=True)
 
-        # 2) Mover a storage/incoming
-        original_uri = Var.resolve_storage_uri("incoming", filename=filename)
-        if not original_uri.startswith("file://"):
-            return Response(
-                content={"ok": False, "message": "Storage provider no soportado."},
-                media_type=MediaType.JSON,
-                status_code=500,
-            )
-
-        dst = Path(urlparse(original_uri).path)
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        shutil.move(tmp_path, dst)
-
-        # 3) Sniff de contenido
-        intel = sniff_file(dst, filename_hint=filename)
         source_file_id = str(uuid4())
         validation = _merge_validation_for_role(intel, role)
         needs = dict(intel.get("needs", {}))
@@ -119,6 +147,8 @@ async def _handle_upload(request: Any, role_required: Optional[str] = None, path
                         "filename": filename,
                         "correlationId": correlationId,
                         "path": path_label,
+                        "content_sha256": content_sha256,
+                        "cache_hit": cached is not None,
                     },
                 },
             }
@@ -136,6 +166,8 @@ async def _handle_upload(request: Any, role_required: Optional[str] = None, path
                 "filename": filename,
                 "role": role,
                 "path": path_label,
+                "content_sha256": content_sha256,
+                "cache_hit": cached is not None,
             },
             media_type=MediaType.JSON,
             status_code=200,
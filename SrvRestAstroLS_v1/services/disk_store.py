@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/disk_store.py
+"""
+Directorio de entradas <clave><sufijo> compartido entre procesos (workers del server y del pool).
+
+Base común de las cachés en disco (SniffCache, N1CheckpointStore, RunStore): escritura atómica
+(tmp + os.replace, así un lector nunca ve un archivo a medias), lecturas tolerantes a borrados
+concurrentes, TTL por mtime y desalojo LRU por mtime (quien lee una entrada la "toca" con touch)
+acotado por cantidad de entradas y, opcionalmente, por bytes. El formato del contenido (JSON,
+pickle, versión) queda a cargo de cada store.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+
+class DiskStore:
+    """Entradas en disco con escritura atómica, TTL y LRU por mtime."""
+
+    def __init__(self, root: Path | str, suffix: str, max_entries: int, max_bytes: int = 0, ttl_seconds: float = 0):
+        self.root = Path(root)
+        self.suffix = suffix
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))  # 0 = sin tope de bytes
+        self.ttl_seconds = max(0.0, float(ttl_seconds))  # 0 = sin vencimiento
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> Path:
+        return self.root / f"{key}{self.suffix}"
+
+    def expired(self, mtime_ns: int) -> bool:
+        return self.ttl_seconds > 0 and (time.time_ns() - mtime_ns) > self.ttl_seconds * 10**9
+
+    def stat(self, key: str) -> Optional[os.stat_result]:
+        """stat de la entrada o None si no existe; una entrada vencida se borra y cuenta como ausente."""
+        try:
+            st = self.path(key).stat()
+        except OSError:
+            return None
+        if self.expired(st.st_mtime_ns):
+            self.discard(key)
+            return None
+        return st
+
+    def read_bytes(self, key: str) -> Optional[bytes]:
+        """Contenido de la entrada (None si no existe o venció). No la marca como usada: ver touch."""
+        if self.stat(key) is None:
+            return None
+        try:
+            return self.path(key).read_bytes()
+        except OSError:
+            return None
+
+    def touch(self, key: str) -> None:
+        """LRU/TTL: marca la entrada como usada recién."""
+        try:
+            os.utime(self.path(key), None)
+        except OSError:
+            pass
+
+    def write_bytes(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.root / f".{key}.{uuid4().hex}.tmp"
+            tmp.write_bytes(data)
+            os.replace(tmp, self.path(key))
+            self._evict()
+
+    def discard(self, key: str) -> None:
+        self._unlink(self.path(key))
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """Borra las vencidas y, de las demás, las menos usadas hasta respetar los topes."""
+        entries: list[tuple[int, int, Path]] = []
+        for p in self.root.glob(f"*{self.suffix}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            if self.expired(st.st_mtime_ns):
+                self._unlink(p)
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, p))
+        entries.sort(key=lambda e: e[0])  # más viejo primero
+
+        count = len(entries)
+        total = sum(e[1] for e in entries)
+        for _, size, p in entries:
+            if count <= self.max_entries and (not self.max_bytes or total <= self.max_bytes):
+                break
+            self._unlink(p)
+            count -= 1
+            total -= size
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/frame_cache.py
+"""
+Caché LRU en memoria (por proceso) de DataFrames de los loaders.
+
+Acotada por bytes (ver frame_nbytes) y con TTL por entrada. Los frames se guardan
+congelados (arrays read-only, incluidos los ndarray detrás de fechas y categorías) y se
+entregan como copia superficial: sin copiar los datos, cualquier escritura in-place levanta
+ValueError en lugar de corromper la caché, y agregar o quitar columnas solo cambia la copia. Quien necesite modificar un frame tiene que copiarlo (como ya
+hacen _filter_movements_df y _compute_pipeline). Un frame con columnas que no se pueden
+congelar (p.ej. arrays de Arrow) no se cachea.
+"""
+from __future__ import annotations
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+
+def _block_arrays(df) -> list:
+    """Arrays de los bloques del frame (BlockManager.arrays: API interna de pandas, >= 1.3)."""
+    arrays = getattr(getattr(df, "_mgr", None), "arrays", None)
+    if arrays is None:
+        raise TypeError("esta versión de pandas no expone los bloques del DataFrame (_mgr.arrays)")
+    return list(arrays)
+
+
+def _backing_ndarrays(arr) -> list:
+    """ndarrays que guardan los datos de un array de bloque (numpy, fechas/categorías, nullable)."""
+    if isinstance(arr, np.ndarray):
+        return [arr]
+    inner = getattr(arr, "_ndarray", None)  # DatetimeArray, TimedeltaArray, Categorical, ...
+    if isinstance(inner, np.ndarray):
+        return [inner]
+    data, mask = getattr(arr, "_data", None), getattr(arr, "_mask", None)  # Int64, boolean, ...
+    if isinstance(data, np.ndarray) and isinstance(mask, np.ndarray):
+        return [data, mask]
+    raise TypeError(f"no se puede congelar una columna {type(arr).__name__}")
+
+
+def freeze_frame(df):
+    """
+    Marca read-only los arrays de cada bloque del DataFrame (no copia).
+    TypeError si algún bloque no se puede congelar (el frame queda sin tocar).
+    """
+    targets = [nd for arr in _block_arrays(df) for nd in _backing_ndarrays(arr)]
+    for nd in targets:
+        nd.flags.writeable = False
+    return df
+
+
+def frame_nbytes(df) -> int:
+    """
+    Bytes aproximados (arrays + objetos Python de las columnas object).
+    No usa memory_usage(deep=True): pandas falla con arrays object read-only.
+    """
+    total = 0
+    try:
+        total += int(df.index.nbytes)
+    except Exception:
+        pass
+    for arr in _block_arrays(df):
+        total += int(getattr(arr, "nbytes", 0))
+        if isinstance(arr, np.ndarray) and arr.dtype == object:
+            total += sum(sys.getsizeof(v) for v in arr.ravel())
+    return total
+
+
+class FrameCache:
+    """
+    LRU byte-aware con TTL y contadores (hits/misses/evictions/expirations).
+    Un frame más grande que el presupuesto no se cachea.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float = 0):
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))  # 0 = sin vencimiento
+        self._lock = threading.Lock()
+        # key -> (frame, bytes, vence_en | None)
+        self._data: "OrderedDict[Hashable, tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable):
+        """Copia superficial del frame (columnas read-only) o None. Las entradas vencidas cuentan como miss."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            df, size, expires = item
+            if expires is not None and time.monotonic() >= expires:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return df.copy(deep=False)
+
+    def put(self, key: Hashable, df):
+        """
+        Congela y guarda el frame. Devuelve una copia superficial de lo guardado (como get), o el
+        mismo frame si no se cacheó (no se puede congelar o excede max_bytes).
+        """
+        try:
+            freeze_frame(df)
+        except TypeError:
+            return df
+        size = frame_nbytes(df)
+        if size > self.max_bytes:
+            return df
+        expires = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (df, size, expires)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._data:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+        return df.copy(deep=False)
+
+    def _drop(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,185 @@
+# SrvRestAstroLS_v1/services/ingest/canonical_store.py
+"""
+Store canónico en Parquet de los archivos confirmados.
+
+Al confirmar un archivo (/api/ingest/confirm) se normaliza una sola vez y se guarda en
+    storage/canonical/account=<cuenta>/period=<YYYY-MM>/<kind>-<id>.parquet
+(layout de Var.resolve_storage_uri). Los loaders de conciliación leen de acá en lugar
+de volver a parsear el XLSX.
+
+Como los loaders solo conocen el archivo original, hay un índice chico por archivo
+fuente en storage/canonical/_index/<kind>-<id>.json que apunta a la partición; se
+invalida solo si el XLSX cambia (size/mtime) o sube CANONICAL_VERSION.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urlparse
+from uuid import uuid4
+
+import globalVar as Var
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except Exception:
+    pa = None
+    pq = None
+
+# Subir cuando cambie la normalización de los loaders: invalida lo materializado antes.
+CANONICAL_VERSION = 1
+
+# Columnas del dataset canónico (extracto y PILAGA comparten esquema)
+CANONICAL_COLUMNS = ["fecha", "monto", "documento", "ingreso_bruto", "egreso_bruto", "origen"]
+
+_META_KEY = b"concilia"
+_LOCK = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return pq is not None and Var.STORAGE_PROVIDER == "local"
+
+
+def _canonical_root() -> Path:
+    return Path(Var.STORAGE_LOCAL_ROOT) / Var.STORAGE_CANONICAL
+
+
+def _source_id(kind: str, source: Path) -> str:
+    digest = hashlib.sha1(str(Path(source).resolve()).encode("utf-8")).hexdigest()[:16]
+    return f"{kind}-{digest}"
+
+
+def _index_path(kind: str, source: Path) -> Path:
+    return _canonical_root() / "_index" / f"{_source_id(kind, source)}.json"
+
+
+def _atomic_write(dst: Path, write) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.parent / f".{dst.name}.{uuid4().hex}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, dst)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _partition_value(value: Any) -> str:
+    txt = str(value or "").strip() or "unknown"
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in txt)
+
+
+def write_canonical(
+    kind: str,
+    source: Path,
+    df,
+    *,
+    account_id: Any = None,
+    period: Optional[str] = None,
+    saldos: tuple[Optional[float], Optional[float]] = (None, None),
+) -> Optional[str]:
+    """
+    Guarda el DF normalizado (columnas CANONICAL_COLUMNS) y los saldos en su
+    partición y actualiza el índice del archivo fuente. Devuelve la URI del parquet o None
+    si el store no está habilitado.
+    """
+    if not is_enabled():
+        return None
+
+    source = Path(source)
+    st = source.stat()
+    data = df.copy()
+    # El extracto trae solo el monto neto: ingreso/egreso se derivan del signo
+    if "ingreso_bruto" not in data.columns:
+        data["ingreso_bruto"] = data["monto"].clip(lower=0.0)
+    if "egreso_bruto" not in data.columns:
+        data["egreso_bruto"] = (-data["monto"]).clip(lower=0.0)
+    data = data.loc[:, CANONICAL_COLUMNS].reset_index(drop=True)
+
+    meta = {
+        "version": CANONICAL_VERSION,
+        "kind": kind,
+        "columns": list(df.columns),
+        "saldo_inicial": saldos[0],
+        "saldo_final": saldos[1],
+    }
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: json.dumps(meta).encode("utf-8")})
+
+    uri = Var.resolve_storage_uri(
+        "canonical",
+        account_id=_partition_value(account_id),
+        period=_partition_value(period),
+        filename=f"{_source_id(kind, source)}.parquet",
+    )
+    dst = Path(urlparse(uri).path)
+    entry = {
+        "version": CANONICAL_VERSION,
+        "kind": kind,
+        "uri": uri,
+        "source_path": str(source.resolve()),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+    with _LOCK:
+        _atomic_write(dst, lambda tmp: pq.write_table(table, str(tmp)))
+        _atomic_write(
+            _index_path(kind, source),
+            lambda tmp: tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8"),
+        )
+    return uri
+
+
+def _lookup(kind: str, source: Path) -> Optional[dict]:
+    try:
+        entry = json.loads(_index_path(kind, source).read_text(encoding="utf-8"))
+        st = Path(source).stat()
+    except (OSError, ValueError):
+        return None
+    if entry.get("version") != CANONICAL_VERSION:
+        return None
+    if st.st_size != entry.get("size") or st.st_mtime_ns != entry.get("mtime_ns"):
+        return None
+    return entry
+
+
+def read_canonical(kind: str, source: Path) -> Optional[tuple[Any, dict]]:
+    """
+    Devuelve (DF con las columnas originales del loader, metadata con saldos) si el archivo
+    fuente fue materializado y no cambió desde entonces; si no, None.
+    """
+    if not is_enabled():
+        return None
+    entry = _lookup(kind, source)
+    if entry is None:
+        return None
+    try:
+        pf = pq.ParquetFile(urlparse(entry["uri"]).path)
+        meta = json.loads((pf.schema_arrow.metadata or {})[_META_KEY])
+        if meta.get("version") != CANONICAL_VERSION:
+            return None
+        df = pf.read().to_pandas()
+    except Exception:
+        return None
+    return df.loc[:, meta["columns"]], meta
+
+
+def read_canonical_saldos(kind: str, source: Path) -> Optional[tuple[Optional[float], Optional[float]]]:
+    """Saldos (inicial, final) guardados en la metadata del parquet, sin leer las filas."""
+    if not is_enabled():
+        return None
+    entry = _lookup(kind, source)
+    if entry is None:
+        return None
+    try:
+        schema = pq.read_schema(urlparse(entry["uri"]).path)
+        meta = json.loads((schema.metadata or {})[_META_KEY])
+    except Exception:
+        return None
+    if meta.get("version") != CANONICAL_VERSION:
+        return None
+    return (meta.get("saldo_inicial"), meta.get("saldo_final"))
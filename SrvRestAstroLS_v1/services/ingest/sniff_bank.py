@@ -1,9 +1,11 @@
 # SrvRestAstroLS_v1/services/ingest/sniff_bank.py
 from __future__ import annotations
 import re
+from contextlib import contextmanager
+from itertools import islice
 from datetime import datetime, date, timedelta
 from pathlib import Path
-from typing import Optional, Any, List, Tuple
+from typing import Optional, Any, Iterator, List, Sequence, Tuple, Union
 
 # ===== Dependencias =====
 try:
@@ -13,8 +15,15 @@ except Exception:
 
 try:
     from openpyxl import load_workbook  # type: ignore
+    from openpyxl.cell.cell import ERROR_CODES as _XL_ERROR_CODES  # type: ignore
 except Exception:
     load_workbook = None
+    _XL_ERROR_CODES = ()
+
+try:
+    from services.ingest.xlsx_stream import XlsxStream  # lector XML liviano para escaneos de filas
+except Exception:
+    XlsxStream = None
 
 # ===== Config / Mapeos =====
 ACCOUNT_MAP = {
@@ -48,6 +57,203 @@ PILAGA_HEADER_KEYWORDS = (
     "RESUMEN CUENTA TESORERÍA",
 )
 
+# ===== Contexto de sniff (una sola lectura del workbook) =====
+class SniffContext:
+    """
+    Abre el workbook una única vez y cachea las filas de cada hoja a medida que se
+    van pidiendo. Header, preview, período y validación leen de acá, así el ZIP/XML
+    se parsea una sola vez por upload.
+    Para .xlsx/.xlsm usa XlsxStream (tuplas planas, sin objetos celda); si no está
+    disponible o no puede leer el archivo, cae a openpyxl read-only.
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._wb = None
+        self._xs = None
+        self._exc: Optional[BaseException] = None
+        # hoja -> (filas ya leídas, iterador pendiente | None, excepción de lectura | None, viene de XlsxStream)
+        self._sheets: dict[str, list] = {}
+        if XlsxStream is not None and self.path.suffix.lower() in (".xlsx", ".xlsm"):
+            try:
+                self._xs = XlsxStream(self.path)
+                return
+            except Exception:
+                self._xs = None
+        self._open_openpyxl()
+
+    def _open_openpyxl(self) -> bool:
+        if self._wb is not None:
+            return True
+        if not load_workbook:
+            self._exc = RuntimeError("openpyxl no disponible")
+            return False
+        try:
+            self._wb = load_workbook(filename=str(self.path), read_only=True, data_only=True)
+        except Exception as e:
+            self._exc = e
+            return False
+        return True
+
+    def __enter__(self) -> "SniffContext":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._xs is not None:
+            self._xs.close()
+            self._xs = None
+        if self._wb is not None:
+            try:
+                self._wb.close()
+            except Exception:
+                pass
+            self._wb = None
+
+    @property
+    def sheet_names(self) -> list[str]:
+        if self._xs is not None:
+            return self._xs.sheet_names
+        if self._wb is None:
+            return []
+        return list(self._wb.sheetnames)
+
+    @property
+    def first_sheet_name(self) -> Optional[str]:
+        if self._xs is not None:
+            names = self._xs.worksheet_names
+            return names[0] if names else None
+        if self._wb is None or not self._wb.worksheets:
+            return None
+        return self._wb.worksheets[0].title
+
+    def _openpyxl_rows(self, sheet: Optional[str]) -> Iterator[tuple]:
+        if not self._open_openpyxl():
+            raise self._exc
+        ws = self._wb[sheet] if sheet is not None else self._wb.worksheets[0]
+        return _padded_rows(ws)
+
+    def rows(self, limit: Optional[int] = None, sheet: Optional[str] = None) -> list[tuple]:
+        """
+        Devuelve hasta `limit` filas (tuplas de valores) de la hoja (default: primera).
+        Las filas se leen en streaming y quedan cacheadas: pedir más filas continúa
+        la lectura donde quedó, nunca vuelve a abrir el archivo.
+        """
+        if self._exc is not None and self._xs is None:
+            raise self._exc
+        key = sheet if sheet is not None else self.first_sheet_name
+        state = self._sheets.get(key)
+        if state is None:
+            if self._xs is not None:
+                xs = self._xs
+                state = [[], _pad_rows(xs.iter_rows(sheet), xs.declared_width(sheet)), None, True]
+            elif self._wb is not None:
+                state = [[], self._openpyxl_rows(sheet), None, False]
+            else:
+                raise RuntimeError("workbook cerrado")
+            self._sheets[key] = state
+        cached, it, err, streamed = state
+        while it is not None and (limit is None or len(cached) < limit):
+            try:
+                cached.append(next(it))
+            except StopIteration:
+                state[1] = it = None
+            except Exception as e:
+                if streamed:
+                    # XML que el lector liviano no entiende: seguir con openpyxl desde la misma fila
+                    state[3] = streamed = False
+                    try:
+                        state[1] = it = islice(self._openpyxl_rows(sheet), len(cached), None)
+                        continue
+                    except Exception as e2:
+                        e = e2
+                state[1] = it = None
+                state[2] = err = e
+        if err is not None and (limit is None or len(cached) < limit):
+            raise err
+        return cached if limit is None else cached[:limit]
+
+    def frame(self, sheet: Optional[str] = None, header: Optional[int] = 0, nrows: Optional[int] = None):
+        """Equivalente a pd.read_excel(path, sheet_name=sheet, header=header, nrows=nrows) sobre las filas cacheadas."""
+        needed = None if nrows is None else nrows + (0 if header is None else header + 1)
+        return _rows_to_frame(self.rows(needed, sheet=sheet), header=header, nrows=nrows)
+
+
+def _padded_rows(ws) -> Iterator[tuple]:
+    """
+    iter_rows sin confiar en la dimensión declarada (algunos exportadores la dejan mal
+    y openpyxl truncaría columnas), pero rellenando hasta ese ancho como hacía antes.
+    """
+    width = ws.max_column or 0
+    ws.reset_dimensions()
+    return _pad_rows(ws.iter_rows(values_only=True), width)
+
+
+def _pad_rows(rows: Iterator[Sequence[Any]], width: int) -> Iterator[tuple]:
+    for row in rows:
+        row = tuple(row)
+        if len(row) < width:
+            row += (None,) * (width - len(row))
+        yield row
+
+
+def _excel_cell(val: Any) -> Any:
+    """Misma conversión de celdas que pandas aplica con engine openpyxl."""
+    if val is None:
+        return ""
+    if isinstance(val, bool):
+        return val
+    if isinstance(val, (int, float)):
+        ival = int(val)
+        return ival if ival == val else float(val)
+    if isinstance(val, str) and val in _XL_ERROR_CODES:
+        return float("nan")
+    return val
+
+
+def _rows_to_frame(rows: Sequence[tuple], header: Optional[int] = 0, nrows: Optional[int] = None):
+    from pandas.errors import EmptyDataError  # type: ignore
+    from pandas.io.parsers import TextParser  # type: ignore
+
+    data: list[list[Any]] = []
+    last_with_data = -1
+    for i, row in enumerate(rows):
+        conv = [_excel_cell(c) for c in row]
+        while conv and conv[-1] == "":
+            conv.pop()
+        if conv:
+            last_with_data = i
+        data.append(conv)
+    data = data[: last_with_data + 1]
+    if data:
+        width = max(len(r) for r in data)
+        data = [r + [""] * (width - len(r)) for r in data]
+    else:
+        return pd.DataFrame()
+    try:
+        parser = TextParser(data, header=header, nrows=nrows, skip_blank_lines=False)
+        return parser.read(nrows=nrows)
+    except EmptyDataError:
+        return pd.DataFrame()
+
+
+SniffSource = Union[Path, str, SniffContext]
+
+
+@contextmanager
+def _sniff_source(source: SniffSource) -> Iterator[SniffContext]:
+    """Reusa el contexto si ya viene abierto; si es un path, abre uno y lo cierra al salir."""
+    if isinstance(source, SniffContext):
+        yield source
+        return
+    ctx = SniffContext(source)
+    try:
+        yield ctx
+    finally:
+        ctx.close()
+
 # ===== Safe wrapper pública =====
 def sniff_file(path: Path | str, filename_hint: Optional[str] = None) -> dict:
     """Entry point seguro: nunca levanta excepción."""
@@ -76,17 +282,22 @@ def sniff_path(path: Path, filename_hint: Optional[str] = None) -> dict:
 
 # ===== Excel principal =====
 def sniff_excel(path: Path, filename_hint: Optional[str]) -> dict:
+    # Un solo parseo del workbook para todo el sniff
+    with SniffContext(path) as ctx:
+        return _sniff_excel_ctx(ctx, filename_hint)
+
+def _sniff_excel_ctx(ctx: SniffContext, filename_hint: Optional[str]) -> dict:
     # Vista previa (para UI)
-    cols_preview, rows_preview, min_date_tab, max_date_tab = read_table_preview(path)
+    cols_preview, rows_preview, min_date_tab, max_date_tab = read_table_preview(ctx)
 
     # Header comprimido
-    grid = read_excel_header_grid(path, max_rows=20, max_cols=12)
+    grid = read_excel_header_grid(ctx, max_rows=20, max_cols=12)
     raw_header_lines = header_lines_from_grid(grid, limit=8)
     compact_header_lines = compact_header(raw_header_lines)
     header_excerpt = "\n".join(compact_header_lines)
 
     # Nombre de la primera hoja
-    first_sheet_name = read_first_sheet_name(path)
+    first_sheet_name = read_first_sheet_name(ctx)
 
     # 1) PILAGA primero (prioridad)
     if looks_like_pilaga(header_excerpt, grid, first_sheet_name, cols_preview):
@@ -112,28 +323,28 @@ def sniff_excel(path: Path, filename_hint: Optional[str]) -> dict:
 
     # === FAST PATH para CONTABLE (PILAGA) con pandas ===
     if kind == "gl":
-        fmin, fmax = fast_pilaga_period_pandas(path)
+        fmin, fmax = fast_pilaga_period_pandas(ctx)
         if fmin and fmax:
             period_from, period_to = fmin, fmax
         else:
-            ws_min, ws_max = scan_worksheet_dates(path)
+            ws_min, ws_max = scan_worksheet_dates(ctx)
             period_from = period_from or ws_min
             period_to   = period_to   or ws_max
-        validation = validate_gl_pilaga(path)
+        validation = validate_gl_pilaga(ctx)
     else:
         # Extractos: si faltan, escaneo general
         if not (period_from and period_to):
-            ws_min, ws_max = scan_worksheet_dates(path)
+            ws_min, ws_max = scan_worksheet_dates(ctx)
             period_from = period_from or ws_min
             period_to   = period_to   or ws_max
 
         # Validación de extracto (estructura mínima)
-        validation = validate_bank_extract(path, header_from=header_from, header_to=header_to)
+        validation = validate_bank_extract(ctx, header_from=header_from, header_to=header_to)
 
         # Re-chequeo: si por nombre/columnas es PILAGA, forzamos gl
         if looks_like_pilaga(header_excerpt, grid, first_sheet_name, cols_preview):
             kind = "gl"
-            fmin, fmax = fast_pilaga_period_pandas(path)
+            fmin, fmax = fast_pilaga_period_pandas(ctx)
             if fmin and fmax:
                 period_from, period_to = fmin, fmax
 
@@ -169,11 +380,8 @@ def sniff_excel(path: Path, filename_hint: Optional[str]) -> dict:
                 bank = label
                 break
 
-    if not bank and filename_hint and kind == "bank_movements":
-        low = filename_hint.lower()
-        if "ciudad" in low: bank = "ciudad"
-        elif "patagonia" in low: bank = "patagonia"
-        elif "santander" in low: bank = "santander"
+    if not bank and kind == "bank_movements":
+        bank = bank_from_filename(filename_hint)
 
     out = {
         "kind": kind if kind != "unknown" else ("gl" if account_core_dv and RE_PILAGA_ACCOUNT.fullmatch(str(account_core_dv)) else kind),
@@ -198,6 +406,14 @@ def sniff_excel(path: Path, filename_hint: Optional[str]) -> dict:
     }
     return out
 
+def bank_from_filename(filename: Optional[str]) -> Optional[str]:
+    """Banco sugerido por el nombre de archivo (último recurso de la detección de extractos)."""
+    low = (filename or "").lower()
+    if "ciudad" in low: return "ciudad"
+    if "patagonia" in low: return "patagonia"
+    if "santander" in low: return "santander"
+    return None
+
 # ===== Heurísticas de tipo =====
 def header_has_bank_extract_fields(header_excerpt: str | None, grid: list[list[str]]) -> bool:
     if not header_excerpt:
@@ -262,29 +478,26 @@ def columns_look_like_bank(cols: list[str]) -> bool:
     return has_fecha and (has_desc or money_any or saldo_any)
 
 # ===== Header parsing & helpers =====
-def read_excel_header_grid(path: Path, max_rows: int = 20, max_cols: int = 12) -> list[list[str]]:
+def read_excel_header_grid(source: SniffSource, max_rows: int = 20, max_cols: int = 12) -> list[list[str]]:
     if not load_workbook:
         return []
     try:
-        wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-        ws = wb.worksheets[0]
-        grid: list[list[str]] = []
-        for r in ws.iter_rows(min_row=1, max_row=max_rows, min_col=1, max_col=max_cols, values_only=True):
-            row = [(str(c).strip() if c not in (None, "") else "") for c in r]
-            grid.append(row)
-        wb.close()
-        return grid
+        with _sniff_source(source) as ctx:
+            grid: list[list[str]] = []
+            for r in ctx.rows(max_rows):
+                cells = list(r[:max_cols]) + [None] * (max_cols - len(r))
+                row = [(str(c).strip() if c not in (None, "") else "") for c in cells]
+                grid.append(row)
+            return grid
     except Exception:
         return []
 
-def read_first_sheet_name(path: Path) -> Optional[str]:
+def read_first_sheet_name(source: SniffSource) -> Optional[str]:
     if not load_workbook:
         return None
     try:
-        wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-        name = wb.worksheets[0].title
-        wb.close()
-        return name
+        with _sniff_source(source) as ctx:
+            return ctx.first_sheet_name
     except Exception:
         return None
 
@@ -380,8 +593,8 @@ def _is_bank_header_row(cells_norm: list[str]) -> bool:
     score = sum([has_concept, has_fecha, has_importe, has_saldo])
     return has_fecha and score >= 3
 
-def find_bank_header_row(ws, max_rows: int = 80) -> tuple[Optional[int], list[str]]:
-    for idx, row in enumerate(ws.iter_rows(min_row=1, max_row=max_rows, values_only=True), 1):
+def find_bank_header_row(rows: Sequence[tuple], max_rows: int = 80) -> tuple[Optional[int], list[str]]:
+    for idx, row in enumerate(rows[:max_rows], 1):
         norm = [_norm_cell(c) for c in row]
         if _is_bank_header_row(norm):
             # Devolver también la forma original (legible)
@@ -399,7 +612,7 @@ def _find_col_index(header: list[str], keyword: str) -> Optional[int]:
             return i
     return None
 
-def scan_bank_movements(ws, header_row: int, col_fecha: Optional[int], col_saldo: Optional[int], max_rows: int = 5000) -> dict:
+def scan_bank_movements(rows: Sequence[tuple], header_row: int, col_fecha: Optional[int], col_saldo: Optional[int], max_rows: int = 5000) -> dict:
     rows_count = 0
     min_d: Optional[date] = None
     max_d: Optional[date] = None
@@ -408,7 +621,7 @@ def scan_bank_movements(ws, header_row: int, col_fecha: Optional[int], col_saldo
     saldo_final_value: Any = None
 
     max_row_bound = max_rows + header_row
-    for idx, row in enumerate(ws.iter_rows(min_row=header_row + 1, max_row=max_row_bound, values_only=True), header_row + 1):
+    for row in rows[header_row:max_row_bound]:
         cleaned = [c.strip() if isinstance(c, str) else c for c in row]
         if all(_is_empty(c) for c in cleaned):
             continue
@@ -454,7 +667,7 @@ def _parse_iso_date(s: Optional[str]) -> Optional[date]:
     except Exception:
         return None
 
-def validate_bank_extract(path: Path, header_from: Optional[str], header_to: Optional[str]) -> dict:
+def validate_bank_extract(source: SniffSource, header_from: Optional[str], header_to: Optional[str]) -> dict:
     errors: list[str] = []
     warnings: list[str] = []
 
@@ -467,26 +680,23 @@ def validate_bank_extract(path: Path, header_from: Optional[str], header_to: Opt
     scan: dict = {}
 
     try:
-        wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-        ws = wb.worksheets[0]
-
-        header_row, header_cols = find_bank_header_row(ws)
-        if header_row is None:
-            errors.append("No se encontró la cabecera del extracto (Concepto/Fecha/Importe/Saldo).")
-            wb.close()
-            return {"is_valid": False, "errors": errors, "warnings": warnings}
-
-        idx_fecha = _find_col_index(header_cols, "FECHA")
-        idx_importe = _find_col_index(header_cols, "IMPORTE")
-        idx_saldo = _find_col_index(header_cols, "SALDO")
-
-        if idx_fecha is None or idx_importe is None:
-            errors.append("Faltan columnas obligatorias (Fecha / Importe) en la cabecera.")
-        if idx_saldo is None:
-            warnings.append("Columna de Saldo no encontrada; se usará último saldo disponible si existe.")
-
-        scan = scan_bank_movements(ws, header_row, idx_fecha, idx_saldo)
-        wb.close()
+        with _sniff_source(source) as ctx:
+            header_row, header_cols = find_bank_header_row(ctx.rows(80))
+            if header_row is None:
+                errors.append("No se encontró la cabecera del extracto (Concepto/Fecha/Importe/Saldo).")
+                return {"is_valid": False, "errors": errors, "warnings": warnings}
+
+            idx_fecha = _find_col_index(header_cols, "FECHA")
+            idx_importe = _find_col_index(header_cols, "IMPORTE")
+            idx_saldo = _find_col_index(header_cols, "SALDO")
+
+            if idx_fecha is None or idx_importe is None:
+                errors.append("Faltan columnas obligatorias (Fecha / Importe) en la cabecera.")
+            if idx_saldo is None:
+                warnings.append("Columna de Saldo no encontrada; se usará último saldo disponible si existe.")
+
+            max_rows = 5000
+            scan = scan_bank_movements(ctx.rows(header_row + max_rows), header_row, idx_fecha, idx_saldo, max_rows=max_rows)
     except Exception as e:
         errors.append(f"No se pudo validar: {type(e).__name__}: {e}")
         return {"is_valid": False, "errors": errors, "warnings": warnings}
@@ -528,8 +738,8 @@ def validate_bank_extract(path: Path, header_from: Optional[str], header_to: Opt
     }
 
 # ===== Validación contable (PILAGA-like) =====
-def find_pilaga_header_row(ws, max_rows: int = 120) -> tuple[Optional[int], list[str]]:
-    for idx, row in enumerate(ws.iter_rows(min_row=1, max_row=max_rows, values_only=True), 1):
+def find_pilaga_header_row(rows: Sequence[tuple], max_rows: int = 120) -> tuple[Optional[int], list[str]]:
+    for idx, row in enumerate(rows[:max_rows], 1):
         if not row:
             continue
         upper = [_norm_cell(c) for c in row]
@@ -538,14 +748,14 @@ def find_pilaga_header_row(ws, max_rows: int = 120) -> tuple[Optional[int], list
             return idx, original
     return None, []
 
-def scan_pilaga_rows(ws, header_row: int, idx_fecha: Optional[int], idx_ing: Optional[int], idx_egr: Optional[int], idx_acu: Optional[int], max_rows: int = 60000) -> dict:
+def scan_pilaga_rows(rows: Sequence[tuple], header_row: int, idx_fecha: Optional[int], idx_ing: Optional[int], idx_egr: Optional[int], idx_acu: Optional[int], max_rows: int = 60000) -> dict:
     rows_count = 0
     min_d: Optional[date] = None
     max_d: Optional[date] = None
     last_acum: Any = None
 
     max_row_bound = max_rows + header_row
-    for row in ws.iter_rows(min_row=header_row + 1, max_row=max_row_bound, values_only=True):
+    for row in rows[header_row:max_row_bound]:
         if all(_is_empty(c) for c in row):
             continue
 
@@ -571,7 +781,7 @@ def scan_pilaga_rows(ws, header_row: int, idx_fecha: Optional[int], idx_ing: Opt
         "last_acum_value": last_acum,
     }
 
-def validate_gl_pilaga(path: Path) -> dict:
+def validate_gl_pilaga(source: SniffSource) -> dict:
     errors: list[str] = []
     warnings: list[str] = []
 
@@ -584,36 +794,33 @@ def validate_gl_pilaga(path: Path) -> dict:
     scan: dict = {}
 
     try:
-        wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-        ws = wb.worksheets[0]
-
-        header_row, header_cols = find_pilaga_header_row(ws)
-        if header_row is None:
-            errors.append("No se encontró la cabecera contable (Fecha / Ingresos / Egresos / Acumulado).")
-            wb.close()
-            return {"is_valid": False, "errors": errors, "warnings": warnings}
-
-        def _find_idx(label: str) -> Optional[int]:
-            lab = label.upper()
-            for i,c in enumerate(header_cols):
-                up = _norm_cell(c)
-                if lab in up:
-                    return i
-            return None
-
-        idx_fecha = _find_idx("FECHA")
-        idx_ing   = _find_idx("INGRES")
-        idx_egr   = _find_idx("EGRES")
-        idx_acu   = _find_idx("ACUM")
-
-        if idx_fecha is None:
-            errors.append("Falta columna Fecha en la cabecera contable.")
-
-        if idx_ing is None and idx_egr is None and idx_acu is None:
-            warnings.append("No se encontraron columnas de Ingresos/Egresos/Acumulado.")
-
-        scan = scan_pilaga_rows(ws, header_row, idx_fecha, idx_ing, idx_egr, idx_acu)
-        wb.close()
+        with _sniff_source(source) as ctx:
+            header_row, header_cols = find_pilaga_header_row(ctx.rows(120))
+            if header_row is None:
+                errors.append("No se encontró la cabecera contable (Fecha / Ingresos / Egresos / Acumulado).")
+                return {"is_valid": False, "errors": errors, "warnings": warnings}
+
+            def _find_idx(label: str) -> Optional[int]:
+                lab = label.upper()
+                for i,c in enumerate(header_cols):
+                    up = _norm_cell(c)
+                    if lab in up:
+                        return i
+                return None
+
+            idx_fecha = _find_idx("FECHA")
+            idx_ing   = _find_idx("INGRES")
+            idx_egr   = _find_idx("EGRES")
+            idx_acu   = _find_idx("ACUM")
+
+            if idx_fecha is None:
+                errors.append("Falta columna Fecha en la cabecera contable.")
+
+            if idx_ing is None and idx_egr is None and idx_acu is None:
+                warnings.append("No se encontraron columnas de Ingresos/Egresos/Acumulado.")
+
+            max_rows = 60000
+            scan = scan_pilaga_rows(ctx.rows(header_row + max_rows), header_row, idx_fecha, idx_ing, idx_egr, idx_acu, max_rows=max_rows)
     except Exception as e:
         errors.append(f"No se pudo validar contable: {type(e).__name__}: {e}")
         return {"is_valid": False, "errors": errors, "warnings": warnings}
@@ -665,22 +872,25 @@ def parse_dmy(s: Optional[str]) -> Optional[str]:
     return None
 
 # ===== FAST PATH PILAGA con pandas =====
-def fast_pilaga_period_pandas(path: Path) -> tuple[Optional[str], Optional[str]]:
+def fast_pilaga_period_pandas(source: SniffSource) -> tuple[Optional[str], Optional[str]]:
     if pd is None:
         return None, None
     try:
-        xls = pd.ExcelFile(str(path), engine="openpyxl")
-        # hoja preferida
-        sheet = None
-        low_names = [n.lower() for n in xls.sheet_names]
-        for pref in PREFERRED_GL_SHEET_NAMES:
-            if pref in low_names:
-                sheet = xls.sheet_names[low_names.index(pref)]
-                break
-        if sheet is None:
-            sheet = xls.sheet_names[0]
+        with _sniff_source(source) as ctx:
+            # hoja preferida
+            sheet_names = ctx.sheet_names
+            sheet = None
+            low_names = [n.lower() for n in sheet_names]
+            for pref in PREFERRED_GL_SHEET_NAMES:
+                if pref in low_names:
+                    sheet = sheet_names[low_names.index(pref)]
+                    break
+            if sheet is None:
+                sheet = sheet_names[0]
+            if sheet == ctx.first_sheet_name:
+                sheet = None  # misma caché que el resto del sniff
 
-        df = pd.read_excel(xls, sheet_name=sheet, header=None)
+            df = ctx.frame(sheet=sheet, header=None)
         if df.shape[1] == 0:
             return None, None
 
@@ -704,16 +914,16 @@ def fast_pilaga_period_pandas(path: Path) -> tuple[Optional[str], Optional[str]]
         return None, None
 
 # ===== Fallback: escaneo general =====
-def scan_worksheet_dates(path: Path, max_rows: int = 30000) -> tuple[Optional[str], Optional[str]]:
+def scan_worksheet_dates(source: SniffSource, max_rows: int = 30000) -> tuple[Optional[str], Optional[str]]:
     if not load_workbook:
         return None, None
     try:
-        wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-        ws = wb.worksheets[0]
+        with _sniff_source(source) as ctx:
+            rows = ctx.rows(max_rows)
         dmin: Optional[date] = None
         dmax: Optional[date] = None
 
-        for row in ws.iter_rows(min_row=1, max_row=max_rows, values_only=True):
+        for row in rows:
             row_text = " ".join([str(c) for c in row if c]).upper()
             if any(h in row_text for h in EXCLUDE_TEXT_HINTS):
                 continue
@@ -723,7 +933,6 @@ def scan_worksheet_dates(path: Path, max_rows: int = 30000) -> tuple[Optional[st
                     dmin = dt if (dmin is None or dt < dmin) else dmin
                     dmax = dt if (dmax is None or dt > dmax) else dmax
 
-        wb.close()
         return (dmin.isoformat() if dmin else None, dmax.isoformat() if dmax else None)
     except Exception:
         return None, None
@@ -747,11 +956,12 @@ def _as_date(val: Any) -> Optional[date]:
     return None
 
 # ===== Preview tabular =====
-def read_table_preview(path: Path) -> tuple[list[str], list[list[Any]], Optional[str], Optional[str]]:
+def read_table_preview(source: SniffSource) -> tuple[list[str], list[list[Any]], Optional[str], Optional[str]]:
     if pd is None:
         return [], [], None, None
     try:
-        df = pd.read_excel(str(path), engine="openpyxl", nrows=120)
+        with _sniff_source(source) as ctx:
+            df = ctx.frame(header=0, nrows=120)
         cols = [str(c) for c in df.columns.tolist()]
         sample = df.head(10).fillna("").astype(object).values.tolist()
         min_d, max_d = try_parse_dates_in_df(df)
@@ -0,0 +1,61 @@
+# SrvRestAstroLS_v1/services/ingest/sniff_cache.py
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+from services.disk_store import DiskStore
+
+# Subir cuando cambie la heurística de sniff_bank: invalida lo cacheado antes.
+SNIFF_CACHE_VERSION = 1
+
+
+class SniffCache:
+    """
+    Caché persistente en disco de resultados de sniff, direccionada por hash de contenido.
+    Un archivo JSON por clave (<sha256>[-<banco del nombre>].json) con el intel y el archivo ya guardado en storage.
+    Acotada por cantidad de entradas y bytes; desaloja por LRU usando el mtime (se "toca" en cada hit).
+    Segura entre workers: escrituras atómicas y lecturas tolerantes a borrados (DiskStore).
+    """
+
+    def __init__(self, root: Path | str, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024):
+        self._store = DiskStore(root, ".json", max_entries=max_entries, max_bytes=max(1, int(max_bytes)))
+
+    def get(self, digest: str) -> Optional[dict[str, Any]]:
+        """Devuelve la entrada si existe y el archivo guardado sigue intacto; si no, None."""
+        try:
+            entry = json.loads(self._store.read_bytes(digest) or b"")
+        except ValueError:
+            return None
+
+        if entry.get("version") != SNIFF_CACHE_VERSION:
+            self._store.discard(digest)
+            return None
+
+        # El archivo en storage puede haberse pisado (mismo filename, otro contenido) o borrado.
+        stored = Path(entry.get("stored_path") or "")
+        try:
+            st = stored.stat()
+        except OSError:
+            self._store.discard(digest)
+            return None
+        if st.st_size != entry.get("size") or st.st_mtime_ns != entry.get("mtime_ns"):
+            self._store.discard(digest)
+            return None
+
+        self._store.touch(digest)  # LRU: marcar como usado recién
+        return entry
+
+    def put(self, digest: str, *, intel: dict, original_uri: str, stored_path: Path, filename: str) -> None:
+        st = Path(stored_path).stat()
+        entry = {
+            "version": SNIFF_CACHE_VERSION,
+            "sha256": digest,
+            "original_uri": original_uri,
+            "stored_path": str(stored_path),
+            "filename": filename,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "intel": intel,
+        }
+        self._store.write_bytes(digest, json.dumps(entry, ensure_ascii=False, default=str).encode("utf-8"))
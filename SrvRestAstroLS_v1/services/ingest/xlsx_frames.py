@@ -0,0 +1,104 @@
+# SrvRestAstroLS_v1/services/ingest/xlsx_frames.py
+"""
+Motor "xlsx-stream" para los loaders de conciliación: misma interfaz que pd.ExcelFile
+(sheet_names + parse(...)) pero las celdas salen de XlsxStream (expat) en lugar de los
+objetos celda de openpyxl.
+
+Solo reemplaza la lectura de celdas: la conversión replica OpenpyxlReader (None -> "",
+errores -> NaN, numéricos enteros -> int) y el armado del DataFrame (header, nrows,
+skiprows, usecols, dtype) lo sigue haciendo el BaseExcelReader de pandas. Con nrows deja
+de recorrer la hoja apenas tiene las filas pedidas, que es lo que aprovecha la fase 1 de
+los loaders. _read_excel igual valida una muestra contra openpyxl antes de adoptarlo.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from pandas.io.excel._base import BaseExcelReader
+
+from services.ingest.xlsx_stream import CellError, XlsxStream
+
+
+def _convert_cell(value: Any) -> Any:
+    if value is None:
+        return ""  # compat con xlrd/openpyxl en pandas
+    if isinstance(value, CellError):
+        return np.nan
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        val = int(value)
+        if val == value:
+            return val
+        return float(value)
+    return value
+
+
+class XlsxStreamReader(BaseExcelReader):
+    """BaseExcelReader sobre XlsxStream (solo worksheets, como OpenpyxlReader)."""
+
+    def __init__(self, path: Path | str):
+        # Sin get_handle: XlsxStream abre el zip por su cuenta
+        self.book = XlsxStream(path)
+
+    @property
+    def _workbook_class(self):
+        return XlsxStream
+
+    def close(self) -> None:
+        self.book.close()
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return self.book.worksheet_names
+
+    def get_sheet_by_name(self, name: str):
+        self.raise_if_bad_sheet_by_name(name)
+        return name
+
+    def get_sheet_by_index(self, index: int):
+        self.raise_if_bad_sheet_by_index(index)
+        return self.sheet_names[index]
+
+    def get_sheet_data(self, sheet, file_rows_needed: Optional[int] = None) -> list[list[Any]]:
+        data: list[list[Any]] = []
+        last_row_with_data = -1
+        for row_number, row in enumerate(self.book.iter_rows(sheet)):
+            converted_row = [_convert_cell(v) for v in row]
+            while converted_row and converted_row[-1] == "":
+                converted_row.pop()
+            if converted_row:
+                last_row_with_data = row_number
+            data.append(converted_row)
+            if file_rows_needed is not None and len(data) >= file_rows_needed:
+                break
+
+        # Sin filas vacías al final y todas con el mismo ancho (igual que OpenpyxlReader)
+        data = data[: last_row_with_data + 1]
+        if data:
+            max_width = max(len(r) for r in data)
+            if min(len(r) for r in data) < max_width:
+                data = [r + [""] * (max_width - len(r)) for r in data]
+        return data
+
+
+class XlsxStreamFile:
+    """Reemplazo de pd.ExcelFile para el motor xlsx-stream (context manager)."""
+
+    def __init__(self, path: Path | str):
+        self._reader = XlsxStreamReader(path)
+
+    def __enter__(self) -> "XlsxStreamFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._reader.close()
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return self._reader.sheet_names
+
+    def parse(self, sheet_name: Any = 0, **kwds):
+        return self._reader.parse(sheet_name=sheet_name, **kwds)
@@ -0,0 +1,426 @@
+# SrvRestAstroLS_v1/services/ingest/xlsx_stream.py
+"""
+Lector liviano de .xlsx: recorre el XML de la hoja directo desde el zip en streaming
+(expat para hojas y sharedStrings, iterparse para lo chico) y devuelve tuplas de
+valores planos (sin objetos celda de openpyxl).
+
+Mismos valores que openpyxl con read_only=True, data_only=True, values_only=True:
+shared/inline strings, números int/float, booleanos, errores como texto ('#N/A', marcados
+con CellError) y seriales Excel con formato fecha convertidos a datetime/time/timedelta.
+"""
+from __future__ import annotations
+import posixpath
+import re
+import zipfile
+from datetime import datetime, timedelta, time
+from pathlib import Path
+from typing import Any, Iterator, Optional
+from xml.etree.ElementTree import iterparse
+from xml.parsers import expat
+
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+WINDOWS_EPOCH = datetime(1899, 12, 30)
+MAC_EPOCH = datetime(1904, 1, 1)
+SECS_PER_DAY = 86400
+
+# numFmtId builtin con formato fecha/hora (ECMA-376 18.8.30)
+BUILTIN_DATE_FORMATS = {14, 15, 16, 17, 18, 19, 20, 21, 22, 45, 46, 47}
+BUILTIN_TIMEDELTA_FORMATS = {46}  # [h]:mm:ss
+
+# Misma heurística que openpyxl.styles.numbers.is_date_format / is_timedelta_format
+_FMT_STRIP_RE = re.compile(r'".*?"|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+_FMT_DATE_RE = re.compile(r"(?<![_\\])[dmhysDMHYS]")
+_FMT_TIMEDELTA_RE = re.compile(r"^\[hh?\](:mm(:ss(\.0*)?)?)?|^\[mm?\](:ss(\.0*)?)?|^\[ss?\](\.0*)?")
+
+_COL_RE = re.compile(r"[A-Z]+")
+_CHUNK = 256 * 1024
+_LOCAL_NAMES: dict[str, str] = {}
+_COLUMNS: dict[str, int] = {}
+
+
+class CellError(str):
+    """Texto de una celda de error (t="e"): se compara como str, pero se distingue de un texto literal."""
+    __slots__ = ()
+
+
+def _local(tag: str) -> str:
+    """Nombre sin namespace (soporta OOXML transitional y strict)."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _local_name(qname: str) -> str:
+    """'x:row' -> 'row' (expat sin namespaces entrega el qname crudo); cacheado."""
+    name = _LOCAL_NAMES.get(qname)
+    if name is None:
+        name = _LOCAL_NAMES[qname] = qname.rsplit(":", 1)[-1]
+    return name
+
+
+def _is_date_format(fmt: Optional[str]) -> bool:
+    if not fmt:
+        return False
+    fmt = _FMT_STRIP_RE.sub("", fmt.split(";")[0])
+    return _FMT_DATE_RE.search(fmt) is not None
+
+
+def _is_timedelta_format(fmt: Optional[str]) -> bool:
+    if not fmt:
+        return False
+    return _FMT_TIMEDELTA_RE.search(fmt.split(";")[0]) is not None
+
+
+def _column_index(ref: str) -> int:
+    """'C12' -> 3 (1-based). Cacheado por letras de columna."""
+    letters = ref.rstrip("0123456789")
+    idx = _COLUMNS.get(letters)
+    if idx is None:
+        idx = 0
+        m = _COL_RE.match(letters)
+        if m:
+            for ch in m.group(0):
+                idx = idx * 26 + (ord(ch) - 64)
+        _COLUMNS[letters] = idx
+    return idx
+
+
+def _cast_number(txt: str) -> int | float:
+    if "." in txt or "E" in txt or "e" in txt:
+        return float(txt)
+    return int(txt)
+
+
+def excel_serial_to_datetime(value: float, date1904: bool = False, as_timedelta: bool = False) -> Any:
+    """Serial Excel -> datetime (o time si < 1 día, timedelta si el formato es [h]:mm)."""
+    if as_timedelta:
+        td = timedelta(days=value)
+        if td.microseconds:
+            td = timedelta(seconds=td.total_seconds() // 1, microseconds=round(td.microseconds, -3))
+        return td
+    epoch = MAC_EPOCH if date1904 else WINDOWS_EPOCH
+    day, fraction = divmod(value, 1)
+    diff = timedelta(milliseconds=round(fraction * SECS_PER_DAY * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        secs = diff.seconds
+        return time(secs // 3600, (secs // 60) % 60, secs % 60, diff.microseconds)
+    if 0 < value < 60 and not date1904:
+        day += 1  # bug 1900 bisiesto de Excel
+    return epoch + timedelta(days=day) + diff
+
+
+def _text_content(elem) -> str:
+    """Texto de <si>/<is>: <t> directo o concatenación de runs <r><t>, ignorando fonética (<rPh>)."""
+    parts: list[str] = []
+    for child in elem:
+        name = _local(child.tag)
+        if name == "t":
+            parts.append(child.text or "")
+        elif name == "r":
+            for sub in child:
+                if _local(sub.tag) == "t":
+                    parts.append(sub.text or "")
+    return "".join(parts)
+
+
+class XlsxStream:
+    """
+    Abre el zip una vez; las hojas se recorren en streaming con iter_rows().
+    Levanta excepción en __init__ si el archivo no es un xlsx legible (el caller cae a openpyxl).
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(self.path)
+        self.date1904 = False
+        self._sheets: list[tuple[str, str, bool]] = []  # (nombre, ruta xml, es worksheet)
+        self._shared: Optional[list[str]] = None
+        self._date_styles: Optional[set[int]] = None
+        self._timedelta_styles: set[int] = set()
+        try:
+            self._read_workbook()
+        except Exception:
+            self._zip.close()
+            raise
+
+    def __enter__(self) -> "XlsxStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._zip.close()
+
+    # ---------- metadata ----------
+    def _workbook_path(self) -> str:
+        with self._zip.open("_rels/.rels") as fh:
+            for _, el in iterparse(fh):
+                if _local(el.tag) == "Relationship" and el.get("Type", "").endswith("/officeDocument"):
+                    return el.get("Target", "").lstrip("/")
+        return "xl/workbook.xml"
+
+    def _read_workbook(self) -> None:
+        wb_path = self._workbook_path()
+        base = posixpath.dirname(wb_path)
+        rels_path = posixpath.join(base, "_rels", posixpath.basename(wb_path) + ".rels")
+
+        targets: dict[str, tuple[str, bool]] = {}
+        with self._zip.open(rels_path) as fh:
+            for _, el in iterparse(fh):
+                if _local(el.tag) != "Relationship":
+                    continue
+                target = el.get("Target", "")
+                target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+                targets[el.get("Id", "")] = (target, el.get("Type", "").endswith("/worksheet"))
+
+        with self._zip.open(wb_path) as fh:
+            for _, el in iterparse(fh):
+                name = _local(el.tag)
+                if name == "workbookPr":
+                    self.date1904 = el.get("date1904", "").lower() in ("1", "true")
+                elif name == "sheet":
+                    rid = el.get(f"{{{REL_NS}}}id") or next((v for k, v in el.attrib.items() if _local(k) == "id"), "")
+                    if rid in targets:
+                        target, is_ws = targets[rid]
+                        self._sheets.append((el.get("name", ""), target, is_ws))
+        if not any(is_ws for _, _, is_ws in self._sheets):
+            raise ValueError("xlsx sin worksheets")
+
+        for _, target, _ in self._sheets:
+            self._zip.getinfo(target)  # falla temprano si el zip está incompleto
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return [name for name, _, _ in self._sheets]
+
+    @property
+    def worksheet_names(self) -> list[str]:
+        return [name for name, _, is_ws in self._sheets if is_ws]
+
+    def _find_part(self, suffix: str) -> Optional[str]:
+        for name in self._zip.namelist():
+            if name.lower().endswith(suffix):
+                return name
+        return None
+
+    def _load_shared_strings(self) -> list[str]:
+        if self._shared is None:
+            strings: list[str] = []
+            part = self._find_part("sharedstrings.xml")
+            if part:
+                parts: list[str] = []
+                state = {"collect": False, "phonetic": False}
+
+                def start(qname: str, attrs: dict) -> None:
+                    name = _local_name(qname)
+                    if name == "si":
+                        parts.clear()
+                    elif name == "t" and not state["phonetic"]:
+                        state["collect"] = True
+                    elif name == "rPh":
+                        state["phonetic"] = True
+
+                def end(qname: str) -> None:
+                    name = _local_name(qname)
+                    if name == "t":
+                        state["collect"] = False
+                    elif name == "rPh":
+                        state["phonetic"] = False
+                    elif name == "si":
+                        strings.append("".join(parts).replace("x005F_", ""))
+
+                def chars(data: str) -> None:
+                    if state["collect"]:
+                        parts.append(data)
+
+                parser = expat.ParserCreate()
+                parser.buffer_text = True
+                parser.StartElementHandler = start
+                parser.EndElementHandler = end
+                parser.CharacterDataHandler = chars
+                with self._zip.open(part) as fh:
+                    parser.ParseFile(fh)
+            self._shared = strings
+        return self._shared
+
+    def _load_styles(self) -> set[int]:
+        if self._date_styles is None:
+            self._date_styles = set()
+            part = self._find_part("styles.xml")
+            if part:
+                custom: dict[int, str] = {}
+                xfs: list[int] = []
+                in_cell_xfs = False
+                with self._zip.open(part) as fh:
+                    for event, el in iterparse(fh, events=("start", "end")):
+                        name = _local(el.tag)
+                        if event == "start":
+                            if name == "cellXfs":
+                                in_cell_xfs = True
+                            continue
+                        if name == "numFmt":
+                            custom[int(el.get("numFmtId", "0"))] = el.get("formatCode", "")
+                        elif name == "xf" and in_cell_xfs:
+                            xfs.append(int(el.get("numFmtId", "0")))
+                        elif name == "cellXfs":
+                            in_cell_xfs = False
+                for style_id, fmt_id in enumerate(xfs):
+                    if fmt_id in custom:
+                        fmt = custom[fmt_id]
+                        if _is_date_format(fmt):
+                            self._date_styles.add(style_id)
+                            if _is_timedelta_format(fmt):
+                                self._timedelta_styles.add(style_id)
+                    elif fmt_id in BUILTIN_DATE_FORMATS:
+                        self._date_styles.add(style_id)
+                        if fmt_id in BUILTIN_TIMEDELTA_FORMATS:
+                            self._timedelta_styles.add(style_id)
+        return self._date_styles
+
+    # ---------- filas ----------
+    def declared_width(self, sheet: Optional[str] = None) -> int:
+        """Ancho según <dimension ref="A1:K200"> (0 si no está declarado)."""
+        with self._zip.open(self._sheet_part(sheet)) as fh:
+            for _, el in iterparse(fh, events=("start",)):
+                name = _local(el.tag)
+                if name == "dimension":
+                    ref = el.get("ref", "")
+                    return _column_index(ref.split(":")[-1])
+                if name == "sheetData":
+                    break
+        return 0
+
+    def _sheet_part(self, sheet: Optional[str]) -> str:
+        if sheet is None:
+            return next(target for _, target, is_ws in self._sheets if is_ws)
+        for name, target, _ in self._sheets:
+            if name == sheet:
+                return target
+        raise KeyError(f"Worksheet {sheet} does not exist.")
+
+    def iter_rows(self, sheet: Optional[str] = None) -> Iterator[tuple]:
+        """
+        Filas de la hoja (default: primera worksheet) como tuplas de valores.
+        Las filas ausentes en el XML salen como tupla vacía, igual que openpyxl.
+        Usa callbacks de expat (sin crear Elements): es el camino caliente de los escaneos.
+        """
+        shared = self._load_shared_strings()
+        date_styles = self._load_styles()
+        timedelta_styles = self._timedelta_styles
+        date1904 = self.date1904
+
+        ready: list[tuple] = []
+        st = _RowState()
+        names = _LOCAL_NAMES
+
+        def start(qname: str, attrs: dict) -> None:
+            name = names.get(qname) or _local_name(qname)
+            if name == "c":
+                ref = attrs.get("r")
+                st.col = _column_index(ref) if ref else st.col + 1
+                st.ctype = attrs.get("t", "n")
+                st.style = attrs.get("s")
+                st.value = None
+                st.inline = None
+            elif name == "v":
+                st.text = []
+            elif name == "is":
+                st.inline = []
+            elif name == "t" and st.inline is not None and not st.phonetic:
+                st.text = []
+            elif name == "rPh":
+                st.phonetic = True
+            elif name == "row":
+                r = attrs.get("r")
+                st.row = int(r) if r else st.row + 1
+                st.col = 0
+                st.cells = []
+
+        def end(qname: str) -> None:
+            name = names.get(qname) or _local_name(qname)
+            if name == "v":
+                st.value = "".join(st.text) or None
+                st.text = None
+            elif name == "t":
+                if st.text is not None and st.inline is not None:
+                    st.inline.append("".join(st.text))
+                st.text = None
+            elif name == "rPh":
+                st.phonetic = False
+            elif name == "c":
+                ctype = st.ctype
+                value: Any = st.value
+                if ctype == "inlineStr":
+                    value = "".join(st.inline) if st.inline is not None else None
+                elif value is not None:
+                    if ctype == "n":
+                        value = _cast_number(value)
+                        style_id = int(st.style) if st.style else 0
+                        if style_id in date_styles:
+                            try:
+                                value = excel_serial_to_datetime(value, date1904, style_id in timedelta_styles)
+                            except (OverflowError, ValueError):
+                                value = CellError("#VALUE!")
+                    elif ctype == "s":
+                        value = shared[int(value)]
+                    elif ctype == "b":
+                        value = bool(int(value))
+                    elif ctype == "d":
+                        value = datetime.fromisoformat(value.rstrip("Z"))
+                    elif ctype == "e":
+                        value = CellError(value)
+                st.cells.append((st.col, value))
+                st.inline = None
+            elif name == "row":
+                while st.expected < st.row:
+                    st.expected += 1
+                    ready.append(())
+                cells = st.cells
+                if cells:
+                    out = [None] * cells[-1][0]
+                    for c, v in cells:
+                        if 1 <= c <= len(out):
+                            out[c - 1] = v
+                    ready.append(tuple(out))
+                else:
+                    ready.append(())
+                st.expected = st.row + 1
+
+        def chars(data: str) -> None:
+            if st.text is not None:
+                st.text.append(data)
+
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = chars
+
+        with self._zip.open(self._sheet_part(sheet)) as fh:
+            while True:
+                chunk = fh.read(_CHUNK)
+                if not chunk:
+                    break
+                parser.Parse(chunk, False)
+                if ready:
+                    yield from ready
+                    ready.clear()
+            parser.Parse(b"", True)
+        yield from ready
+
+
+class _RowState:
+    """Estado mutable del parser de filas (evita nonlocal en cada callback)."""
+    __slots__ = ("row", "expected", "col", "cells", "ctype", "style", "value", "text", "inline", "phonetic")
+
+    def __init__(self) -> None:
+        self.row = 0
+        self.expected = 1
+        self.col = 0
+        self.cells: list[tuple[int, Any]] = []
+        self.ctype = "n"
+        self.style: Optional[str] = None
+        self.value: Optional[str] = None
+        self.text: Optional[list[str]] = None
+        self.inline: Optional[list[str]] = None
+        self.phonetic = False
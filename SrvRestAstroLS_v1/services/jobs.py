@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/jobs.py
+"""
+Jobs en segundo plano para los handlers async: el request encola el trabajo y responde con un
+job_id; el trabajo sigue en una task del event loop (que a su vez lo manda al pool de procesos).
+
+El cálculo reporta avance por fase a través de un JobChannel (cola + evento de cancelación). Con el
+pool de procesos activo el canal usa un multiprocessing.Manager (las colas comunes no se pueden
+pasar como argumento a un proceso spawn); sin pool (tests, workers=0) una queue.Queue alcanza.
+Un thread lector por job se bloquea en la cola (sin hacer polling desde el event loop) y pasa cada
+evento al loop; la task del job los entrega a on_progress (p.ej. emit por SSE). El cálculo también
+puede publicar resultados parciales por el mismo canal, en orden con los avisos de fase.
+
+Cancelar marca el evento y el job como cancelado; la respuesta no espera al worker. La task sigue
+hasta que el worker corta en el próximo límite de fase (JobCancelled): así el cupo del pool
+(run_in_pool) se libera recién cuando el proceso dejó de calcular. Los jobs viven en el proceso del
+server que los creó (como los suscriptores SSE de agui_notify); se guardan los últimos max_entries.
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from uuid import uuid4
+
+from services import process_pool
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+_FINISHED = (DONE, ERROR, CANCELLED)
+_END = "end"  # marca de fin de la cola de eventos (la pone la task del job)
+RESULT = "result"  # evento con un resultado parcial (JobChannel.publish)
+
+
+class JobCancelled(Exception):
+    """El job se canceló; lo levanta JobChannel en el límite de fase siguiente."""
+
+
+class JobNotFoundError(LookupError):
+    """job_id inexistente (o ya descartado por el tope de entradas)."""
+
+
+class JobChannel:
+    """Lado del cálculo: marca el arranque, reporta fases y mira la cancelación."""
+
+    def __init__(self, events: Any, cancel: Any):
+        self._events = events
+        self._cancel = cancel
+        self._t0: Optional[float] = None
+        self._last: Optional[float] = None
+
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self) -> None:
+        if self.cancelled():
+            raise JobCancelled()
+
+    def begin(self) -> None:
+        self.check()
+        self._t0 = self._last = time.perf_counter()
+        self._events.put({"event": RUNNING})
+
+    def report(self, phase: str, **data: Any) -> None:
+        """Fin de una fase: {phase, elapsed_s (desde begin), phase_s, **data}. Corta si el job se canceló."""
+        self.check()
+        now = time.perf_counter()
+        t0 = self._t0 if self._t0 is not None else now
+        last = self._last if self._last is not None else now
+        self._last = now
+        self._events.put({"phase": phase, "elapsed_s": round(now - t0, 3), "phase_s": round(now - last, 3), **data})
+
+    def publish(self, name: str, payload: Any) -> None:
+        """Resultado parcial ya utilizable (p.ej. los pares antes de la búsqueda N→1); picklable."""
+        self.check()
+        self._events.put({"event": RESULT, "name": name, "payload": payload})
+
+
+class Job:
+    """Estado de un job (solo en el proceso del server)."""
+
+    def __init__(self, kind: str, channel: JobChannel, meta: Optional[dict[str, Any]] = None):
+        self.job_id = uuid4().hex
+        self.kind = kind
+        self.meta = dict(meta or {})  # datos del que lo creó (p.ej. threadId para avisar por SSE)
+        self.status = QUEUED
+        self.phase: Optional[str] = None
+        self.progress: list[dict[str, Any]] = []
+        self.published: list[str] = []  # nombres de los resultados parciales ya avisados
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.channel = channel
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _FINISHED
+
+    def info(self, include_result: bool = False) -> dict[str, Any]:
+        out = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "phase": self.phase,
+            "progress": list(self.progress),
+            "published": list(self.published),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result:
+            out["result"] = self.result
+        return out
+
+
+class JobRegistry:
+    """Jobs del proceso: alta, lectura de avance, cancelación y tope de jobs terminados guardados."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max(1, int(max_entries))
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._manager: Any = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Levanta el Manager de antemano (si hay pool) para que el primer job no pague el arranque."""
+        self._new_channel()
+
+    def _new_channel(self) -> JobChannel:
+        if process_pool.pool_info()["workers"] <= 0:
+            return JobChannel(queue.Queue(), threading.Event())
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            return JobChannel(self._manager.Queue(), self._manager.Event())
+
+    def submit(
+        self,
+        kind: str,
+        work: Callable[[Job], Awaitable[Any]],
+        on_progress: Optional[Callable[[Job, dict], Awaitable[None]]] = None,
+        on_done: Optional[Callable[[Job], Awaitable[None]]] = None,
+        meta: Optional[dict[str, Any]] = None,
+    ) -> Job:
+        """
+        Crea el job y arranca work(job) en una task. on_progress recibe cada evento de fase y cada
+        resultado parcial ({"event": "result", "name", "payload"}, no se guarda en el job);
+        on_done(job) se llama al terminar en DONE o ERROR, después del último on_progress.
+        """
+        job = Job(kind, self._new_channel(), meta)
+        self._jobs[job.job_id] = job
+        self._evict()
+        job.task = asyncio.ensure_future(self._run(job, work, on_progress, on_done))
+        return job
+
+    def get(self, job_id: Optional[str]) -> Job:
+        job = self._jobs.get(job_id or "")
+        if job is None:
+            raise JobNotFoundError(job_id)
+        return job
+
+    def cancel(self, job_id: Optional[str]) -> Job:
+        """
+        Cancela el job (no-op si ya terminó): queda CANCELLED en el acto y el worker corta en el
+        próximo límite de fase. La task no se cancela: termina cuando el worker devuelve el control.
+        """
+        job = self.get(job_id)
+        if job.finished:
+            return job
+        job.channel._cancel.set()
+        self._finish(job, CANCELLED)
+        return job
+
+    def stats(self) -> dict[str, int]:
+        out = {s: 0 for s in (QUEUED, RUNNING) + _FINISHED}
+        for job in self._jobs.values():
+            out[job.status] += 1
+        return out
+
+    def shutdown(self) -> None:
+        for job in list(self._jobs.values()):
+            if not job.finished:
+                self.cancel(job.job_id)
+        with self._lock:
+            manager, self._manager = self._manager, None
+        if manager is not None:
+            manager.shutdown()
+
+    async def _run(self, job: Job, work, on_progress, on_done) -> None:
+        loop = asyncio.get_running_loop()
+        inbox: asyncio.Queue = asyncio.Queue()
+        reader = threading.Thread(
+            target=_read_events, args=(job.channel._events, loop, inbox), name=f"job-{job.job_id[:8]}", daemon=True
+        )
+        reader.start()
+        pump = asyncio.ensure_future(self._pump(job, inbox, on_progress))
+        try:
+            result = await work(job)
+        except asyncio.CancelledError:
+            job.channel._events.put({"event": _END})
+            pump.cancel()
+            self._finish(job, CANCELLED)
+            return
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            status = ERROR
+        else:
+            job.result = result
+            status = DONE
+        # Fin de la cola: el pump procesa lo que quedaba (las últimas fases) antes de marcar el final
+        await asyncio.to_thread(job.channel._events.put, {"event": _END})
+        await pump
+        self._finish(job, status)
+        if on_done is not None and job.status in (DONE, ERROR):
+            try:
+                await on_done(job)
+            except Exception:
+                pass
+
+    async def _pump(self, job: Job, inbox: asyncio.Queue, on_progress) -> None:
+        while True:
+            event = await inbox.get()
+            if event.get("event") == _END:
+                return
+            await self._record(job, event, on_progress)
+
+    async def _record(self, job: Job, event: dict, on_progress) -> None:
+        if job.finished:
+            return
+        if event.get("event") == RUNNING:
+            job.status = RUNNING
+            job.started_at = time.time()
+            return
+        job.status = RUNNING
+        if event.get("event") == RESULT:
+            job.published.append(event["name"])
+        else:
+            job.phase = event["phase"]
+            job.progress.append(event)
+        if on_progress is not None:
+            try:
+                await on_progress(job, event)
+            except Exception:
+                pass  # el aviso es best-effort: no corta el job
+
+    def _finish(self, job: Job, status: str) -> None:
+        if job.finished:
+            return
+        job.status = status
+        job.finished_at = time.time()
+
+    def _evict(self) -> None:
+        finished = [jid for jid, job in self._jobs.items() if job.finished]
+        for jid in finished[: max(0, len(self._jobs) - self.max_entries)]:
+            del self._jobs[jid]
+
+
+def _read_events(events: Any, loop: asyncio.AbstractEventLoop, inbox: asyncio.Queue) -> None:
+    """Thread lector de un job: get bloqueante en la cola (local o del Manager) -> inbox del loop."""
+    while True:
+        try:
+            event = events.get()
+        except Exception:
+            event = {"event": _END}  # Manager cerrado (shutdown)
+        try:
+            loop.call_soon_threadsafe(inbox.put_nowait, event)
+        except RuntimeError:
+            return  # loop cerrado
+        if event.get("event") == _END:
+            return
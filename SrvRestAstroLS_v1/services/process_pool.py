@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/process_pool.py
+"""
+Pool de procesos para el trabajo CPU-bound (pandas/openpyxl) de los handlers async.
+
+Se levanta/baja con el lifespan de Litestar (on_startup / on_shutdown). Las funciones
+que se envían deben ser de módulo (picklables) y devolver resultados picklables
+(dicts/listas/DataFrames), así el event loop queda libre para SSE y otros requests.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing
+import threading
+from multiprocessing.util import Finalize
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, TypeVar
+
+import globalVar as Var
+
+T = TypeVar("T")
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_SEM: Optional[asyncio.Semaphore] = None
+_WORKERS: int = 0
+_MAX_PENDING: int = 0
+
+# Pool auxiliar sincrónico (map_cpu): lo usa el cálculo que ya corre dentro de un worker
+_CPU_POOL: Optional[ProcessPoolExecutor] = None
+_CPU_WORKERS: int = 0
+_CPU_LOCK = threading.Lock()
+_CPU_FINALIZER: Optional[Finalize] = None
+
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn: no heredamos threads/locks del proceso del server (uvicorn/gunicorn)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def start_pool(workers: Optional[int] = None, max_pending: Optional[int] = None) -> None:
+    """Crea el pool (idempotente). workers=0 deshabilita el pool: se corre en un thread."""
+    global _POOL, _SEM, _WORKERS, _MAX_PENDING
+    if _SEM is not None:
+        return
+
+    _WORKERS = max(0, int(Var.PROCESS_POOL_WORKERS if workers is None else workers))
+    pending = Var.PROCESS_POOL_MAX_PENDING if max_pending is None else max_pending
+    _MAX_PENDING = int(pending) if pending else 2 * max(1, _WORKERS)
+    _SEM = asyncio.Semaphore(_MAX_PENDING)
+    if _WORKERS > 0:
+        _POOL = _new_pool(_WORKERS)
+
+
+def stop_pool() -> None:
+    global _POOL, _SEM
+    pool, _POOL = _POOL, None
+    _SEM = None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+async def on_startup() -> None:
+    start_pool()
+
+
+async def on_shutdown() -> None:
+    stop_pool()
+
+
+def pool_info() -> dict[str, Any]:
+    return {"workers": _WORKERS if _POOL is not None else 0, "max_pending": _MAX_PENDING}
+
+
+async def run_in_pool(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Ejecuta fn(*args, **kwargs) fuera del event loop, con concurrencia acotada.
+    Sin pool (tests/scripts o workers=0) usa un thread para no bloquear el loop.
+    """
+    global _POOL
+    call = functools.partial(fn, *args, **kwargs)
+    sem = _SEM
+    if sem is None:
+        return await asyncio.to_thread(call)
+
+    async with sem:
+        pool = _POOL
+        if pool is None:
+            return await asyncio.to_thread(call)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, call)
+        except BrokenProcessPool:
+            # Un worker murió (OOM, segfault de lib nativa): recrear para los próximos requests
+            if _POOL is pool:
+                _POOL = _new_pool(_WORKERS)
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def _shutdown_cpu_pool(wait: bool = False) -> None:
+    global _CPU_POOL
+    pool, _CPU_POOL = _CPU_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def map_cpu(fn: Callable[..., T], items: list, workers: int) -> list[T]:
+    """
+    [fn(x) for x in items] repartido en un pool de procesos propio de este proceso (se crea
+    la primera vez y se reusa). Sincrónico: pensado para el cálculo que ya corre en el pool
+    de requests. Resultados en el mismo orden que items; con workers <= 1 corre en línea.
+    """
+    global _CPU_POOL, _CPU_WORKERS, _CPU_FINALIZER
+    workers = max(0, int(workers))
+    if workers <= 1 or len(items) <= 1:
+        return [fn(x) for x in items]
+    with _CPU_LOCK:
+        if _CPU_POOL is None or _CPU_WORKERS != workers:
+            _shutdown_cpu_pool()
+            _CPU_POOL = _new_pool(workers)
+            _CPU_WORKERS = workers
+            if _CPU_FINALIZER is None:
+                # Finalize y no atexit: en un worker de multiprocessing los atexit no corren y el
+                # join de procesos hijos al salir se quedaría esperando a este pool. Prioridad por
+                # encima de la de las colas (10): los centinelas tienen que salir antes de cerrarlas.
+                _CPU_FINALIZER = Finalize(None, _shutdown_cpu_pool, kwargs={"wait": True}, exitpriority=100)
+        pool = _CPU_POOL
+    try:
+        return list(pool.map(fn, items))
+    except BrokenProcessPool:
+        with _CPU_LOCK:
+            if _CPU_POOL is pool:
+                _shutdown_cpu_pool()
+        raise
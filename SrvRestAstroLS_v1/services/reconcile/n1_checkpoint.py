@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/reconcile/n1_checkpoint.py
+"""
+Checkpoints de la búsqueda N→1 cortada por presupuesto (tiempo/pasos).
+
+Cuando el pipeline agota el presupuesto guarda acá lo encontrado hasta el momento: fase en
+curso, grupos ya armados, filas usadas de cada lado y las filas banco que faltan explorar (en
+el orden de prioridad original). Una corrida con resume=True arranca desde ese estado en lugar
+de repetir la búsqueda. La clave sale del contenido de los frames y de los parámetros, así que
+un archivo distinto (o una ventana distinta) nunca retoma un estado ajeno.
+
+Un JSON por clave en un DiskStore (escritura atómica: lo leen y escriben procesos distintos
+del pool), acotado por cantidad de entradas con LRU por mtime.
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+from services.disk_store import DiskStore
+
+# Subir cuando cambie el formato del estado o el recorrido de la búsqueda N→1
+N1_CHECKPOINT_VERSION = 2
+
+
+class N1CheckpointStore:
+    """Estados parciales de la búsqueda N→1 en disco (<clave>.json)."""
+
+    def __init__(self, root: Path | str, max_entries: int = 64):
+        self._store = DiskStore(root, ".json", max_entries=max_entries)
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        try:
+            state = json.loads(self._store.read_bytes(key) or b"")
+        except ValueError:
+            return None
+        if state.get("version") != N1_CHECKPOINT_VERSION:
+            self.discard(key)
+            return None
+        self._store.touch(key)
+        return state
+
+    def put(self, key: str, state: dict[str, Any]) -> None:
+        data = json.dumps({**state, "version": N1_CHECKPOINT_VERSION}, ensure_ascii=False)
+        self._store.write_bytes(key, data.encode("utf-8"))
+
+    def discard(self, key: str) -> None:
+        self._store.discard(key)
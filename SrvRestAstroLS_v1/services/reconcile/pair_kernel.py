@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/reconcile/pair_kernel.py
+"""
+Kernel del matcher 1→1 (monto idéntico + ventana de días) sobre arrays NumPy.
+
+Reproduce exactamente el greedy histórico:
+    merge por monto_r -> filtrar |fecha_p - fecha_b|.days <= ventana
+    -> ordenar por (monto_r, date_diff_days, row_p, row_b) -> tomar si ninguno está usado
+sin armar el producto cartesiano por monto. Los montos se agrupan en buckets de
+centavos enteros (filas de distintos buckets nunca compiten, así que cada bucket
+se resuelve por separado):
+
+- buckets chicos (P·B <= PAIR_BUCKET_EDGE_CAP): se generan sus aristas vectorizadas
+  y se aplica el greedy sobre ellas (memoria lineal por el tope);
+- buckets grandes (sueldos, transferencias fijas, comisiones): barrido por nivel de
+  diferencia de días d = 0..ventana; en cada nivel, cada fila PILAGA libre (en orden
+  de row_p) toma el row_b libre más chico cuya fecha cae a d días, con bisect sobre
+  las fechas del banco ordenadas y un segment tree de mínimos. O(P·ventana·log B).
+"""
+from __future__ import annotations
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86_400 * 10**9
+
+# Aristas máximas por bucket para el camino vectorizado
+PAIR_BUCKET_EDGE_CAP = 4096
+
+_NO_ROW = np.iinfo(np.int64).max
+
+
+def amount_buckets(monto_p: np.ndarray, monto_b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Código de bucket por fila (mismo código = mismo monto redondeado a 2), ordenado por monto
+    ascendente con NaN al final, igual que sort_values sobre monto_r.
+    """
+    cents = np.round(np.round(np.concatenate([monto_p, monto_b]).astype(float), 2) * 100)
+    codes, _ = pd.factorize(cents, sort=True, use_na_sentinel=False)
+    codes = codes.astype(np.int64)
+    return codes[: len(monto_p)], codes[len(monto_p):]
+
+
+def _group_bounds(codes: np.ndarray, n_codes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Orden estable por código (dentro del bucket, por fila) y offsets de cada bucket."""
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes, minlength=n_codes)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return order, starts
+
+
+class _MinTree:
+    """Segment tree de mínimos sobre row ids (usado = _NO_ROW)."""
+
+    __slots__ = ("size", "tree")
+
+    def __init__(self, values: list[int]):
+        size = 1
+        while size < len(values):
+            size *= 2
+        tree = [_NO_ROW] * (2 * size)
+        tree[size:size + len(values)] = values
+        for i in range(size - 1, 0, -1):
+            tree[i] = min(tree[2 * i], tree[2 * i + 1])
+        self.size = size
+        self.tree = tree
+
+    def argmin(self, lo: int, hi: int) -> Tuple[int, int]:
+        """(mínimo, posición) en [lo, hi); (_NO_ROW, -1) si está vacío/usado."""
+        tree = self.tree
+        best, pos = _NO_ROW, -1
+        lo += self.size
+        hi += self.size
+        nodes = []
+        while lo < hi:
+            if lo & 1:
+                nodes.append(lo)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                nodes.append(hi)
+            lo //= 2
+            hi //= 2
+        for node in nodes:
+            if tree[node] < best:
+                best, pos = tree[node], node
+        if pos < 0:
+            return _NO_ROW, -1
+        while pos < self.size:
+            pos = 2 * pos if tree[2 * pos] == best else 2 * pos + 1
+        return best, pos - self.size
+
+    def remove(self, i: int) -> None:
+        tree = self.tree
+        i += self.size
+        tree[i] = _NO_ROW
+        i //= 2
+        while i:
+            tree[i] = min(tree[2 * i], tree[2 * i + 1])
+            i //= 2
+
+
+def _sweep_bucket(rows_p: np.ndarray, t_p: np.ndarray, rows_b: np.ndarray, t_b: np.ndarray, window: int):
+    """Greedy por niveles de días para un bucket grande. Devuelve [(d, row_p, row_b)]."""
+    order = np.lexsort((rows_b, t_b))
+    t_b = t_b[order]
+    tree = _MinTree(rows_b[order].tolist())
+    free_p = sorted(zip(rows_p.tolist(), t_p.tolist()))
+    out: list[tuple[int, int, int]] = []
+    for d in range(window + 1):
+        if not free_p:
+            break
+        tp = np.array([t for _, t in free_p], dtype=np.int64)
+        # |Δ| en [d, d+1) días: fechas banco en [tp + d, tp + d + 1) ∪ (tp - d - 1, tp - d]
+        hi_up = np.searchsorted(t_b, tp + (d + 1) * NS_PER_DAY, "left")
+        lo_dn = np.searchsorted(t_b, tp - (d + 1) * NS_PER_DAY, "right")
+        if d == 0:
+            lo_up = hi_dn = lo_dn  # un solo rango (tp - 1, tp + 1)
+        else:
+            lo_up = np.searchsorted(t_b, tp + d * NS_PER_DAY, "left")
+            hi_dn = np.searchsorted(t_b, tp - d * NS_PER_DAY, "right")
+        still_free = []
+        for k, (row_p, t) in enumerate(free_p):
+            best, pos = tree.argmin(int(lo_up[k]), int(hi_up[k]))
+            if hi_dn[k] > lo_dn[k]:
+                alt, alt_pos = tree.argmin(int(lo_dn[k]), int(hi_dn[k]))
+                if alt < best:
+                    best, pos = alt, alt_pos
+            if pos < 0:
+                still_free.append((row_p, t))
+                continue
+            tree.remove(pos)
+            out.append((d, row_p, best))
+        free_p = still_free
+    return out
+
+
+def greedy_one_to_one(
+    monto_p: np.ndarray,
+    fecha_p: np.ndarray,
+    monto_b: np.ndarray,
+    fecha_b: np.ndarray,
+    days_window: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+    """
+    Pares 1→1 en el orden del greedy histórico.
+    fecha_*: datetime64[ns] (NaT nunca matchea).
+    Devuelve (row_p, row_b, date_diff_days, nat_edge); nat_edge indica si alguna fila sin
+    fecha compartía monto con el otro lado (en el merge histórico eso dejaba date_diff_days en float).
+    """
+    window = abs(int(days_window))
+    code_p, code_b = amount_buckets(monto_p, monto_b)
+    t_p = np.asarray(fecha_p, dtype="datetime64[ns]").view(np.int64)
+    t_b = np.asarray(fecha_b, dtype="datetime64[ns]").view(np.int64)
+    nat = np.iinfo(np.int64).min
+    ok_p = t_p != nat
+    ok_b = t_b != nat
+    nat_edge = bool(
+        np.isin(code_p[~ok_p], code_b).any() or np.isin(code_b[~ok_b], code_p).any()
+    )
+
+    n_codes = int(max(code_p.max(initial=-1), code_b.max(initial=-1))) + 1
+    idx_p = np.flatnonzero(ok_p)
+    idx_b = np.flatnonzero(ok_b)
+    cp, cb = code_p[idx_p], code_b[idx_b]
+    order_p, _ = _group_bounds(cp, n_codes)
+    order_b, starts_b = _group_bounds(cb, n_codes)
+    idx_p, cp = idx_p[order_p], cp[order_p]
+    idx_b = idx_b[order_b]
+    count_p = np.bincount(cp, minlength=n_codes)
+    count_b = np.bincount(cb, minlength=n_codes)
+    edges_per_bucket = count_p * count_b
+    large = edges_per_bucket > PAIR_BUCKET_EDGE_CAP
+
+    # --- buckets chicos: aristas vectorizadas + greedy
+    small_p = ~large[cp]
+    sp, sc = idx_p[small_p], cp[small_p]
+    reps = count_b[sc]
+    rep_p = np.repeat(sp, reps)
+    rep_code = np.repeat(sc, reps)
+    within = np.arange(int(reps.sum())) - np.repeat(np.cumsum(reps) - reps, reps)
+    rep_b = idx_b[np.repeat(starts_b[sc], reps) + within]
+    diff = np.abs(t_p[rep_p] - t_b[rep_b]) // NS_PER_DAY
+    keep = diff <= window
+    rep_p, rep_b, rep_code, diff = rep_p[keep], rep_b[keep], rep_code[keep], diff[keep]
+    order = np.lexsort((rep_b, rep_p, diff, rep_code))
+
+    sel_code: list[int] = []
+    sel_d: list[int] = []
+    sel_p: list[int] = []
+    sel_b: list[int] = []
+    used_p: set[int] = set()
+    used_b: set[int] = set()
+    for code, d, row_p, row_b in zip(
+        rep_code[order].tolist(), diff[order].tolist(), rep_p[order].tolist(), rep_b[order].tolist()
+    ):
+        if row_p in used_p or row_b in used_b:
+            continue
+        used_p.add(row_p)
+        used_b.add(row_b)
+        sel_code.append(code)
+        sel_d.append(d)
+        sel_p.append(row_p)
+        sel_b.append(row_b)
+
+    # --- buckets grandes: barrido por niveles
+    starts_p = np.concatenate([[0], np.cumsum(count_p)[:-1]])
+    for code in np.flatnonzero(large).tolist():
+        rows_p = idx_p[starts_p[code]: starts_p[code] + count_p[code]]
+        rows_b = idx_b[starts_b[code]: starts_b[code] + count_b[code]]
+        for d, row_p, row_b in _sweep_bucket(rows_p, t_p[rows_p], rows_b, t_b[rows_b], window):
+            sel_code.append(code)
+            sel_d.append(d)
+            sel_p.append(row_p)
+            sel_b.append(row_b)
+
+    sel_code_a = np.asarray(sel_code, dtype=np.int64)
+    sel_d_a = np.asarray(sel_d, dtype=np.int64)
+    sel_p_a = np.asarray(sel_p, dtype=np.int64)
+    sel_b_a = np.asarray(sel_b, dtype=np.int64)
+    final = np.lexsort((sel_p_a, sel_d_a, sel_code_a))
+    return sel_p_a[final], sel_b_a[final], sel_d_a[final], nat_edge
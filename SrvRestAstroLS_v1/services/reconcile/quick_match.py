@@ -2,24 +2,55 @@
 # SrvRestAstroLS_v1/services/reconcile/quick_match.py
 
 from __future__ import annotations
-from dataclasses import dataclass
-from datetime import timedelta
+import json
+from datetime import date, timedelta
 from pathlib import Path
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Optional, Tuple, List, Dict, Any, Iterator
 
 try:
+    import numpy as np  # type: ignore
     import pandas as pd  # type: ignore
 except Exception:
+    np = None
     pd = None
 
-# Normalización común
-@dataclass
-class TxRow:
-    date: Optional[pd.Timestamp]
-    amount: float
-    desc: str
-    src: str         # "bank" | "gl"
-    raw: Dict[str, Any]
+# Centinelas de las columnas de TxColumns
+NO_DAY = -1          # sin fecha (vacía o no parseable)
+NO_CENTS = -(2**63)  # monto NaN / no finito: nunca matchea
+
+class TxColumns:
+    """Movimientos normalizados en columnas (mismo orden que las filas aceptadas del DF):
+       - day:      int64, ordinal de la fecha (date.toordinal()) o NO_DAY
+       - amount:   float64, importe redondeado a 2
+       - cents:    int64, importe en centavos (clave de matching) o NO_CENTS
+       - desc_idx: int32, índice en descs (descripciones internadas)
+       La fila original no se guarda: las respuestas solo llevan fecha, importe y descripción (ui_row).
+    """
+    __slots__ = ("day", "amount", "cents", "desc_idx", "descs", "src")
+
+    def __init__(self, day, amount, descs_per_row, src: str):
+        self.day = np.asarray(day, dtype=np.int64)
+        self.amount = np.asarray(amount, dtype=np.float64)
+        finite = np.isfinite(self.amount)
+        self.cents = np.full(len(self.amount), NO_CENTS, dtype=np.int64)
+        self.cents[finite] = np.rint(self.amount[finite] * 100).astype(np.int64)
+        codes, uniques = pd.factorize(pd.Series(descs_per_row, dtype=object))
+        self.desc_idx = codes.astype(np.int32)
+        self.descs: List[str] = list(uniques)
+        self.src = src
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def date_iso(self, i: int) -> Optional[str]:
+        d = int(self.day[i])
+        return None if d == NO_DAY else date.fromordinal(d).isoformat()
+
+    def desc(self, i: int) -> str:
+        return self.descs[self.desc_idx[i]]
+
+    def ui_row(self, i: int) -> Dict[str, Any]:
+        return {"date": self.date_iso(i), "amount": float(self.amount[i]), "desc": self.desc(i)}
 
 def _to_ts(x) -> Optional[pd.Timestamp]:
     if pd is None: return None
@@ -29,6 +60,34 @@ def _to_ts(x) -> Optional[pd.Timestamp]:
     except Exception:
         return None
 
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_NS_PER_DAY = 86_400 * 10**9
+
+def _day_ordinals(col: "pd.Series") -> np.ndarray:
+    """Ordinal de fecha por fila con la semántica de _to_ts (NaT/None -> NO_DAY)."""
+    if pd.api.types.is_datetime64_dtype(col.dtype):
+        ns = col.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        out = ns // _NS_PER_DAY + _EPOCH_ORDINAL
+        out[col.isna().to_numpy()] = NO_DAY
+        return out
+    # Object: parsear cada valor distinto una sola vez (las fechas se repiten mucho)
+    cache: Dict[Any, int] = {}
+    out = np.empty(len(col), dtype=np.int64)
+    for i, v in enumerate(col.tolist()):
+        try:
+            out[i] = cache[v]
+            continue
+        except (KeyError, TypeError):
+            pass
+        ts = _to_ts(v)
+        d = NO_DAY if ts is None or pd.isna(ts) else ts.toordinal()
+        try:
+            cache[v] = d
+        except TypeError:
+            pass
+        out[i] = d
+    return out
+
 def _as_float(x) -> Optional[float]:
     if x is None: return None
     if isinstance(x, str):
@@ -42,15 +101,66 @@ def _as_float(x) -> Optional[float]:
     except Exception:
         return None
 
-def normalize_bank_df(df0: "pd.DataFrame") -> List[TxRow]:
+def _floats(df: "pd.DataFrame", col) -> List[Optional[float]]:
+    """_as_float por fila para una columna (None = sin importe); columnas numéricas sin Python por fila."""
+    if col is None:
+        return [None] * len(df)
+    s = df[col]
+    if isinstance(s, pd.Series) and pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+        return s.astype(float).tolist()
+    return [_as_float(v) for v in _column_values(df, col)]
+
+def _column_values(df: "pd.DataFrame", col) -> list:
+    """Valores de la columna como los devolvía row.get(col) (None si no existe)."""
+    if col is None:
+        return [None] * len(df)
+    return df[col].tolist()
+
+def _descs(df: "pd.DataFrame", col) -> List[str]:
+    return [str(v or "").strip() for v in _column_values(df, col)]
+
+def _datetime_rows(df: "pd.DataFrame") -> np.ndarray:
+    """Filas que iterrows devolvía como Series datetime64 (solo fechas y vacíos): ahí cada
+       celda vacía llegaba como NaT, sin importe parseable, y la fila se descartaba.
+       Se conserva ese criterio para no cambiar qué filas cuentan como movimiento."""
+    n = len(df)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    ok = np.ones(n, dtype=bool)       # celda vacía o fecha en todas las columnas
+    any_dt = np.zeros(n, dtype=bool)  # al menos una fecha
+    for j in range(df.shape[1]):
+        col = df.iloc[:, j]
+        null = col.isna().to_numpy()
+        if pd.api.types.is_datetime64_dtype(col.dtype):
+            any_dt |= ~null
+            continue
+        if col.dtype == object:
+            is_dt = np.fromiter((isinstance(v, (pd.Timestamp, np.datetime64)) for v in col.tolist()), dtype=bool, count=n)
+            any_dt |= is_dt & ~null
+            ok &= null | is_dt
+        else:
+            ok &= null
+    out = np.zeros(n, dtype=bool)
+    for i in np.flatnonzero(ok & any_dt).tolist():
+        values = np.array(df.iloc[i].tolist(), dtype=object)
+        out[i] = pd.Series(values).dtype.kind == "M"
+    return out
+
+def _finish(keep: List[int], day, amounts, descs, src: str) -> TxColumns:
+    amount = [round(float(amounts[i]), 2) for i in keep]
+    return TxColumns(day[keep] if len(keep) else np.empty(0, dtype=np.int64), amount, [descs[i] for i in keep], src)
+
+def _empty(src: str) -> TxColumns:
+    return TxColumns([], [], [], src)
+
+def normalize_bank_df(df0: "pd.DataFrame") -> TxColumns:
     """Heurística para extractos bancarios (Ciudad / Patagonia / Santander).
        Busca columnas con 'Fecha' y una de ('Importe','Debe/Haber','Crédito/Débito','Monto','Importe Pesos').
     """
-    out: List[TxRow] = []
     if df0 is None or df0.empty:
-        return out
+        return _empty("bank")
 
-    df = df0.copy()
+    df = df0
     # detectar fecha
     date_col = None
     for c in df.columns:
@@ -97,36 +207,30 @@ def normalize_bank_df(df0: "pd.DataFrame") -> List[TxRow]:
         if any(k in up for k in ("DETALLE", "DESCRIP", "CONCEPTO", "LEYENDA", "DESCRIPCIÓN", "BENEFICIARIO")):
             desc_col = c; break
 
-    for _, row in df.iterrows():
-        ts = _to_ts(row.get(date_col)) if date_col else None
-
-        amount = None
-        if amt_col is not None:
-            amount = _as_float(row.get(amt_col))
-        else:
-            v_debe = _as_float(row.get(debe)) if debe else None
-            v_haber = _as_float(row.get(haber)) if haber else None
-            if v_debe is not None or v_haber is not None:
-                amount = (v_haber or 0.0) - (v_debe or 0.0)
-
-        if amount is None:
-            continue
-
-        desc = str(row.get(desc_col) or "").strip()
-        out.append(TxRow(date=ts, amount=round(float(amount), 2), desc=desc, src="bank", raw=row.to_dict()))
-    return out
-
-def normalize_gl_df(df0: "pd.DataFrame") -> List[TxRow]:
+    day = _day_ordinals(df[date_col]) if date_col else np.full(len(df), NO_DAY, dtype=np.int64)
+    if amt_col is not None:
+        amounts = _floats(df, amt_col)
+    else:
+        v_debe = _floats(df, debe or None)
+        v_haber = _floats(df, haber or None)
+        amounts = [
+            None if d is None and h is None else (h or 0.0) - (d or 0.0)
+            for d, h in zip(v_debe, v_haber)
+        ]
+    dt_rows = _datetime_rows(df)
+    keep = [i for i, a in enumerate(amounts) if a is not None and not dt_rows[i]]
+    return _finish(keep, day, amounts, _descs(df, desc_col), "bank")
+
+def normalize_gl_df(df0: "pd.DataFrame") -> TxColumns:
     """Heurística para PILAGA:
        - Fecha en primera columna o columna con 'Fecha'
        - Ingresos / Egresos → amount = Ingresos - Egresos
        - Descripción: 'Detalle' o similar
     """
-    out: List[TxRow] = []
     if df0 is None or df0.empty:
-        return out
+        return _empty("gl")
 
-    df = df0.copy()
+    df = df0
     # fecha
     date_col = None
     for c in df.columns:
@@ -159,27 +263,29 @@ def normalize_gl_df(df0: "pd.DataFrame") -> List[TxRow]:
     if hit.any():
         start_idx = int(hit[hit].index[0]) + 1
 
-    for _, row in df.iloc[start_idx:].iterrows():
-        ts = _to_ts(row.get(date_col))
-        ing = _as_float(row.get(col_ing)) if col_ing else None
-        egr = _as_float(row.get(col_egr)) if col_egr else None
-        if ing is None and egr is None:
+    body = df.iloc[start_idx:]
+    day = _day_ordinals(body[date_col])
+    ing = _floats(body, col_ing or None)
+    egr = _floats(body, col_egr or None)
+    amounts: List[Optional[float]] = []
+    fallback_cols = None
+    for i, (v_ing, v_egr) in enumerate(zip(ing, egr)):
+        if v_ing is None and v_egr is None:
             # podría haber una sola columna “Importe”
             # intentamos cualquier numérico
+            if fallback_cols is None:
+                fallback_cols = [body.iloc[:, j].tolist() for j in range(body.shape[1])]
             merged = None
-            for c in df.columns:
-                merged = _as_float(row.get(c))
+            for values in fallback_cols:
+                merged = _as_float(values[i])
                 if merged is not None:
                     break
-            if merged is None: 
-                continue
-            amount = merged
+            amounts.append(merged)
         else:
-            amount = (ing or 0.0) - (egr or 0.0)
-
-        desc = str(row.get(desc_col) or "").strip()
-        out.append(TxRow(date=ts, amount=round(float(amount), 2), desc=desc, src="gl", raw=row.to_dict()))
-    return out
+            amounts.append((v_ing or 0.0) - (v_egr or 0.0))
+    dt_rows = _datetime_rows(body)
+    keep = [i for i, a in enumerate(amounts) if a is not None and not dt_rows[i]]
+    return _finish(keep, day, amounts, _descs(body, desc_col), "gl")
 
 def _load_excel(path: Path) -> "pd.DataFrame":
     xls = pd.ExcelFile(str(path), engine="openpyxl")
@@ -197,88 +303,125 @@ def _guess_kind_from_preview_cols(cols: List[str]) -> str:
         return "gl"
     return "bank"
 
-def reconcile(bank_df: "pd.DataFrame", gl_df: "pd.DataFrame", days_tolerance: int = 3) -> Dict[str, Any]:
+class QuickMatch:
+    """Resultado por índices: pares (pos banco, pos GL) en orden de asignación y máscaras de uso."""
+    __slots__ = ("bank", "gl", "pairs", "used_bank", "used_gl", "days_tolerance")
+
+    def __init__(self, bank: TxColumns, gl: TxColumns, pairs: List[Tuple[int, int]],
+                 used_bank: np.ndarray, used_gl: np.ndarray, days_tolerance: int):
+        self.bank = bank
+        self.gl = gl
+        self.pairs = pairs
+        self.used_bank = used_bank
+        self.used_gl = used_gl
+        self.days_tolerance = days_tolerance
+
+    def unmatched_bank(self) -> List[int]:
+        return np.flatnonzero(~self.used_bank).tolist()
+
+    def unmatched_gl(self) -> List[int]:
+        return np.flatnonzero(~self.used_gl).tolist()
+
+    def summary(self) -> Dict[str, Any]:
+        n_pairs = len(self.pairs)
+        return {
+            "bank_count": len(self.bank),
+            "gl_count": len(self.gl),
+            "matched": n_pairs,
+            "unmatched_bank": len(self.bank) - n_pairs,
+            "unmatched_gl": len(self.gl) - n_pairs,
+            "days_tolerance": self.days_tolerance,
+        }
+
+    def matched_row(self, i: int, j: int) -> Dict[str, Any]:
+        return {
+            "amount": float(self.bank.amount[i]),
+            "bank_date": self.bank.date_iso(i),
+            "gl_date":   self.gl.date_iso(j),
+            "bank_desc": self.bank.desc(i),
+            "gl_desc":   self.gl.desc(j),
+        }
+
+def match(bank_df: "pd.DataFrame", gl_df: "pd.DataFrame", days_tolerance: int = 3) -> QuickMatch:
     """Matching simple:
        - criterio 1: importe exacto y fecha dentro de ±days_tolerance
-       - unmatched quedan listados
+       - cada fila banco toma la primera fila GL libre que cumpla (orden del archivo)
+       Los usos se marcan por índice al asignar: O(n + candidatos revisados).
     """
-    bank_rows = normalize_bank_df(bank_df)
-    gl_rows   = normalize_gl_df(gl_df)
-
-    matched: List[Dict[str, Any]] = []
-    unmatched_bank = bank_rows.copy()
-    unmatched_gl   = gl_rows.copy()
-
-    # índice rápido por importe en GL
-    gl_by_amount: Dict[float, List[TxRow]] = {}
-    for r in gl_rows:
-        gl_by_amount.setdefault(r.amount, []).append(r)
-
-    def date_close(a: Optional[pd.Timestamp], b: Optional[pd.Timestamp]) -> bool:
-        if a is None or b is None:
-            return False
-        delta = abs((a.date() - b.date()).days)
-        return delta <= days_tolerance
-
-    used_gl: set[int] = set()
-
-    for b in bank_rows:
-        candidates = gl_by_amount.get(b.amount, [])
-        hit_idx = None
-        for idx, g in enumerate(candidates):
-            if id(g) in used_gl:
+    bank = normalize_bank_df(bank_df)
+    gl   = normalize_gl_df(gl_df)
+
+    # índice rápido por importe (centavos) en GL: posiciones en orden de aparición
+    gl_by_cents: Dict[int, List[int]] = {}
+    for j, c in enumerate(gl.cents.tolist()):
+        if c != NO_CENTS:
+            gl_by_cents.setdefault(c, []).append(j)
+
+    gl_day = gl.day.tolist()
+    used_bank = np.zeros(len(bank), dtype=bool)
+    used_gl = np.zeros(len(gl), dtype=bool)
+    pairs: List[Tuple[int, int]] = []
+
+    for i, (c, d) in enumerate(zip(bank.cents.tolist(), bank.day.tolist())):
+        if c == NO_CENTS or d == NO_DAY:
+            continue
+        for j in gl_by_cents.get(c, ()):
+            if used_gl[j]:
                 continue
-            if date_close(b.date, g.date):
-                hit_idx = idx
+            g_day = gl_day[j]
+            if g_day != NO_DAY and abs(d - g_day) <= days_tolerance:
+                used_bank[i] = True
+                used_gl[j] = True
+                pairs.append((i, j))
                 break
-        if hit_idx is not None:
-            g = candidates[hit_idx]
-            used_gl.add(id(g))
-            matched.append({
-                "amount": b.amount,
-                "bank_date": b.date.date().isoformat() if b.date is not None else None,
-                "gl_date":   g.date.date().isoformat() if g.date is not None else None,
-                "bank_desc": b.desc,
-                "gl_desc":   g.desc,
-            })
-
-    # reconstruir unmatched
-    matched_bank_ids = set(id(m) for m in [br for br in bank_rows for mm in matched if br.amount == mm["amount"] and (br.date is not None and mm["bank_date"] == br.date.date().isoformat())])
-    unmatched_bank = [r for r in bank_rows if id(r) not in matched_bank_ids]
-
-    matched_gl_ids = { id(r) for r in gl_rows if id(r) in used_gl }
-    unmatched_gl = [r for r in gl_rows if id(r) not in matched_gl_ids]
 
+    return QuickMatch(bank, gl, pairs, used_bank, used_gl, days_tolerance)
+
+def _cap(items: list, max_rows: int) -> list:
+    return items if max_rows <= 0 else items[:max_rows]
+
+def reconcile(bank_df: "pd.DataFrame", gl_df: "pd.DataFrame", days_tolerance: int = 3,
+              max_rows: int = 200) -> Dict[str, Any]:
+    """Resumen + listas para UI, cada lista limitada a max_rows (0 = sin tope)."""
+    qm = match(bank_df, gl_df, days_tolerance=days_tolerance)
+    summary = qm.summary()
+    summary["max_rows"] = max_rows
     return {
-        "summary": {
-            "bank_count": len(bank_rows),
-            "gl_count": len(gl_rows),
-            "matched": len(matched),
-            "unmatched_bank": len(unmatched_bank),
-            "unmatched_gl": len(unmatched_gl),
-            "days_tolerance": days_tolerance,
-        },
-        "matched": matched[:200],  # limitar para UI
-        "unmatched_bank": [
-            {
-                "date": r.date.date().isoformat() if r.date is not None else None,
-                "amount": r.amount,
-                "desc": r.desc,
-            } for r in unmatched_bank[:200]
-        ],
-        "unmatched_gl": [
-            {
-                "date": r.date.date().isoformat() if r.date is not None else None,
-                "amount": r.amount,
-                "desc": r.desc,
-            } for r in unmatched_gl[:200]
-        ],
+        "summary": summary,
+        "matched": [qm.matched_row(i, j) for i, j in _cap(qm.pairs, max_rows)],
+        "unmatched_bank": [qm.bank.ui_row(i) for i in _cap(qm.unmatched_bank(), max_rows)],
+        "unmatched_gl": [qm.gl.ui_row(j) for j in _cap(qm.unmatched_gl(), max_rows)],
     }
 
-def reconcile_from_paths(bank_path: Path, gl_path: Path, days_tolerance: int = 3) -> Dict[str, Any]:
+def iter_reconcile_ndjson(bank_df: "pd.DataFrame", gl_df: "pd.DataFrame", days_tolerance: int = 3) -> Iterator[str]:
+    """Listas completas, una línea JSON por registro (NDJSON): ver iter_ndjson."""
+    return iter_ndjson(match(bank_df, gl_df, days_tolerance=days_tolerance))
+
+def iter_ndjson(qm: QuickMatch) -> Iterator[str]:
+    """{"kind": "summary", ...}, luego {"kind": "matched" | "unmatched_bank" | "unmatched_gl", "row": {...}}.
+       Las filas se arman de a una, sin materializar las listas enteras; el matching ya está hecho,
+       así que lo único que queda para el stream es serializar.
+    """
+    yield json.dumps({"kind": "summary", **qm.summary()}, ensure_ascii=False) + "\n"
+    for i, j in qm.pairs:
+        yield json.dumps({"kind": "matched", "row": qm.matched_row(i, j)}, ensure_ascii=False) + "\n"
+    for i in qm.unmatched_bank():
+        yield json.dumps({"kind": "unmatched_bank", "row": qm.bank.ui_row(i)}, ensure_ascii=False) + "\n"
+    for j in qm.unmatched_gl():
+        yield json.dumps({"kind": "unmatched_gl", "row": qm.gl.ui_row(j)}, ensure_ascii=False) + "\n"
+
+def reconcile_from_paths(bank_path: Path, gl_path: Path, days_tolerance: int = 3,
+                         max_rows: int = 200) -> Dict[str, Any]:
     if pd is None:
         return {"ok": False, "error": "pandas no disponible"}
     bank_df = _load_excel(bank_path)
     gl_df   = _load_excel(gl_path)
-    return reconcile(bank_df, gl_df, days_tolerance=days_tolerance)
+    return reconcile(bank_df, gl_df, days_tolerance=days_tolerance, max_rows=max_rows)
 
+def match_from_paths(bank_path: Path, gl_path: Path, days_tolerance: int = 3) -> QuickMatch:
+    """Carga y matching completos (para stream=1: los errores salen antes de empezar a responder)."""
+    if pd is None:
+        raise RuntimeError("pandas no disponible")
+    bank_df = _load_excel(bank_path)
+    gl_df   = _load_excel(gl_path)
+    return match(bank_df, gl_df, days_tolerance=days_tolerance)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/reconcile/ref_index.py
+"""
+Pre-matching 1→1 por número de referencia (documento) + monto, antes del matcher por monto/fecha.
+
+Tokens: corridas de dígitos de al menos REF_MIN_DIGITS que no estén pegadas a letras (el "01" de
+"DI01" no cuenta) ni vengan después de "/", sin ceros a la izquierda y sin el sufijo de año
+("6484/2025" -> "6484"; en "77/2025" no hay token). Se
+extraen con str.extractall sobre toda la columna y el índice token -> filas es un join hash
+(merge por token) entre los dos lados; solo se aceptan aristas con el mismo monto en centavos.
+
+Greedy igual de determinista que pair_kernel: aristas ordenadas por (centavos, días de diferencia
+con NaT al final, row_p, row_b); se toma la arista si ninguna de las dos filas está usada.
+"""
+from __future__ import annotations
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.reconcile.pair_kernel import NS_PER_DAY
+
+REF_MIN_DIGITS = 4
+
+# número (no precedido por letra/dígito ni por "/": el año suelto no cuenta) + sufijo de año opcional
+_REF_RE = r"(?<![A-Za-z0-9/])(\d{%d,})(?:\s*/\s*\d{2,4})?" % REF_MIN_DIGITS
+
+_NO_DIFF = np.iinfo(np.int64).max
+
+
+def ref_tokens(docs: pd.Series) -> pd.DataFrame:
+    """Pares únicos (row, token) de la columna documento; row = posición en docs."""
+    s = pd.Series(docs).reset_index(drop=True)
+    text = s.where(s.notna(), "").astype(str)
+    found = text.str.extractall(_REF_RE)
+    if found.empty:
+        return pd.DataFrame({"row": np.zeros(0, dtype=np.int64), "token": pd.Series([], dtype=object)})
+    tokens = found[0].str.lstrip("0")
+    out = pd.DataFrame({
+        "row": found.index.get_level_values(0).to_numpy(dtype=np.int64),
+        "token": tokens.to_numpy(dtype=object),
+    })
+    out = out[out["token"] != ""]
+    return out.drop_duplicates().reset_index(drop=True)
+
+
+def match_by_reference(
+    monto_p: np.ndarray,
+    fecha_p: np.ndarray,
+    docs_p: pd.Series,
+    monto_b: np.ndarray,
+    fecha_b: np.ndarray,
+    docs_b: pd.Series,
+    max_days: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pares 1→1 con la misma referencia y el mismo monto (redondeado a 2).
+    max_days (None = sin límite): además |fecha_p - fecha_b| <= max_days (NaT no pasa ese filtro).
+    Devuelve (row_p, row_b, date_diff_days, token) en el orden del greedy; date_diff_days es
+    float (NaN si falta alguna fecha).
+    """
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+             np.zeros(0, dtype=float), np.zeros(0, dtype=object))
+    tok_p = ref_tokens(docs_p)
+    tok_b = ref_tokens(docs_b)
+    if tok_p.empty or tok_b.empty:
+        return empty
+    edges = tok_p.merge(tok_b, on="token", suffixes=("_p", "_b"))
+    if edges.empty:
+        return empty
+
+    cents_p = np.round(np.asarray(monto_p, dtype=float) * 100)
+    cents_b = np.round(np.asarray(monto_b, dtype=float) * 100)
+    rp = edges["row_p"].to_numpy(dtype=np.int64)
+    rb = edges["row_b"].to_numpy(dtype=np.int64)
+    same = cents_p[rp] == cents_b[rb]  # NaN nunca es igual
+    rp, rb, tokens = rp[same], rb[same], edges["token"].to_numpy(dtype=object)[same]
+    if len(rp) == 0:
+        return empty
+
+    t_p = np.asarray(fecha_p, dtype="datetime64[ns]").view(np.int64)
+    t_b = np.asarray(fecha_b, dtype="datetime64[ns]").view(np.int64)
+    nat = np.iinfo(np.int64).min
+    dated = (t_p[rp] != nat) & (t_b[rb] != nat)
+    diff = np.full(len(rp), _NO_DIFF, dtype=np.int64)
+    diff[dated] = np.abs(t_p[rp][dated] - t_b[rb][dated]) // NS_PER_DAY
+    if max_days is not None:
+        keep = diff <= max_days
+        rp, rb, tokens, diff = rp[keep], rb[keep], tokens[keep], diff[keep]
+
+    order = np.lexsort((rb, rp, diff, cents_p[rp]))
+    sel: list[int] = []
+    used_p: set[int] = set()
+    used_b: set[int] = set()
+    for k, row_p, row_b in zip(order.tolist(), rp[order].tolist(), rb[order].tolist()):
+        if row_p in used_p or row_b in used_b:
+            continue
+        used_p.add(row_p)
+        used_b.add(row_b)
+        sel.append(k)
+    idx = np.asarray(sel, dtype=np.int64)
+    diff_days = diff[idx].astype(float)
+    diff_days[diff[idx] == _NO_DIFF] = np.nan
+    return rp[idx], rb[idx], diff_days, tokens[idx]
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/reconcile/run_store.py
+"""
+Corridas de conciliación persistidas por run_id.
+
+/api/reconcile/start calcula el pipeline una sola vez (pares, agrupados, sugeridos, sobrantes,
+timings, resumen) y lo guarda acá; los endpoints de detalle y de resumen que reciben run_id
+solo cortan lo guardado en lugar de recargar los archivos y repetir la búsqueda N→1.
+
+Un pickle por corrida (<run_id>.pkl) en un DiskStore, porque el resultado lleva DataFrames y lo
+leen procesos distintos del pool. TTL y tope de entradas por LRU sobre el mtime: cada get toca el
+archivo, así una corrida que se sigue consultando no vence ni se desaloja. Cada proceso recuerda
+las últimas corridas leídas (memo chico) para que varios cortes seguidos de la misma pantalla no
+vuelvan a deserializar el archivo.
+
+El mismo store guarda las salidas memoizadas de las etapas del pipeline (stage_graph), con la
+clave de la etapa en lugar de un run_id.
+"""
+from __future__ import annotations
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+from uuid import uuid4
+
+from services.disk_store import DiskStore
+
+# Subir cuando cambie el contenido guardado por corrida
+RUN_STORE_VERSION = 2
+
+_RUN_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class RunNotFoundError(LookupError):
+    """run_id inexistente, vencido o con formato inválido."""
+
+
+class RunStore:
+    """Resultados de corridas en disco (<run_id>.pkl)."""
+
+    def __init__(self, root: Path | str, max_entries: int = 32, ttl_seconds: int = 3600, memo_entries: int = 4):
+        self._store = DiskStore(root, ".pkl", max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.memo_entries = max(0, int(memo_entries))
+        # run_id -> ((inodo, tamaño), corrida): os.replace deja un inodo nuevo, touch no lo cambia
+        self._memo: "OrderedDict[str, tuple[tuple[int, int], dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_run_id() -> str:
+        return uuid4().hex
+
+    def put(self, run_id: str, run: dict[str, Any]) -> None:
+        data = pickle.dumps({**run, "version": RUN_STORE_VERSION}, protocol=pickle.HIGHEST_PROTOCOL)
+        self._store.write_bytes(run_id, data)
+        with self._lock:
+            self._memo.pop(run_id, None)
+
+    def get(self, run_id: Optional[str]) -> dict[str, Any]:
+        """Corrida guardada (la marca como usada: LRU/TTL); RunNotFoundError si no existe o venció."""
+        if not run_id or not _RUN_ID_RE.match(run_id):
+            raise RunNotFoundError(run_id)
+        st = self._store.stat(run_id)
+        if st is None:
+            with self._lock:
+                self._memo.pop(run_id, None)
+            raise RunNotFoundError(run_id)
+        ident = (st.st_ino, st.st_size)
+        with self._lock:
+            hit = self._memo.get(run_id)
+            if hit is not None and hit[0] == ident:
+                self._memo.move_to_end(run_id)
+                run = hit[1]
+            else:
+                run = None
+        if run is None:
+            try:
+                run = pickle.loads(self._store.read_bytes(run_id) or b"")
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                raise RunNotFoundError(run_id) from None
+            if run.get("version") != RUN_STORE_VERSION:
+                self.discard(run_id)
+                raise RunNotFoundError(run_id)
+            if self.memo_entries:
+                with self._lock:
+                    self._memo[run_id] = (ident, run)
+                    self._memo.move_to_end(run_id)
+                    while len(self._memo) > self.memo_entries:
+                        self._memo.popitem(last=False)
+        self._store.touch(run_id)
+        return run
+
+    def discard(self, run_id: str) -> None:
+        with self._lock:
+            self._memo.pop(run_id, None)
+        self._store.discard(run_id)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/reconcile/stage_graph.py
+"""
+Pipeline de conciliación como DAG de etapas perezoso y memoizado.
+
+Cada etapa declara sus entradas (otras etapas o parámetros de la evaluación) y se evalúa solo
+cuando alguien la pide: evaluate("pairs", ...) no corre las etapas que dependen de ella. La clave
+de memo de una etapa es un hash de su nombre, su versión, su config (tupla con los parámetros
+globales que cambian el resultado, p.ej. Var.REF_MATCH_*), las huellas de sus parámetros y las
+claves de las etapas de las que depende; no hace falta calcular nada para conocerla.
+
+Las salidas se guardan en un RunStore (pickle por clave, TTL, tope de entradas, memo por proceso):
+lo que calculó un proceso del pool lo reusa otro. Los parámetros `volatile` llegan a la función
+pero no entran en la clave (resume: cambia cómo se calcula, no qué se calcula); para forzar el
+recálculo de una etapa se pide con refresh. Una salida que depende de algo fuera de la clave (p.ej.
+la N→1 cortada por presupuesto de tiempo) no se guarda: la etapa lo declara con `cacheable`.
+"""
+from __future__ import annotations
+import hashlib
+from typing import Any, Callable, Iterable, Optional
+
+from services.reconcile.run_store import RunNotFoundError, RunStore
+
+MEMO = "memo"
+COMPUTED = "computed"
+
+
+class Stage:
+    """
+    Etapa: fn(**entradas) -> salida (picklable si memo=True).
+    cacheable(salida) -> bool: si da False la salida se usa pero no se memoiza.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        inputs: Iterable[str] = (),
+        *,
+        volatile: Iterable[str] = (),
+        config: Optional[Callable[[], tuple]] = None,
+        version: int = 1,
+        memo: bool = True,
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.volatile = frozenset(volatile)
+        self.config = config
+        self.version = int(version)
+        self.memo = bool(memo)
+        self.cacheable = cacheable
+
+
+class StageGraph:
+    """Etapas por nombre; las entradas que no son etapas se buscan en los parámetros."""
+
+    def __init__(self, stages: Iterable[Stage], store: Optional[RunStore] = None):
+        # En orden: una entrada que nombra una etapa posterior se toma como parámetro (sin ciclos)
+        self.stages: dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"etapa duplicada: {stage.name}")
+            stage.inputs = tuple(inp for inp in stage.inputs if inp != stage.name)
+            self.stages[stage.name] = stage
+        self.store = store
+
+    def key(self, name: str, keys: dict[str, Any]) -> str:
+        """Clave de memo de la etapa (32 hex) a partir de las huellas de los parámetros."""
+        stage = self.stages[name]
+        parts: list[Any] = [name, stage.version, stage.config() if stage.config else ()]
+        for inp in stage.inputs:
+            if inp in stage.volatile:
+                continue
+            if inp in self.stages:
+                parts.append((inp, self.key(inp, keys)))
+            else:
+                parts.append((inp, keys[inp]))
+        return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+    def peek(self, name: str, keys: dict[str, Any]) -> Any:
+        """Salida memoizada de la etapa o None, sin calcular nada."""
+        stage = self.stages[name]
+        if self.store is None or not stage.memo:
+            return None
+        try:
+            return self.store.get(self.key(name, keys))["value"]
+        except RunNotFoundError:
+            return None
+
+    def evaluate(
+        self,
+        name: str,
+        params: dict[str, Any],
+        *,
+        keys: Optional[dict[str, Any]] = None,
+        refresh: Iterable[str] = (),
+        memo: bool = True,
+        trace: Optional[dict[str, str]] = None,
+        on_stage: Optional[Callable[[str, Any, str], None]] = None,
+    ) -> Any:
+        """
+        Salida de la etapa `name` evaluando solo las etapas de las que depende.
+        keys: huella por parámetro para la clave (default: el valor mismo; los DataFrames necesitan una).
+        refresh: etapas a recalcular aunque estén memoizadas (el resultado reemplaza al guardado).
+        memo=False: calcula todo sin leer ni escribir el store.
+        trace: se completa con etapa -> "memo" | "computed".
+        on_stage(etapa, salida, "memo" | "computed"): se llama al resolver cada etapa, en orden.
+        """
+        keys = {**params, **(keys or {})}
+        refresh = frozenset(refresh)
+        trace = {} if trace is None else trace
+        values: dict[str, Any] = {}
+        return self._eval(name, params, keys, refresh, memo and self.store is not None, trace, values, on_stage)
+
+    def _eval(self, name, params, keys, refresh, memo, trace, values, on_stage) -> Any:
+        if name in values:
+            return values[name]
+        stage = self.stages[name]
+        use_store = memo and stage.memo
+        key = self.key(name, keys) if use_store else None
+        if use_store and name not in refresh:
+            try:
+                values[name] = self.store.get(key)["value"]
+                trace[name] = MEMO
+                if on_stage is not None:
+                    on_stage(name, values[name], MEMO)
+                return values[name]
+            except RunNotFoundError:
+                pass
+        args = {
+            inp: self._eval(inp, params, keys, refresh, memo, trace, values, on_stage) if inp in self.stages else params[inp]
+            for inp in stage.inputs
+        }
+        out = stage.fn(**args)
+        if use_store and (stage.cacheable is None or stage.cacheable(out)):
+            self.store.put(key, {"stage": name, "value": out})
+        values[name] = out
+        trace[name] = COMPUTED
+        if on_stage is not None:
+            on_stage(name, out, COMPUTED)
+        return out
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/reconcile/subset_sum.py
+"""
+Subset-sum acotado para los grupos N→1: qué combinación de 2..max_combo candidatos
+suma el target dentro de la tolerancia.
+
+Modos:
+- "first" (default): la misma combinación que el DFS histórico de _find_combo, o sea la
+  primera en preorden lexicográfico de índices (i1 < i2 < ...). La aceptación se decide
+  con la suma float acumulada en ese mismo orden, así los bordes de tolerancia dan igual.
+- "min_diff": la de menor |suma - target| (empates: la primera en ese orden).
+- "min_card": la de menos elementos (empates: la primera en ese orden).
+
+La poda trabaja en centavos enteros:
+- branch-and-bound: con los candidatos del mismo signo, las sumas alcanzables desde un nodo
+  quedan entre S + (los r más chicos del sufijo) y S + (los r más grandes); si ese rango no
+  toca la ventana del target, la rama se descarta;
+- meet-in-the-middle: con muchos candidatos, antes del DFS se arman las sumas por tamaño de
+  cada mitad y se busca (searchsorted) si existe alguna combinación posible. El caso común
+  (ninguna) sale sin recorrer el árbol.
+Las cotas usan una holgura de redondeo (centavos vs float) para no descartar nunca una
+combinación que el chequeo float aceptaría.
+"""
+from __future__ import annotations
+import math
+from typing import Optional, Sequence
+
+import numpy as np
+
+COMBO_MODES = ("first", "min_diff", "min_card")
+
+# Desde cuántos candidatos conviene el chequeo meet-in-the-middle previo al DFS
+MITM_MIN_CANDIDATES = 12
+
+
+def _dfs_plain(amounts: Sequence[float], target: float, max_combo: int, tol: float, min_combo: int) -> list[int]:
+    """DFS histórico sin poda (montos con signos mezclados o no finitos)."""
+    n = len(amounts)
+    current: list[int] = []
+
+    def dfs(start: int, current_sum: float) -> bool:
+        if len(current) >= min_combo and abs(current_sum - target) <= tol:
+            return True
+        if len(current) >= max_combo:
+            return False
+        for i in range(start, n):
+            current.append(i)
+            if dfs(i + 1, current_sum + amounts[i]):
+                return True
+            current.pop()
+        return False
+
+    return list(current) if dfs(0, 0.0) else []
+
+
+class _Bounds:
+    """Cotas en centavos (valores absolutos) para ramas que arrancan en el índice j."""
+
+    def __init__(self, cents: list[int], max_combo: int):
+        n = len(cents)
+        self.low: list[list[int]] = []   # low[j][r]: suma de los r menores de cents[j:]
+        self.high: list[list[int]] = []  # high[j][r]: suma de los r mayores de cents[j:]
+        for j in range(n + 1):
+            suffix = sorted(cents[j:])
+            top = min(max_combo, len(suffix))
+            low = [0]
+            high = [0]
+            for r in range(1, top + 1):
+                low.append(low[-1] + suffix[r - 1])
+                high.append(high[-1] + suffix[-r])
+            self.low.append(low)
+            self.high.append(high)
+
+    def reach(self, j: int, r_lo: int, r_hi: int) -> Optional[tuple[int, int]]:
+        """(mín, máx) que puede sumar una extensión de r_lo..r_hi elementos desde j; None si no hay."""
+        r_hi = min(r_hi, len(self.low[j]) - 1)
+        if r_lo > r_hi:
+            return None
+        return self.low[j][r_lo], self.high[j][r_hi]
+
+
+def _half_sums(cents: np.ndarray, max_size: int) -> list[np.ndarray]:
+    """Sumas de todos los subconjuntos de cents por tamaño (0..max_size)."""
+    by_size = [np.zeros(1, dtype=np.int64)]
+    last = [np.full(1, -1, dtype=np.int64)]
+    for _ in range(max_size):
+        sums_prev, last_prev = by_size[-1], last[-1]
+        new_sums: list[np.ndarray] = []
+        new_last: list[np.ndarray] = []
+        for e, value in enumerate(cents.tolist()):
+            mask = last_prev < e
+            if mask.any():
+                new_sums.append(sums_prev[mask] + value)
+                new_last.append(np.full(int(mask.sum()), e, dtype=np.int64))
+        if not new_sums:
+            break
+        by_size.append(np.concatenate(new_sums))
+        last.append(np.concatenate(new_last))
+    return by_size
+
+
+def _mitm_possible(cents: list[int], lo: int, hi: int, min_combo: int, max_combo: int) -> bool:
+    """¿Existe algún subconjunto con min_combo..max_combo elementos y suma en [lo, hi]?"""
+    arr = np.asarray(cents, dtype=np.int64)
+    half = len(arr) // 2
+    sums_a = _half_sums(arr[:half], max_combo)
+    sums_b = [np.sort(s) for s in _half_sums(arr[half:], max_combo)]
+    for ka, sa in enumerate(sums_a):
+        for kb, sb in enumerate(sums_b):
+            if not (min_combo <= ka + kb <= max_combo):
+                continue
+            left = np.searchsorted(sb, lo - sa, "left")
+            right = np.searchsorted(sb, hi - sa, "right")
+            if (left < right).any():
+                return True
+    return False
+
+
+def find_subset(
+    amounts: Sequence[float],
+    target: float,
+    max_combo: int,
+    tol_amount: float,
+    min_combo: int = 2,
+    mode: str = "first",
+) -> list[int]:
+    """
+    Índices (ascendentes) de la combinación elegida según mode, o [] si no hay.
+    """
+    if mode not in COMBO_MODES:
+        raise ValueError(f"mode inválido: {mode!r} (usar {COMBO_MODES})")
+    n = len(amounts)
+    values = [float(a) for a in amounts]
+    target = float(target)
+    tol = float(tol_amount)
+    min_combo = max(0, int(min_combo))
+    max_combo = int(max_combo)
+
+    finite = all(math.isfinite(v) for v in values) and math.isfinite(target) and math.isfinite(tol)
+    same_sign = all(v >= 0 for v in values) or all(v <= 0 for v in values)
+    if not finite or not same_sign:
+        if mode != "first":
+            raise ValueError("min_diff/min_card requieren montos finitos del mismo signo")
+        return _dfs_plain(values, target, max_combo, tol, min_combo)
+
+    # Centavos en valor absoluto (todos del mismo signo) y ventana conservadora [lo, hi] para el total
+    sign = -1 if any(v < 0 for v in values) else 1
+    cents = [abs(round(v * 100)) for v in values]
+    t_cents = sign * target * 100
+    slack = 0.5 * (max_combo + 1) + 1.0  # redondeo a centavos de cada monto + target, y error float
+    lo = math.floor(t_cents - tol * 100 - slack)
+    hi = math.ceil(t_cents + tol * 100 + slack)
+
+    if n >= MITM_MIN_CANDIDATES and not _mitm_possible(cents, lo, hi, max(min_combo, 1), max_combo):
+        return []
+
+    bounds = _Bounds(cents, max_combo)
+    current: list[int] = []
+    best: list[int] = []
+    best_diff = math.inf
+
+    def feasible(j: int, k: int, s_cents: int, size_cap: int) -> bool:
+        reach = bounds.reach(j, max(0, min_combo - k), size_cap - k)
+        if reach is None:
+            return False
+        return s_cents + reach[1] >= lo and s_cents + reach[0] <= hi
+
+    def dfs(start: int, current_sum: float, s_cents: int, size_cap: int) -> bool:
+        nonlocal best, best_diff
+        k = len(current)
+        if k >= min_combo:
+            diff = abs(current_sum - target)
+            if diff <= tol:
+                if mode != "min_diff":
+                    best = list(current)
+                    return True
+                if diff < best_diff:
+                    best, best_diff = list(current), diff
+                    if diff == 0.0:
+                        return True
+        if k >= size_cap:
+            return False
+        for i in range(start, n):
+            child = s_cents + cents[i]
+            if child > hi:
+                continue
+            if not feasible(i + 1, k + 1, child, size_cap):
+                continue
+            current.append(i)
+            found = dfs(i + 1, current_sum + values[i], child, size_cap)
+            current.pop()
+            if found:
+                return True
+        return False
+
+    if mode == "min_card":
+        for size in range(max(min_combo, 1), max_combo + 1):
+            if feasible(0, 0, 0, size) and dfs(0, 0.0, 0, size) and len(best) == size:
+                return best
+            best = []
+        return []
+    dfs(0, 0.0, 0, max_combo)
+    return best
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/shared_frames.py
+"""
+Frames de los loaders compartidos entre procesos vía Arrow IPC (Feather v2) + memory map.
+
+El primer worker (gunicorn o del pool) que carga un PILAGA/extracto lo escribe una vez sin
+compresión en SHARED_FRAMES_DIR; el resto lo abre con pa.memory_map y to_pandas(split_blocks=True),
+así las columnas numéricas y de fecha apuntan a las mismas páginas del page cache en todos
+los procesos (zero-copy, arrays read-only). Las columnas de texto se materializan igual
+como object: son las chicas.
+
+La clave incluye ruta + size + mtime del archivo fuente, así un XLSX pisado no reusa el frame viejo.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional
+from uuid import uuid4
+
+import globalVar as Var
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.feather as feather  # type: ignore
+except Exception:
+    pa = None
+    feather = None
+
+# Subir cuando cambie la salida de los loaders: los .arrow viejos dejan de matchear.
+SHARED_FRAMES_VERSION = 2
+
+_LOCK = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return feather is not None and bool(Var.SHARED_FRAMES_DIR)
+
+
+def _frame_path(kind: str, source: Path) -> Path:
+    source = Path(source)
+    st = source.stat()
+    raw = f"{SHARED_FRAMES_VERSION}|{kind}|{source.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return Path(Var.SHARED_FRAMES_DIR) / f"{kind}-{digest}.arrow"
+
+
+def load_shared(kind: str, source: Path) -> Optional[Any]:
+    """DataFrame mapeado en memoria si algún proceso ya lo publicó; si no, None."""
+    if not is_enabled():
+        return None
+    try:
+        path = _frame_path(kind, source)
+        mm = pa.memory_map(str(path), "r")
+    except (OSError, ValueError):
+        return None
+    try:
+        table = pa.ipc.open_file(mm).read_all()
+        df = table.to_pandas(split_blocks=True)
+    except Exception:
+        return None
+    try:
+        os.utime(path, None)  # LRU entre procesos: marcar como usado
+    except OSError:
+        pass
+    return df
+
+
+def store_shared(kind: str, source: Path, df) -> Optional[Any]:
+    """
+    Publica el frame (escritura atómica) y devuelve la versión mapeada en memoria,
+    para que también este proceso use las páginas compartidas. Si falla, None.
+    """
+    if not is_enabled():
+        return None
+    try:
+        path = _frame_path(kind, source)
+        with _LOCK:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.parent / f".{path.name}.{uuid4().hex}.tmp"
+            try:
+                feather.write_feather(df, str(tmp), compression="uncompressed")
+                os.replace(tmp, path)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+            _evict(path.parent)
+    except Exception as e:
+        print("[shared_frames] store ERROR:", type(e).__name__, str(e), flush=True)
+        return None
+    return load_shared(kind, source)
+
+
+def _evict(root: Path) -> None:
+    """Desaloja los .arrow menos usados hasta respetar SHARED_FRAMES_MAX_BYTES.
+    Los procesos que ya los tienen mapeados siguen leyendo (unlink no invalida el mmap)."""
+    entries: list[tuple[int, int, Path]] = []
+    for p in root.glob("*.arrow"):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime_ns, st.st_size, p))
+    entries.sort(key=lambda e: e[0])  # más viejo primero
+
+    total = sum(e[1] for e in entries)
+    for _, size, p in entries[:-1]:  # nunca el recién escrito
+        if total <= Var.SHARED_FRAMES_MAX_BYTES:
+            break
+        try:
+            p.unlink()
+        except OSError:
+            continue
+        total -= size
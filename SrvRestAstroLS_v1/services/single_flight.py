@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# SrvRestAstroLS_v1/services/single_flight.py
+"""
+Single-flight para los handlers async: requests concurrentes con la misma clave comparten
+una sola ejecución.
+
+La pantalla de conciliación dispara a la vez resumen, head, descomposición y las cards de
+detalle con los mismos archivos y parámetros; el primero (líder) lanza el cálculo y los demás
+esperan el mismo future. El cálculo corre en una task propia: si el request líder se cancela
+(el cliente cerró la conexión) los que esperan no se quedan sin resultado. Solo coalesce lo
+que está en vuelo: al terminar, la clave se libera (el resultado no se cachea acá).
+
+Vive en el event loop de cada worker del server: coalesce dentro del proceso, no entre workers.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Ejecuciones en vuelo por clave + contadores (líderes, coalescidos, errores, segundos ahorrados)."""
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.saved_seconds = 0.0  # duración de la ejecución compartida, sumada por cada request coalescido
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Resultado de fn() para key; si ya hay una ejecución en vuelo con esa key, espera esa."""
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            result, elapsed = await asyncio.shield(task)
+            self.saved_seconds += elapsed
+            return result
+
+        self.leaders += 1
+        task = asyncio.ensure_future(self._timed(fn))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t, k=key: self._done(k, t))
+        result, _ = await asyncio.shield(task)
+        return result
+
+    @staticmethod
+    async def _timed(fn: Callable[[], Awaitable[T]]) -> tuple[T, float]:
+        t0 = time.perf_counter()
+        result = await fn()
+        return result, time.perf_counter() - t0
+
+    def _done(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
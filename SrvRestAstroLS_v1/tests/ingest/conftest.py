@@ -0,0 +1,62 @@
+import zipfile
+from datetime import datetime
+
+import openpyxl
+import pytest
+
+# Filas extra escritas a mano en el XML: openpyxl guarda todo texto como shared string
+_INLINE_ROWS = (
+    '<row r="9"><c r="B9" t="inlineStr"><is><t>texto inline</t></is></c>'
+    '<c r="E9" t="inlineStr"><is><r><t>rich </t></r><r><t>inline</t></r></is></c></row>'
+)
+
+
+@pytest.fixture
+def sample_xlsx(tmp_path):
+    """
+    xlsx chico con lo que los lectores livianos tienen que resolver igual que openpyxl:
+    shared e inline strings, fila ausente, columnas salteadas, fechas con formato,
+    enteros, decimales y booleanos.
+    """
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Movimientos"
+    ws["A1"], ws["B1"], ws["C1"], ws["D1"], ws["E1"] = "Fecha", "Concepto", "Importe", "Saldo", "Marca"
+    ws["A2"], ws["B2"], ws["C2"], ws["D2"] = datetime(2025, 10, 1), "TRANSF 6484", 1500, 1500.25
+    ws["A2"].number_format = "dd/mm/yyyy"
+    # fila 3 ausente; fila 4 con huecos (B y D vacías)
+    ws["A4"], ws["C4"], ws["E4"] = datetime(2025, 10, 2, 13, 45), -200.5, True
+    ws["A4"].number_format = "dd/mm/yyyy hh:mm"
+    ws["C6"] = "TRANSF 6484"  # shared string repetido
+    ws["F7"] = 0
+    wb.create_sheet("Otra")["A1"] = "segunda hoja"
+    path = tmp_path / "muestra.xlsx"
+    wb.save(path)
+
+    # inyecta una fila con inline strings (simple y rich) en la primera hoja
+    patched = tmp_path / "muestra_inline.xlsx"
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(patched, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = data.replace(b"</sheetData>", _INLINE_ROWS.encode() + b"</sheetData>")
+            dst.writestr(item, data)
+    return patched
+
+
+def openpyxl_rows(path, sheet=None):
+    """Filas de referencia: openpyxl read-only / data_only / values_only, sin None al final."""
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        ws.reset_dimensions()
+        return [strip_row(r) for r in ws.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+
+def strip_row(row):
+    row = tuple(row)
+    while row and row[-1] is None:
+        row = row[:-1]
+    return row
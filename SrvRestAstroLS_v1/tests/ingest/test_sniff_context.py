@@ -0,0 +1,53 @@
+import pandas as pd
+
+from conftest import openpyxl_rows, strip_row
+from services.ingest import sniff_bank
+from services.ingest.sniff_bank import SniffContext
+from services.ingest.xlsx_stream import XlsxStream
+
+
+def test_rows_match_openpyxl_cell_by_cell(sample_xlsx):
+    expected = openpyxl_rows(sample_xlsx)
+    with SniffContext(sample_xlsx) as ctx:
+        assert ctx._xs is not None  # camino liviano
+        assert ctx.first_sheet_name == "Movimientos"
+        head = ctx.rows(3)
+        rows = ctx.rows()
+    assert rows[:3] == head  # pedir más filas continúa la lectura cacheada
+    assert len({len(r) for r in rows}) == 1  # rellenadas al ancho declarado
+    assert [strip_row(r) for r in rows] == expected
+    for got_row, exp_row in zip(rows, expected):
+        assert [type(v) for v in strip_row(got_row)] == [type(v) for v in exp_row]
+
+
+def test_frame_matches_read_excel(sample_xlsx):
+    with SniffContext(sample_xlsx) as ctx:
+        got = ctx.frame(header=None)
+        head = ctx.frame(header=0, nrows=3)
+    pd.testing.assert_frame_equal(got, pd.read_excel(sample_xlsx, header=None, engine="openpyxl"))
+    pd.testing.assert_frame_equal(head, pd.read_excel(sample_xlsx, header=0, nrows=3, engine="openpyxl"))
+
+
+def test_falls_back_to_openpyxl_when_the_stream_cannot_open(monkeypatch, sample_xlsx):
+    def broken(path):
+        raise ValueError("xml inesperado")
+
+    monkeypatch.setattr(sniff_bank, "XlsxStream", broken)
+    with SniffContext(sample_xlsx) as ctx:
+        assert ctx._xs is None and ctx._wb is not None
+        assert [strip_row(r) for r in ctx.rows()] == openpyxl_rows(sample_xlsx)
+
+
+def test_falls_back_to_openpyxl_mid_sheet(monkeypatch, sample_xlsx):
+    class FailsAfterTwoRows(XlsxStream):
+        def iter_rows(self, sheet=None):
+            for i, row in enumerate(super().iter_rows(sheet)):
+                if i == 2:
+                    raise ValueError("celda que el lector liviano no entiende")
+                yield row
+
+    monkeypatch.setattr(sniff_bank, "XlsxStream", FailsAfterTwoRows)
+    with SniffContext(sample_xlsx) as ctx:
+        rows = ctx.rows()
+        assert ctx._wb is not None  # siguió con openpyxl desde la fila 3
+    assert [strip_row(r) for r in rows] == openpyxl_rows(sample_xlsx)
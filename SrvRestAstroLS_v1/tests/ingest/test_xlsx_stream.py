@@ -0,0 +1,32 @@
+from datetime import datetime
+
+import pandas as pd
+
+from conftest import openpyxl_rows, strip_row
+from services.ingest.xlsx_frames import XlsxStreamFile
+from services.ingest.xlsx_stream import XlsxStream
+
+
+def test_rows_match_openpyxl_cell_by_cell(sample_xlsx):
+    expected = openpyxl_rows(sample_xlsx)
+    with XlsxStream(sample_xlsx) as xs:
+        assert xs.worksheet_names == ["Movimientos", "Otra"]
+        got = [strip_row(r) for r in xs.iter_rows()]
+        assert [strip_row(r) for r in xs.iter_rows("Otra")] == openpyxl_rows(sample_xlsx, "Otra")
+    assert len(got) == len(expected)
+    for got_row, exp_row in zip(got, expected):
+        assert got_row == exp_row
+        assert [type(v) for v in got_row] == [type(v) for v in exp_row]
+
+    # los casos que el lector resuelve por su cuenta
+    assert got[1][:4] == (datetime(2025, 10, 1), "TRANSF 6484", 1500, 1500.25)
+    assert got[2] == ()  # fila ausente en el XML
+    assert got[3] == (datetime(2025, 10, 2, 13, 45), None, -200.5, None, True)
+    assert got[8] == (None, "texto inline", None, None, "rich inline")
+
+
+def test_stream_file_parses_like_pandas_openpyxl(sample_xlsx):
+    expected = pd.read_excel(sample_xlsx, header=None, engine="openpyxl")
+    with XlsxStreamFile(sample_xlsx) as xls:
+        got = xls.parse(sheet_name=0, header=None)
+    pd.testing.assert_frame_equal(got, expected)
@@ -0,0 +1,54 @@
+import openpyxl
+
+from routes.v1 import reconcile_start
+
+
+def _xlsx(path, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+    return path
+
+
+def test_engine_is_picked_on_a_bounded_sample(monkeypatch, tmp_path):
+    path = _xlsx(tmp_path / "mov.xlsx", [["Fecha", "Importe", "Concepto"]] + [[f"2025-09-{i % 28 + 1:02d}", i * 1.5, f"c{i}"] for i in range(600)])
+    monkeypatch.setattr(reconcile_start, "_ENGINE_BY_SUFFIX", {})
+
+    probes = []
+    probe_with = reconcile_start._probe_with
+
+    def spy(engine, p):
+        out = probe_with(engine, p)
+        probes.append((engine, len(out)))
+        return out
+
+    monkeypatch.setattr(reconcile_start, "_probe_with", spy)
+    full = []
+
+    def parse(xls):
+        full.append(1)
+        return xls.parse(sheet_name=0, header=None)
+
+    out, engine = reconcile_start._read_excel(path, parse)
+    assert len(out) == 601 and len(full) == 1  # una sola lectura completa, con el motor elegido
+    assert probes and all(n <= reconcile_start._ENGINE_PROBE_ROWS for _, n in probes)
+    assert reconcile_start._ENGINE_BY_SUFFIX[".xlsx"] == engine
+
+    probes.clear()
+    reconcile_start._read_excel(path, parse)
+    assert probes == [] and len(full) == 2  # la decisión queda para la extensión
+
+
+def test_engine_with_a_different_sample_is_not_picked(monkeypatch, tmp_path):
+    path = _xlsx(tmp_path / "mov.xlsx", [["a", 1], ["b", 2]])
+    monkeypatch.setattr(reconcile_start, "_ENGINE_BY_SUFFIX", {})
+    probe_with = reconcile_start._probe_with
+
+    def skewed(engine, p):
+        out = probe_with(engine, p)
+        return out.iloc[:1] if engine != "openpyxl" else out
+
+    monkeypatch.setattr(reconcile_start, "_probe_with", skewed)
+    assert reconcile_start._pick_engine(path) == "openpyxl"
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.frame_cache import FrameCache, frame_nbytes
+
+
+def _frame(n: int = 3) -> pd.DataFrame:
+    return pd.DataFrame({
+        "fecha": pd.date_range("2025-10-01", periods=n),
+        "monto": [10.5 * (i + 1) for i in range(n)],
+        "numero": list(range(n)),
+        "documento": [f"OP: {i}/2025" for i in range(n)],
+    })
+
+
+def test_cached_frames_are_read_only_without_copy():
+    cache = FrameCache(max_bytes=1 << 20)
+    df = _frame()
+    cache.put("a", df)
+    got = cache.get("a")
+    assert np.shares_memory(got["monto"].values, df["monto"].values)  # copia superficial: mismos datos
+    for col, value in (("fecha", pd.Timestamp("2030-01-01").to_datetime64()), ("monto", 1.0), ("numero", 7), ("documento", "x")):
+        with pytest.raises(ValueError):
+            got[col].values[0] = value
+    pd.testing.assert_frame_equal(got, _frame())
+    # copiar sigue permitiendo modificar
+    cp = got.copy()
+    cp.loc[0, "monto"] = 1.0
+    assert cp.loc[0, "monto"] == 1.0
+
+
+def test_lru_eviction_by_bytes_and_ttl(monkeypatch):
+    size = frame_nbytes(_frame())
+    cache = FrameCache(max_bytes=2 * size + size // 2)
+    for key in ("a", "b"):
+        cache.put(key, _frame())
+    assert cache.get("a") is not None  # "b" queda como la menos usada
+    cache.put("c", _frame())
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.stats()["evictions"] == 1
+
+    now = [1000.0]
+    monkeypatch.setattr("services.frame_cache.time.monotonic", lambda: now[0])
+    ttl = FrameCache(max_bytes=1 << 20, ttl_seconds=10)
+    ttl.put("a", _frame())
+    now[0] += 5
+    assert ttl.get("a") is not None
+    now[0] += 10
+    assert ttl.get("a") is None
+    assert ttl.stats()["expirations"] == 1 and len(ttl) == 0
+
+
+def test_column_changes_do_not_reach_the_cache():
+    cache = FrameCache(max_bytes=1 << 20)
+    first = cache.put("a", _frame())
+    first["extra"] = 1
+    got = cache.get("a")
+    got["otra"] = 2
+    got.drop(columns=["monto"], inplace=True)
+    again = cache.get("a")
+    assert list(again.columns) == ["fecha", "monto", "numero", "documento"]
+    with pytest.raises(ValueError):
+        again["monto"].values[0] = 1.0
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+
+from services.jobs import CANCELLED, DONE, JobRegistry
+
+
+def _phases(channel, ready=None):
+    channel.begin()
+    channel.report("load", rows={"banco": 3})
+    if ready is not None:
+        ready.set()
+        while not channel.cancelled():
+            time.sleep(0.01)
+    channel.report("pairs", rows={"pares": 2})
+    channel.publish("pairs", {"total": 2})
+    return {"run_id": "r1"}
+
+
+def test_job_reports_phases_and_partial_results_before_done():
+    seen = []
+
+    async def main():
+        registry = JobRegistry()
+
+        async def on_progress(job, event):
+            seen.append(event.get("phase") or (event["name"], event["payload"]["total"]))
+
+        async def on_done(job):
+            seen.append(job.status)
+
+        job = registry.submit("reconcile", lambda job: asyncio.to_thread(_phases, job.channel),
+                              on_progress=on_progress, on_done=on_done)
+        assert job.status == "queued"
+        await job.task
+        return job
+
+    job = asyncio.run(main())
+    assert seen == ["load", "pairs", ("pairs", 2), DONE]
+    assert job.result == {"run_id": "r1"}
+    assert job.published == ["pairs"]
+    assert [p["rows"] for p in job.progress] == [{"banco": 3}, {"pares": 2}]
+
+
+def test_cancel_stops_the_work_at_the_next_phase():
+    async def main():
+        registry = JobRegistry()
+        worker_ready = threading.Event()
+        outcome = []
+
+        def work(channel):
+            try:
+                return _phases(channel, worker_ready)
+            except Exception as e:
+                outcome.append(type(e).__name__)
+                raise
+
+        job = registry.submit("reconcile", lambda job: asyncio.to_thread(work, job.channel))
+        await asyncio.to_thread(worker_ready.wait, 5)
+        registry.cancel(job.job_id)
+        assert job.status == CANCELLED
+        assert not job.task.done()  # la task sigue hasta que el worker devuelve el control
+        await asyncio.wait_for(job.task, 5)
+        return job, outcome
+
+    job, outcome = asyncio.run(main())
+    assert job.status == CANCELLED
+    assert outcome == ["JobCancelled"]
+    assert job.result is None
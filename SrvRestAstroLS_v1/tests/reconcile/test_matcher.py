@@ -51,3 +51,254 @@ def test_match_handles_duplicate_amounts_without_dropping_pairs():
     assert sobrantes_b.empty
     assert set(pairs["documento_p"]) == {"DI01: 6484/2025", "DI01: 6485/2025"}
     assert set(pairs["documento_b"]) == {"6209261", "6209264"}
+
+
+def test_reference_pairs_resolve_repeated_amounts_before_dates():
+    # por fecha, 6484 iría con la transferencia 6490 (mismo día); la referencia los desambigua
+    pilaga = _pilaga_df(
+        [
+            ("2025-09-01", 1_000.00, "DI01: 6484/2025"),
+            ("2025-09-02", 1_000.00, "DI01: 6490/2025"),
+            ("2025-09-02", 2_025.00, "OP: 77/2025"),
+        ]
+    )
+    banco = _banco_df(
+        [
+            ("2025-09-01", 1_000.00, "6490"),
+            ("2025-09-02", 1_000.00, "0006484"),
+            ("2025-09-02", 2_025.00, "2025"),
+        ]
+    )
+
+    pairs, _, _ = _match_one_to_one_by_amount_and_date_window(pilaga, banco, days_window=5)
+
+    by_doc = dict(zip(pairs["documento_p"], pairs["documento_b"]))
+    assert by_doc == {"DI01: 6484/2025": "0006484", "DI01: 6490/2025": "6490", "OP: 77/2025": "2025"}
+    # el año no es referencia: el último par sale por monto/fecha
+    assert pairs["match_ref"].tolist() == ["6484", "6490", ""]
+    assert pairs["date_diff_days"].tolist() == [1, 1, 0]
+
+
+def test_reference_pairs_respect_the_requested_days_window(monkeypatch):
+    import globalVar as Var
+
+    pilaga = _pilaga_df([("2025-09-01", 1_000.00, "DI01: 6484/2025")])
+    banco = _banco_df([("2025-09-11", 1_000.00, "0006484")])  # misma referencia, 10 días después
+
+    pairs, _, _ = _match_one_to_one_by_amount_and_date_window(pilaga, banco, days_window=5)
+    assert pairs.empty
+
+    pairs, _, _ = _match_one_to_one_by_amount_and_date_window(pilaga, banco, days_window=15)
+    assert pairs["match_ref"].tolist() == ["6484"]
+
+    # REF_MATCH_MAX_DAYS solo acota la ventana, no la amplía: el par sale por monto/fecha
+    monkeypatch.setattr(Var, "REF_MATCH_MAX_DAYS", 7)
+    pairs, _, _ = _match_one_to_one_by_amount_and_date_window(pilaga, banco, days_window=15)
+    assert pairs["match_ref"].tolist() == [""]
+
+
+def test_large_amount_buckets_match_like_small_ones(monkeypatch):
+    from services.reconcile import pair_kernel
+
+    dates = pd.date_range("2025-09-01", periods=12, freq="D")
+    pilaga = _pilaga_df([(dates[i % 12], 1_000.0 * (i % 3 + 1), f"P{i}") for i in range(40)])
+    banco = _banco_df([(dates[(i * 5) % 12], 1_000.0 * (i % 3 + 1), f"B{i}") for i in range(35)])
+
+    expected = _match_one_to_one_by_amount_and_date_window(pilaga, banco, days_window=3)
+    monkeypatch.setattr(pair_kernel, "PAIR_BUCKET_EDGE_CAP", 0)  # fuerza el barrido por niveles
+    got = _match_one_to_one_by_amount_and_date_window(pilaga, banco, days_window=3)
+
+    assert len(expected[0]) > 0
+    for exp, res in zip(expected, got):
+        pd.testing.assert_frame_equal(exp, res)
+
+
+def test_parallel_n1_clusters_merge_like_sequential(monkeypatch):
+    import pickle
+    import random
+
+    import globalVar as Var
+    from routes.v1 import reconcile_details
+
+    rng = random.Random(7)
+    dates = pd.date_range("2025-09-01", periods=60, freq="D")
+    pilaga = _pilaga_df([(rng.choice(dates), round(rng.uniform(-900, 900), 2), f"P{i}") for i in range(300)])
+    banco = _banco_df(
+        [(rng.choice(dates), round(sum(pilaga["monto"].sample(3, random_state=i)), 2), f"B{i}") for i in range(80)]
+    )
+
+    monkeypatch.setattr(Var, "N1_PARALLEL_WORKERS", 1)
+    expected = reconcile_details._compute_pipeline(pilaga, banco, days_window=5)
+
+    # Cada chunk trabaja sobre su propia copia (como en un proceso aparte)
+    chunks_seen = []
+
+    def fake_map_cpu(fn, items, workers):
+        chunks_seen.append(len(items))
+        return [pickle.loads(pickle.dumps(fn))(item) for item in items]
+
+    monkeypatch.setattr(Var, "N1_PARALLEL_WORKERS", 3)
+    monkeypatch.setattr(Var, "N1_PARALLEL_MIN_ROWS", 0)
+    monkeypatch.setattr(reconcile_details, "map_cpu", fake_map_cpu)
+    got = reconcile_details._compute_pipeline(pilaga, banco, days_window=5)
+
+    assert chunks_seen and max(chunks_seen) > 1
+    assert len(expected["approved"]) > 0
+    for key in ("approved", "suggested"):
+        assert got[key] == expected[key]
+    pd.testing.assert_frame_equal(got["sobrantes_p"], expected["sobrantes_p"])
+    pd.testing.assert_frame_equal(got["sobrantes_b"], expected["sobrantes_b"])
+
+
+def test_parallel_n1_with_real_process_pool(monkeypatch):
+    import random
+
+    import globalVar as Var
+    from routes.v1 import reconcile_details
+    from services import process_pool
+
+    rng = random.Random(11)
+    dates = pd.date_range("2025-09-01", periods=30, freq="D")
+    pilaga = _pilaga_df([(rng.choice(dates), round(rng.uniform(-900, 900), 2), f"P{i}") for i in range(80)])
+    banco = _banco_df(
+        [(rng.choice(dates), round(sum(pilaga["monto"].sample(2, random_state=i)), 2), f"B{i}") for i in range(30)]
+    )
+
+    monkeypatch.setattr(Var, "N1_PARALLEL_WORKERS", 1)
+    expected = reconcile_details._compute_pipeline(pilaga, banco, days_window=5)
+
+    # spawn + pickle del índice y de los chunks + merge, con procesos de verdad
+    monkeypatch.setattr(Var, "N1_PARALLEL_WORKERS", 2)
+    monkeypatch.setattr(Var, "N1_PARALLEL_MIN_ROWS", 0)
+    try:
+        got = reconcile_details._compute_pipeline(pilaga, banco, days_window=5)
+        assert process_pool._CPU_POOL is not None
+    finally:
+        process_pool._shutdown_cpu_pool(wait=True)
+
+    assert len(expected["approved"]) > 0
+    for key in ("approved", "suggested"):
+        assert got[key] == expected[key]
+    pd.testing.assert_frame_equal(got["sobrantes_b"], expected["sobrantes_b"])
+
+
+def test_budgeted_n1_search_resumes_to_full_result(monkeypatch, tmp_path):
+    import random
+
+    from routes.v1 import reconcile_details
+    from services.reconcile.n1_checkpoint import N1CheckpointStore
+
+    monkeypatch.setattr(reconcile_details, "_N1_CHECKPOINTS", N1CheckpointStore(tmp_path))
+    rng = random.Random(11)
+    dates = pd.date_range("2025-09-01", periods=30, freq="D")
+    pilaga = _pilaga_df([(rng.choice(dates), round(rng.uniform(-900, 900), 2), f"P{i}") for i in range(120)])
+    banco = _banco_df(
+        [(rng.choice(dates), round(sum(pilaga["monto"].sample(3, random_state=i)), 2), f"B{i}") for i in range(40)]
+    )
+
+    full = reconcile_details._compute_pipeline(pilaga, banco, days_window=5, time_budget_s=0, step_budget=0)
+    assert full["n1_search"]["complete"]
+
+    partial = reconcile_details._compute_pipeline(pilaga, banco, days_window=5, time_budget_s=0, step_budget=7)
+    assert not partial["n1_search"]["complete"]
+    assert partial["n1_search"]["pending_bank_rows"] > 0
+    runs = 1
+    while not partial["n1_search"]["complete"]:
+        partial = reconcile_details._compute_pipeline(
+            pilaga, banco, days_window=5, time_budget_s=0, step_budget=7, resume=True
+        )
+        runs += 1
+
+    assert runs > 2
+    assert partial["approved"] == full["approved"]
+    assert partial["suggested"] == full["suggested"]
+    pd.testing.assert_frame_equal(partial["sobrantes_b"], full["sobrantes_b"])
+    assert not list(tmp_path.glob("*.json"))  # completo: el checkpoint se descarta
+
+
+def test_budget_truncated_n1_stage_is_not_memoized(monkeypatch, tmp_path):
+    import random
+
+    from routes.v1 import reconcile_details
+    from services.reconcile.n1_checkpoint import N1CheckpointStore
+    from services.reconcile.run_store import RunStore
+
+    monkeypatch.setattr(reconcile_details, "_N1_CHECKPOINTS", N1CheckpointStore(tmp_path / "n1"))
+    monkeypatch.setattr(reconcile_details._STAGES, "store", RunStore(tmp_path / "stages"))
+    rng = random.Random(11)
+    dates = pd.date_range("2025-09-01", periods=30, freq="D")
+    pilaga = _pilaga_df([(rng.choice(dates), round(rng.uniform(-900, 900), 2), f"P{i}") for i in range(120)])
+    banco = _banco_df(
+        [(rng.choice(dates), round(sum(pilaga["monto"].sample(3, random_state=i)), 2), f"B{i}") for i in range(40)]
+    )
+
+    for _ in range(2):
+        cut = reconcile_details._compute_pipeline(pilaga, banco, days_window=5, time_budget_s=0, step_budget=7, memo=True)
+        assert not cut["n1_search"]["complete"]
+        assert cut["stages"]["n1"] == "computed"  # la salida cortada nunca sale del memo
+
+    full = reconcile_details._compute_pipeline(pilaga, banco, days_window=5, time_budget_s=0, step_budget=0, memo=True)
+    again = reconcile_details._compute_pipeline(pilaga, banco, days_window=5, time_budget_s=0, step_budget=0, memo=True)
+    assert full["stages"]["n1"] == "computed" and again["stages"]["n1"] == "memo"
+    assert again["approved"] == full["approved"]
+
+
+def test_bank_to_pilaga_groups_are_suggested():
+    from routes.v1 import reconcile_details
+
+    pilaga = _pilaga_df([("2025-09-10", -1_500.00, "OP 77/2025"), ("2025-09-20", 999.00, "DI01: 1/2025")])
+    banco = _banco_df(
+        [
+            ("2025-09-09", -700.00, "DEB 1"),
+            ("2025-09-10", -500.00, "DEB 2"),
+            ("2025-09-12", -300.00, "DEB 3"),
+            ("2025-09-30", 5.00, "CRED"),
+        ]
+    )
+    out = reconcile_details._compute_pipeline(pilaga, banco, days_window=5, time_budget_s=0)
+
+    b2p = [g for g in out["suggested"] if g["direction"] == "bank_to_pilaga"]
+    assert len(b2p) == 1
+    assert b2p[0]["pilaga_row"]["documento"] == "OP 77/2025"
+    assert sorted(r["documento"] for r in b2p[0]["bank_rows"]) == ["DEB 1", "DEB 2", "DEB 3"]
+    assert list(out["sobrantes_b"]["documento"]) == ["CRED"]
+    assert list(out["sobrantes_p"]["documento"]) == ["DI01: 1/2025"]
+
+
+def test_job_pairs_head_is_built_from_the_loaded_frames(monkeypatch, tmp_path):
+    import queue
+    import threading
+
+    from routes.v1 import reconcile_details, reconcile_summary
+    from services.jobs import JobChannel
+    from services.reconcile.n1_checkpoint import N1CheckpointStore
+    from services.reconcile.run_store import RunStore
+
+    pilaga = _pilaga_df([("2025-09-01", 100.0, "A"), ("2025-09-02", -40.0, "B")])
+    banco = _banco_df([("2025-09-01", 100.0, "X"), ("2025-09-05", 7.0, "Y")])
+
+    def no_reload(*_a, **_k):
+        raise AssertionError("el head del job no debe volver a leer los archivos")
+
+    monkeypatch.setattr(reconcile_summary, "_load_frames", lambda *_a: (pilaga, banco))
+    monkeypatch.setattr(reconcile_summary, "_load_pilaga", no_reload)
+    monkeypatch.setattr(reconcile_summary, "_load_extracto", no_reload)
+    monkeypatch.setattr(reconcile_summary, "_RUNS", RunStore(tmp_path / "runs"))
+    monkeypatch.setattr(reconcile_details, "_N1_CHECKPOINTS", N1CheckpointStore(tmp_path / "n1"))
+    monkeypatch.setattr(reconcile_details._STAGES, "store", RunStore(tmp_path / "stages"))
+
+    events = queue.Queue()
+    out = reconcile_summary._build_run("file:///e.xlsx", "file:///p.xlsx", 5, channel=JobChannel(events, threading.Event()))
+
+    published = {}
+    while not events.empty():
+        ev = events.get()
+        if ev.get("event") == "result":
+            published[ev["name"]] = ev["payload"]
+    head = published["pairs"]["head"]
+    assert published["pairs"]["pares"]["total"] == 1
+    assert head["conciliados_pares"] == 1
+    assert (head["no_en_banco"], head["no_en_pilaga"]) == (1, 1)
+    assert head["pilaga"]["ingresos"] == 100.0 and head["banco"]["neto"] == 107.0
+    assert head["stages"]["n1"] == "pending" and head["complete"] is False
+    assert out["summary"]["conciliados_pares"] == 1
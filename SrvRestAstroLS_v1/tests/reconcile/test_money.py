@@ -0,0 +1,50 @@
+import random
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from routes.v1.reconcile_start import _clean_money, _parse_money_value
+
+
+def _fmt_amount(rng: random.Random) -> str:
+    value = rng.choice([0, rng.randint(1, 999), rng.randint(1_000, 99_999_999)]) + rng.randint(0, 99) / 100
+    plain = f"{value:.2f}"
+    intl = f"{value:,.2f}"
+    ar = intl.replace(",", "_").replace(".", ",").replace("_", ".")
+    txt = rng.choice([plain, intl, ar, plain.replace(".", ","), intl.replace(",", ""), f"{value:.0f}", ar[:-3]])
+    wrap = rng.choice(["{}", "-{}", "({})", "$ {}", "{} -", "  {}  ", "ARS {}", "-({})", "{}-", "$-{}", "{}.", ".{}", "{},"])
+    return wrap.format(txt)
+
+
+def _corpus(n: int = 4000, seed: int = 1234) -> list:
+    rng = random.Random(seed)
+    edge = [
+        None, float("nan"), 0, 0.0, -0.0, 12, -7.5, True, False, float("inf"),
+        "", " ", "-", "()", "(-)", "$", "abc", "1.2.3", "1,2,3", "1.234.567,89", "1,234,567.89",
+        "(1.234,56)", "- 1.234,56", "1-234", "--5", "5--", ".", ",", ".5", "5.", ",5", "5,",
+        "١٢٣,٤٥", "1e5", "nan", "inf", "0,00", "-0", "(0)", "USD 1,000", "€1.000,50",
+        Decimal("12.34"), np.int64(42), np.float64(3.25), pd.Timestamp("2025-01-02"),
+    ]
+    return edge + [_fmt_amount(rng) for _ in range(n)]
+
+
+def _assert_same(got: pd.Series, values) -> None:
+    expected = pd.Series(values, dtype=object).apply(_parse_money_value).fillna(0.0).to_numpy(dtype=float)
+    got_arr = got.to_numpy(dtype=float)
+    assert np.array_equal(got_arr, expected)
+    assert np.array_equal(np.signbit(got_arr), np.signbit(expected))
+
+
+def test_clean_money_matches_scalar_parser_on_generated_corpus():
+    values = _corpus()
+    _assert_same(_clean_money(pd.Series(values, dtype=object)), values)
+
+
+def test_clean_money_numeric_fast_path_and_index():
+    s = pd.Series([1.5, np.nan, -2.0, 3.0], index=[10, 11, 12, 13], name="Ingresos")
+    out = _clean_money(s)
+    assert list(out.index) == [10, 11, 12, 13]
+    assert out.name == "Ingresos"
+    _assert_same(out, list(s))
+    assert _clean_money(pd.Series([1, 2, 3])).dtype == float
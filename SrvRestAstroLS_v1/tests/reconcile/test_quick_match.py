@@ -0,0 +1,104 @@
+import json
+
+import pandas as pd
+import pytest
+
+from services.reconcile.quick_match import (
+    NO_DAY,
+    iter_reconcile_ndjson,
+    match_from_paths,
+    normalize_bank_df,
+    normalize_gl_df,
+    reconcile,
+)
+
+
+def _bank_df(rows):
+    return pd.DataFrame(
+        {
+            "Fecha": [fecha for fecha, _, _ in rows],
+            "Importe": [importe for _, importe, _ in rows],
+            "Concepto": [concepto for _, _, concepto in rows],
+        }
+    )
+
+
+def _gl_df(rows):
+    # dos líneas de encabezado como en el contable
+    return pd.DataFrame(
+        {
+            "Fecha": ["Libro banco", "Fecha"] + [fecha for fecha, _, _ in rows],
+            "Detalle": [None, None] + [detalle for _, _, detalle in rows],
+            "Ingresos": [None, None] + [max(importe, 0.0) or None for _, importe, _ in rows],
+            "Egresos": [None, None] + [max(-importe, 0.0) or None for _, importe, _ in rows],
+        }
+    )
+
+
+def test_normalize_to_columns():
+    bank = pd.DataFrame(
+        {
+            "Fecha": ["05/10/2025", "sin fecha", "06/10/2025", "07/10/2025"],
+            "Importe": ["-1.234,50", "10", None, 20.0],
+            "Concepto": ["Pago", "Ajuste", "Sin importe", "Pago"],
+        }
+    )
+    cols = normalize_bank_df(bank)
+    assert len(cols) == 3  # la fila sin importe no es movimiento
+    assert [cols.date_iso(i) for i in range(3)] == ["2025-10-05", None, "2025-10-07"]
+    assert cols.day[1] == NO_DAY
+    assert cols.amount.tolist() == [-1234.5, 10.0, 20.0]
+    assert cols.cents.tolist() == [-123450, 1000, 2000]
+    assert [cols.desc(i) for i in range(3)] == ["Pago", "Ajuste", "Pago"]
+    assert cols.descs == ["Pago", "Ajuste"]  # descripciones internadas
+    assert cols.ui_row(2) == {"date": "2025-10-07", "amount": 20.0, "desc": "Pago"}
+
+    gl = normalize_gl_df(
+        pd.DataFrame(
+            {
+                "Fecha": ["Libro banco", "Fecha", "05/10/2025", "06/10/2025"],
+                "Detalle": [None, None, "Cobro", "Gasto"],
+                "Ingresos": [None, None, "1.234,50", "0"],
+                "Egresos": [None, None, "0", "99,99"],
+            }
+        )
+    )
+    assert [gl.ui_row(i) for i in range(len(gl))] == [
+        {"date": "2025-10-05", "amount": 1234.5, "desc": "Cobro"},
+        {"date": "2025-10-06", "amount": -99.99, "desc": "Gasto"},
+    ]
+
+
+def test_repeated_amount_and_date_only_marks_assigned_rows():
+    # tres débitos iguales el mismo día y un solo asiento: quedan dos sin conciliar
+    bank = _bank_df([("05/10/2025", -1500.0, f"Comision {i}") for i in range(3)])
+    gl = _gl_df([("05/10/2025", -1500.0, "Comisiones")])
+
+    result = reconcile(bank, gl, days_tolerance=0)
+
+    assert result["summary"]["matched"] == 1
+    assert result["summary"]["unmatched_bank"] == 2
+    assert [r["desc"] for r in result["unmatched_bank"]] == ["Comision 1", "Comision 2"]
+    assert result["unmatched_gl"] == []
+
+
+def test_max_rows_caps_lists_and_ndjson_streams_everything():
+    bank = _bank_df([(f"{d:02d}/10/2025", 100.0 + d, "x") for d in range(1, 11)])
+    gl = _gl_df([("01/10/2025", 101.0, "y")])
+
+    capped = reconcile(bank, gl, max_rows=3)
+    assert capped["summary"]["unmatched_bank"] == 9
+    assert len(capped["unmatched_bank"]) == 3
+    assert len(reconcile(bank, gl, max_rows=0)["unmatched_bank"]) == 9
+
+    lines = [json.loads(line) for line in iter_reconcile_ndjson(bank, gl)]
+    assert lines[0]["kind"] == "summary" and lines[0]["matched"] == 1
+    assert [line["kind"] for line in lines[1:]].count("unmatched_bank") == 9
+    assert lines[1]["row"]["amount"] == 101.0
+
+
+def test_match_from_paths_fails_before_streaming(tmp_path):
+    bad = tmp_path / "extracto.xlsx"
+    bad.write_bytes(b"no es un xlsx")
+    with pytest.raises(Exception):
+        match_from_paths(bad, bad)
@@ -0,0 +1,82 @@
+import os
+
+import pandas as pd
+import pytest
+
+from services.reconcile.run_store import RunNotFoundError, RunStore
+
+
+def test_runs_round_trip_expire_and_evict(tmp_path):
+    store = RunStore(tmp_path, max_entries=2, ttl_seconds=60)
+    frame = pd.DataFrame({"fecha": pd.to_datetime(["2025-10-01"]), "monto": [10.5], "documento": ["OP: 1234/2025"]})
+
+    first = store.new_run_id()
+    store.put(first, {"days_window": 5, "pipeline": {"sobrantes_p": frame}})
+    got = store.get(first)
+    assert got["days_window"] == 5
+    pd.testing.assert_frame_equal(got["pipeline"]["sobrantes_p"], frame)
+
+    for bad in (None, "", "../etc/passwd", "0" * 32):
+        with pytest.raises(RunNotFoundError):
+            store.get(bad)
+
+    # vencida por TTL (mtime viejo)
+    old = os.path.getmtime(tmp_path / f"{first}.pkl") - 3600
+    os.utime(tmp_path / f"{first}.pkl", (old, old))
+    with pytest.raises(RunNotFoundError):
+        store.get(first)
+
+    # tope de entradas: se va la menos usada (leer una corrida la marca como usada)
+    ids = [store.new_run_id() for _ in range(3)]
+    for i, run_id in enumerate(ids[:2]):
+        store.put(run_id, {"n": i})
+        old = os.path.getmtime(tmp_path / f"{run_id}.pkl") - 10 * (2 - i)
+        os.utime(tmp_path / f"{run_id}.pkl", (old, old))
+    assert store.get(ids[0])["n"] == 0
+    store.put(ids[2], {"n": 2})
+    assert sorted(p.stem for p in tmp_path.glob("*.pkl")) == sorted([ids[0], ids[2]])
+
+    # una corrida en uso no vence: el get renueva el mtime
+    stale = os.path.getmtime(tmp_path / f"{ids[0]}.pkl") - 50
+    os.utime(tmp_path / f"{ids[0]}.pkl", (stale, stale))
+    assert store.get(ids[0])["n"] == 0
+    assert os.path.getmtime(tmp_path / f"{ids[0]}.pkl") > stale + 40
+
+
+def test_uri_runs_reuse_the_complete_stored_run(monkeypatch, tmp_path):
+    from routes.v1 import reconcile_summary
+
+    store = RunStore(tmp_path)
+    monkeypatch.setattr(reconcile_summary, "_RUNS", store)
+    run_id = store.new_run_id()
+    counts = {"movimientos_pilaga": 3, "movimientos_banco": 2, "conciliados_pares": 1,
+              "no_en_banco": 2, "no_en_pilaga": 1, "days_window": 5}
+    store.put(run_id, {"pipeline": {"complete": True}, "summary": {"run_id": run_id}, "counts": counts})
+
+    # sin tocar los archivos (no existen): la corrida completa se reusa tal cual
+    out = reconcile_summary._build_run("file:///no/existe.xlsx", "file:///no/existe.xlsx", 5, run_id=run_id, reuse=True)
+    assert out == {"run_id": run_id, "summary": {"run_id": run_id}, **counts}
+
+    # cortada por presupuesto: se recalcula
+    store.put(run_id, {"pipeline": {"complete": False}, "summary": {}, "counts": counts})
+    with pytest.raises(FileNotFoundError):
+        reconcile_summary._build_run("file:///no/existe.xlsx", "file:///no/existe.xlsx", 5, run_id=run_id, reuse=True)
+
+
+def test_run_id_for_other_files_or_window_is_not_found(monkeypatch, tmp_path):
+    from routes.v1 import reconcile_details, reconcile_summary
+
+    store = RunStore(tmp_path)
+    monkeypatch.setattr(reconcile_details, "_RUNS", store)
+    run_id = store.new_run_id()
+    store.put(run_id, {"uri_extracto": "file:///e1.xlsx", "uri_contable": "file:///p1.xlsx", "days_window": 5,
+                       "pipeline": {"complete": True}, "summary": {"run_id": run_id, "descomposicion": {}}})
+
+    assert reconcile_summary._run_summary(run_id, "file:///e1.xlsx", "file:///p1.xlsx", 5)["run_id"] == run_id
+    assert reconcile_summary._run_summary(run_id)["run_id"] == run_id  # solo run_id: sin URIs que comparar
+    for uris, days in ((("file:///e2.xlsx", "file:///p1.xlsx"), 5), (("file:///e1.xlsx", "file:///p2.xlsx"), 5),
+                       (("file:///e1.xlsx", "file:///p1.xlsx"), 7)):
+        with pytest.raises(RunNotFoundError):
+            reconcile_summary._run_summary(run_id, *uris, days)
+        with pytest.raises(RunNotFoundError):
+            reconcile_details._pipeline_for(*uris, days, run_id=run_id)
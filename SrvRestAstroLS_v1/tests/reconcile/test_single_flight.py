@@ -0,0 +1,35 @@
+import asyncio
+
+from services.single_flight import SingleFlight
+
+def test_concurrent_calls_with_same_key_share_one_execution():
+    flights = SingleFlight()
+    runs = []
+
+    async def slow():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "run-1"
+
+    async def main():
+        return await asyncio.gather(*(flights.do(("a", 7), slow) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["run-1"] * 5
+    assert len(runs) == 1
+    stats = flights.stats()
+    assert (stats["leaders"], stats["coalesced"], stats["in_flight"]) == (1, 4, 0)
+
+def test_errors_reach_every_waiter_and_release_the_key():
+    flights = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise FileNotFoundError("extracto.xlsx")
+
+    async def main():
+        return await asyncio.gather(*(flights.do("k", boom) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, FileNotFoundError) for r in results)
+    assert flights.stats()["errors"] == 1
+    assert flights.stats()["in_flight"] == 0
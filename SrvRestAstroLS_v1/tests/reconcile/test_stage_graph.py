@@ -0,0 +1,61 @@
+from services.reconcile.run_store import RunStore
+from services.reconcile.stage_graph import Stage, StageGraph
+
+
+def _graph(tmp_path, calls):
+    def pairs(x, window):
+        calls.append("pairs")
+        return x * 10 + window
+
+    def n1(pairs, window, resume):
+        calls.append("n1")
+        return pairs + (1000 if resume else 0)
+
+    return StageGraph(
+        [
+            Stage("pairs", pairs, ("x", "window")),
+            Stage("n1", n1, ("pairs", "window", "resume"), volatile=("resume",)),
+        ],
+        store=RunStore(tmp_path),
+    )
+
+
+def test_stages_run_lazily_and_reuse_memo_across_graphs(tmp_path):
+    calls = []
+    params = {"x": 3, "window": 5, "resume": False}
+
+    trace = {}
+    assert _graph(tmp_path, calls).evaluate("pairs", params, trace=trace) == 35
+    assert calls == ["pairs"] and trace == {"pairs": "computed"}
+
+    # otro proceso (otro grafo, mismo store): la 1→1 sale del memo y solo corre la etapa pedida
+    other = _graph(tmp_path, calls)
+    assert other.peek("n1", params) is None
+    trace = {}
+    assert other.evaluate("n1", params, trace=trace) == 35
+    assert calls == ["pairs", "n1"] and trace == {"pairs": "memo", "n1": "computed"}
+
+    # resume no entra en la clave: refresh recalcula y reemplaza lo guardado
+    assert other.evaluate("n1", {**params, "resume": True}, refresh=("n1",)) == 1035
+    assert other.peek("n1", params) == 1035
+    assert calls == ["pairs", "n1", "n1"]
+
+    # otra entrada, otra clave
+    assert other.evaluate("n1", {**params, "window": 6}) == 36
+    assert calls[-2:] == ["pairs", "n1"]
+
+
+def test_non_cacheable_output_is_not_stored(tmp_path):
+    calls = []
+
+    def search(x):
+        calls.append(x)
+        return {"complete": len(calls) > 1}
+
+    graph = StageGraph([Stage("n1", search, ("x",), cacheable=lambda out: out["complete"])], store=RunStore(tmp_path))
+    trace = {}
+    assert graph.evaluate("n1", {"x": 1}, trace=trace) == {"complete": False}
+    assert trace == {"n1": "computed"} and graph.peek("n1", {"x": 1}) is None
+    assert graph.evaluate("n1", {"x": 1}) == {"complete": True}
+    assert graph.peek("n1", {"x": 1}) == {"complete": True}
+    assert len(calls) == 2
@@ -0,0 +1,31 @@
+import random
+
+from services.reconcile.subset_sum import _dfs_plain, find_subset
+
+
+def _cases(n_cases: int = 200, seed: int = 99):
+    rng = random.Random(seed)
+    for _ in range(n_cases):
+        n = rng.choice([0, 3, 8, 14, 20])
+        sign = rng.choice([1, -1])
+        vals = sorted((sign * round(rng.uniform(1, 3000), 2) for _ in range(n)), key=abs, reverse=True)
+        tol = rng.choice([0.0, 1.0, 5.0])
+        if n and rng.random() < 0.6:
+            target = sum(rng.sample(vals, rng.randint(1, min(6, n)))) + rng.choice([0.0, tol, -tol, 0.01])
+        else:
+            target = sign * rng.uniform(0, 15000)
+        yield vals, target, tol, rng.choice([1, 2])
+
+
+def test_first_mode_matches_plain_dfs():
+    for vals, target, tol, min_combo in _cases():
+        assert find_subset(vals, target, 6, tol, min_combo=min_combo) == _dfs_plain(vals, target, 6, tol, min_combo)
+
+
+def test_min_diff_and_min_card_modes():
+    vals = [700.0, 300.0, 250.0, 249.5, 200.0, 50.0]
+    # first: 700 + 300 (diff 0.4) es la primera en orden DFS; min_diff: 700 + 249.5 + 50 (diff 0.1)
+    assert find_subset(vals, 999.6, 6, 1.0) == [0, 1]
+    assert find_subset(vals, 999.6, 6, 1.0, mode="min_diff") == [0, 3, 5]
+    assert find_subset(vals, 500.0, 6, 0.0, min_combo=1, mode="min_card") == [1, 4]
+    assert find_subset(vals, 10_000.0, 6, 1.0, mode="min_card") == []